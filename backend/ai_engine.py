@@ -1,25 +1,29 @@
 # backend/ai_engine.py
-import os
-import json
-import google.generativeai as genai
-from dotenv import load_dotenv
+import asyncio
+import time
+from contextlib import aclosing
+from typing import AsyncIterator
 
-from logger import logger
-from exceptions import AIGenerationError # <-- THE CRITICAL FIX IS HERE
+from config import settings
+from context_builder import estimate_tokens
+from logger import get_logger
+from exceptions import AIGenerationError, UpstreamUnavailableError # <-- THE CRITICAL FIX IS HERE
+import rate_limit
+import resilience
+from clients import registry
+import metrics
+import response_parser
+from response_parser import IncrementalCardParser
 
-load_dotenv()
+logger = get_logger(__name__)
 
-def generate_pain_cards(context: str, company_name: str) -> list[dict]:
-    api_key = os.getenv("GOOGLE_API_KEY")
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY not found in .env file.")
+REASKS = metrics.registry.counter(
+    "leadscope_pain_card_reasks_total", "Follow-up Gemini prompts asking only for cards an answer lacked.")
 
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-1.5-flash')
-
-    prompt = f"""
+def _build_prompt(context: str, company_name: str) -> str:
+    return f"""
     You are a Tier-1 management consultant from a top firm, advising the CFO of {company_name}.
-    Based on the following context from their company profile and 10-K filing, identify exactly 8 significant, CFO-level business and financial pain points.
+    Based on the following context from their company profile and 10-K filing, identify exactly {settings.pain_card_count} significant, CFO-level business and financial pain points.
 
     Guidelines:
     1.  Focus on challenges related to profitability, cash flow, operational efficiency, market pressures, or financial systems.
@@ -36,17 +40,302 @@ def generate_pain_cards(context: str, company_name: str) -> list[dict]:
     JSON Output:
     """
 
+
+def _build_followup_prompt(context: str, company_name: str, cards: list[dict], missing: int) -> str:
+    titles = "\n".join(f"    - {card['title']}" for card in cards)
+    return f"""
+    You are a Tier-1 management consultant from a top firm, advising the CFO of {company_name}.
+    Based on the following context from their company profile and 10-K filing, identify exactly {missing} more significant, CFO-level business and financial pain points.
+    They must be different from these, which have already been identified:
+{titles}
+
+    Guidelines:
+    1.  Focus on challenges related to profitability, cash flow, operational efficiency, market pressures, or financial systems.
+    2.  Each pain point must have a short 'title' and a concise 'blurb' (under 40 words).
+    3.  Return your response as a single valid JSON array of {missing} objects, where each object has a "title" key and a "blurb" key.
+    4.  Do not include any text or explanation outside of the single JSON array.
+
+    Context:
+    ---
+    {context}
+    ---
+
+    JSON Output:
+    """
+
+
+async def _generate(prompt: str, **options):
+    """One Gemini call with the API key the rate governor granted to this attempt."""
+    model = await registry.gemini_model(rate_limit.current_key())
+    return await model.generate_content_async(prompt, **options)
+
+
+async def stream_pain_cards(context: str, company_name: str) -> AsyncIterator[dict]:
+    """Yield raw pain cards one by one as Gemini streams its JSON answer."""
+    prompt = _build_prompt(context, company_name)
+    parser = IncrementalCardParser()
+    count = 0
+
+    try:
+        logger.info("Streaming pain cards for %s with Gemini AI...", company_name)
+        started = time.perf_counter()
+        # The gemini slot and breaker cover the whole stream, not just opening it.
+        chunks = resilience.stream("gemini", lambda: _generate(prompt, stream=True))
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                if started is not None:
+                    metrics.observe_stage("gemini_first_token", time.perf_counter() - started)
+                    started = None
+                for item in parser.feed(chunk.text):
+                    card = response_parser.coerce_card(item)
+                    if card is None:
+                        logger.warning("Dropping malformed streamed card for %s: %r", company_name, item)
+                        continue
+                    count += 1
+                    yield card
+    except UpstreamUnavailableError:
+        raise
+    except Exception as e:
+        metrics.record_upstream_error("gemini")
+        logger.error("Streaming AI generation error for %s: %s", company_name, e)
+        raise AIGenerationError(f"Failed to generate or parse AI response for {company_name}")
+
+    if parser.rejected:
+        logger.warning("Skipped %s unparseable streamed cards for %s", parser.rejected, company_name)
+    if not count:
+        raise AIGenerationError(f"AI response for {company_name} contained no pain cards")
+    logger.info("Streamed %s pain cards for %s.", count, company_name)
+
+
+def _answer_text(response, company_name: str) -> str:
+    """The answer's text. A blocked or empty answer is final: asking again would only spend quota."""
     try:
-        logger.info(f"Generating pain cards for {company_name} with Gemini AI...")
-        response = model.generate_content(prompt)
-        
-        json_text = response.text.strip().lstrip("```json").rstrip("```")
-        
-        pain_cards = json.loads(json_text)
-        
-        logger.info(f"Successfully generated and parsed {len(pain_cards)} pain cards.")
-        return pain_cards
+        text = response.text
+    except ValueError as e:
+        # The SDK raises ValueError when the candidate was blocked or has no text parts.
+        raise AIGenerationError(f"Gemini returned no answer for {company_name}: {e}")
+    if not text.strip():
+        raise AIGenerationError(f"Gemini returned an empty answer for {company_name}")
+    return text
+
+
+async def _request_cards(prompt: str, stage: str, company_name: str) -> response_parser.ParsedCards:
+    with metrics.stage(stage):
+        response = await resilience.call("gemini", lambda: _generate(prompt))
+    text = _answer_text(response, company_name)
+    with metrics.stage("json_parse"):
+        return response_parser.parse_pain_cards(text)
+
 
+async def _complete_cards(context: str, company_name: str, cards: list[dict]) -> list[dict]:
+    """Ask again, only for the cards still missing, up to ``pain_card_reask_attempts`` times."""
+    for _ in range(settings.pain_card_reask_attempts):
+        missing = settings.pain_card_count - len(cards)
+        if missing <= 0:
+            break
+        logger.warning("Answer for %s had %s valid pain cards; asking for %s more",
+                       company_name, len(cards), missing)
+        REASKS.inc()
+        prompt = (_build_followup_prompt(context, company_name, cards, missing) if cards
+                  else _build_prompt(context, company_name))
+        try:
+            parsed = await _request_cards(prompt, "gemini_reask", company_name)
+        except AIGenerationError as e:
+            logger.warning("Stopped asking for more pain cards: %s", e)
+            break
+        except ValueError as e:
+            logger.warning("Follow-up answer for %s was unparseable: %s", company_name, e)
+            continue
+        seen = {card["title"].lower() for card in cards}
+        cards = cards + [card for card in parsed.cards if card["title"].lower() not in seen][:missing]
+    return cards
+
+
+async def generate_pain_cards(context: str, company_name: str) -> list[dict]:
+    prompt = _build_prompt(context, company_name)
+
+    try:
+        logger.info("Generating pain cards for %s with Gemini AI...", company_name)
+        try:
+            parsed = await _request_cards(prompt, "gemini_call", company_name)
+            pain_cards = parsed.cards
+            if parsed.repaired or parsed.rejected:
+                logger.warning("Repaired answer for %s: truncated=%s, rejected %s malformed cards",
+                               company_name, parsed.repaired, parsed.rejected)
+        except ValueError as e:
+            logger.warning("Unparseable answer for %s: %s", company_name, e)
+            pain_cards = []
+        pain_cards = await _complete_cards(context, company_name, pain_cards)
+    except UpstreamUnavailableError:
+        raise
+    except AIGenerationError as e:
+        logger.error("AI generation failed for %s: %s", company_name, e)
+        raise
     except Exception as e:
-        logger.error(f"Unexpected AI generation error for {company_name}: {e}")
-        raise AIGenerationError(f"Failed to generate or parse AI response for {company_name}")
\ No newline at end of file
+        metrics.record_upstream_error("gemini")
+        logger.error("Unexpected AI generation error for %s: %s", company_name, e)
+        raise AIGenerationError(f"Failed to generate or parse AI response for {company_name}")
+
+    if not pain_cards:
+        raise AIGenerationError(f"Failed to generate or parse AI response for {company_name}")
+    logger.info("Successfully generated and parsed %s pain cards.", len(pain_cards))
+    return pain_cards
+
+def _build_batch_prompt(contexts: dict[str, str]) -> str:
+    sections = "\n".join(f"### {ticker}\n---\n{context}\n---" for ticker, context in contexts.items())
+    return f"""
+    You are a Tier-1 management consultant from a top firm, advising the CFOs of several companies.
+    For EACH company below, based on the context from its company profile and 10-K filing, identify exactly {settings.pain_card_count} significant, CFO-level business and financial pain points.
+
+    Guidelines:
+    1.  Focus on challenges related to profitability, cash flow, operational efficiency, market pressures, or financial systems.
+    2.  Each pain point must have a short 'title' and a concise 'blurb' (under 40 words).
+    3.  A significant portion of the pain points MUST be problems directly solvable by an SAP S/4HANA transformation.
+    4.  Treat each company independently; never mix context between companies.
+    5.  Return your response as a single valid JSON object whose keys are the company tickers ({", ".join(contexts)}) and whose values are arrays of objects, each with a "title" key and a "blurb" key.
+    6.  Do not include any text or explanation outside of the single JSON object.
+
+    Companies:
+    {sections}
+
+    JSON Output:
+    """
+
+
+async def _generate_batch_once(contexts: dict[str, str]) -> dict[str, list[dict]]:
+    """One multi-company call; returns only the companies whose cards validate."""
+    prompt = _build_batch_prompt(contexts)
+    logger.info("Generating pain cards for %s companies in one Gemini call...", len(contexts))
+    with metrics.stage("gemini_batch_call"):
+        response = await resilience.call("gemini", lambda: _generate(prompt))
+    with metrics.stage("json_parse"):
+        by_ticker, _ = response_parser.extract_json(response.text)
+        if not isinstance(by_ticker, dict):
+            raise ValueError("batch response is not a JSON object")
+        results = {}
+        for ticker in contexts:
+            cards, _ = response_parser.validate_cards(by_ticker.get(ticker))
+            if cards:
+                results[ticker] = cards
+    return results
+
+
+async def generate_pain_cards_batch(contexts: dict[str, str]) -> dict[str, list[dict]]:
+    """Pain cards for several companies, keyed by ticker, using as few Gemini calls as possible.
+
+    A batch whose call or parse fails is split in half and retried; companies
+    missing or invalid in an otherwise good answer get a single-company call.
+    Companies that still fail are left out of the result.
+    """
+    if len(contexts) == 1:
+        (ticker, context), = contexts.items()
+        try:
+            return {ticker: await generate_pain_cards(context, ticker)}
+        except AIGenerationError:
+            return {}
+
+    try:
+        results = await _generate_batch_once(contexts)
+    except UpstreamUnavailableError:
+        raise
+    except Exception as e:
+        metrics.record_upstream_error("gemini")
+        logger.warning("Batched generation for %s companies failed (%s); splitting the batch",
+                       len(contexts), e)
+        tickers = list(contexts)
+        halves = [dict((t, contexts[t]) for t in part) for part in (tickers[:len(tickers) // 2], tickers[len(tickers) // 2:])]
+        results = {}
+        for part in await asyncio.gather(*(generate_pain_cards_batch(h) for h in halves)):
+            results.update(part)
+        return results
+
+    missing = [t for t in contexts if t not in results]
+    if missing:
+        logger.warning("Batched answer lacked valid cards for %s; falling back to single calls", missing)
+        for part in await asyncio.gather(*(generate_pain_cards_batch({t: contexts[t]}) for t in missing)):
+            results.update(part)
+    return results
+
+
+class PainCardBatcher:
+    """Collects single-company requests from concurrent callers into multi-company Gemini calls.
+
+    ``generate(context, ticker)`` has the signature of ``generate_pain_cards``.
+    Requests are buffered for up to ``gemini_batch_window`` seconds, or until
+    the next one would exceed the token budget or company limit, and then
+    sent together. Create one batcher per event loop, e.g. per batch job.
+
+    A combined call serves every company in it, so it runs under the latest
+    deadline among its callers, not the deadline of whichever caller happened
+    to start it. Each caller still stops waiting at its own deadline.
+    """
+
+    def __init__(self, token_budget: int | None = None, max_companies: int | None = None,
+                 window: float | None = None):
+        self.token_budget = token_budget or settings.gemini_batch_token_budget
+        self.max_companies = max_companies or settings.gemini_batch_max_companies
+        self.window = window if window is not None else settings.gemini_batch_window
+        self._pending: dict[str, tuple[str, asyncio.Future]] = {}
+        self._expires: list[float | None] = []
+        self._pending_tokens = 0
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.calls = 0
+
+    async def generate(self, context: str, ticker: str) -> list[dict]:
+        if ticker in self._pending:
+            self._expires.append(resilience.expires())
+            return await self._wait(self._pending[ticker][1])
+        tokens = estimate_tokens(context)
+        if self._pending and (self._pending_tokens + tokens > self.token_budget
+                              or len(self._pending) >= self.max_companies):
+            self._flush()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[ticker] = (context, future)
+        self._pending_tokens += tokens
+        self._expires.append(resilience.expires())
+        if len(self._pending) >= self.max_companies:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await self._wait(future)
+
+    @staticmethod
+    async def _wait(future: asyncio.Future) -> list[dict]:
+        budget = resilience.remaining()
+        if budget is None:
+            return await asyncio.shield(future)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), max(budget, 0))
+        except asyncio.TimeoutError:
+            raise UpstreamUnavailableError("Request deadline exceeded waiting for a batched Gemini call") from None
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        pending, self._pending, self._pending_tokens = self._pending, {}, 0
+        expires, self._expires = self._expires, []
+        self.calls += 1
+        task = asyncio.ensure_future(self._run(pending, None if None in expires else max(expires)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: dict[str, tuple[str, asyncio.Future]], expires: float | None) -> None:
+        try:
+            with resilience.deadline_at(expires):
+                results = await generate_pain_cards_batch({t: ctx for t, (ctx, _) in pending.items()})
+        except Exception as e:
+            for _, future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for ticker, (_, future) in pending.items():
+            if future.done():
+                continue
+            if ticker in results:
+                future.set_result(results[ticker])
+            else:
+                future.set_exception(AIGenerationError(f"Failed to generate or parse AI response for {ticker}"))
@@ -0,0 +1,245 @@
+"""Persistent store of assessments and the raw inputs they were built from.
+
+Each row holds one filing of one ticker, keyed by ``(ticker, filing_id)``. A
+row contains the FMP profile, the raw Gemini pain cards, and the assessment
+built from them. It also records the scope version (``scope_version``: the
+taxonomy's ``CompiledScopeRules.version`` plus the near-duplicate merging
+settings) and the classifier rules' ``CompiledClassifier.version`` used to
+build it. JSON payloads are stored zlib-compressed.
+
+Scope mapping and classification are pure functions of the stored cards and
+profile. After the taxonomy, the merging settings or the classifier rules
+change, stale rows are therefore re-scored locally with no FMP, SEC or
+Gemini calls. Only the part
+that changed is recomputed, and only rows whose assessment actually changes
+are rewritten; the others just have their version columns bumped. Run
+``python assessment_store.py rescope`` after an edit. Any row still stale is
+re-scored when the pipeline reads it.
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from classifier import CompiledClassifier, DEFAULT_CLASSIFIER
+from config import settings
+from schemas import AssessmentResponse, PainCard
+from dedup import merge_version, scope_and_merge
+from scope_engine import CompiledScopeRules, DEFAULT_RULES
+
+SCHEMA = """
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS assessments (
+    ticker             TEXT NOT NULL,
+    filing_id          TEXT NOT NULL,
+    profile            BLOB NOT NULL,
+    raw_cards          BLOB NOT NULL,
+    assessment         BLOB NOT NULL,
+    taxonomy_version   TEXT NOT NULL,
+    classifier_version TEXT NOT NULL,
+    updated_at         REAL NOT NULL,
+    PRIMARY KEY (ticker, filing_id)
+) WITHOUT ROWID;
+"""
+COLUMNS = "ticker, filing_id, profile, raw_cards, assessment, taxonomy_version, classifier_version"
+
+
+class StoredAssessment(NamedTuple):
+    ticker: str
+    filing_id: str
+    profile: dict
+    raw_cards: list[dict]
+    assessment: dict
+    taxonomy_version: str
+    classifier_version: str
+
+
+class RescopeStats(NamedTuple):
+    scanned: int
+    rewritten: int
+    unchanged: int
+
+
+def pack(value) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def unpack(blob: bytes):
+    return json.loads(zlib.decompress(blob))
+
+
+def scope_version(rules: CompiledScopeRules = DEFAULT_RULES) -> str:
+    """Version of the scope mapping ``rescore`` applies: the taxonomy plus card merging."""
+    return f"{rules.version}.{merge_version()}"
+
+
+def scope_summary(activated_tiles: list[str]) -> str:
+    return f"Phase 1 Scope includes {len(activated_tiles)} key modules..."
+
+
+def build_response(cards: list[PainCard], activated_tiles: list[str], company_profile: dict,
+                   classified_industry: str, geo_scope: str) -> AssessmentResponse:
+    return AssessmentResponse(
+        pain_cards=cards,
+        scope_summary=scope_summary(activated_tiles),
+        activated_tiles=activated_tiles,
+        industry=company_profile.get("industry"),
+        revenue=company_profile.get("revenue"),
+        classified_industry=classified_industry,
+        geo_scope=geo_scope,
+    )
+
+
+def rescore(record: StoredAssessment, rules: CompiledScopeRules = DEFAULT_RULES,
+            classifier: CompiledClassifier = DEFAULT_CLASSIFIER) -> dict:
+    """The record's assessment with whichever of scope mapping and classification is stale recomputed."""
+    assessment = dict(record.assessment)
+    if record.taxonomy_version != scope_version(rules):
+        enriched, activated_tiles = scope_and_merge([dict(card) for card in record.raw_cards], rules)
+        # Same shape as PainCard.model_dump(); the cards were validated when first stored.
+        assessment["pain_cards"] = [
+            {"title": card["title"], "blurb": card["blurb"], "triggered_tiles": card["triggered_tiles"],
+             "triggering_keywords": card["triggering_keywords"]}
+            for card in enriched
+        ]
+        assessment["activated_tiles"] = activated_tiles
+        assessment["scope_summary"] = scope_summary(activated_tiles)
+    if record.classifier_version != classifier.version:
+        assessment["classified_industry"], assessment["geo_scope"] = classifier.classify(record.profile)
+    return assessment
+
+
+class AssessmentStore:
+    """SQLite-backed store; safe to use from several threads at once."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _record(row: tuple) -> StoredAssessment:
+        ticker, filing_id, profile, raw_cards, assessment, taxonomy_version, classifier_version = row
+        return StoredAssessment(ticker, filing_id, unpack(profile), unpack(raw_cards), unpack(assessment),
+                                taxonomy_version, classifier_version)
+
+    def save(self, ticker: str, filing_id: str, profile: dict, raw_cards: list[dict], assessment: dict,
+             taxonomy_version: str, classifier_version: str) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO assessments ({COLUMNS}, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (ticker, filing_id, pack(profile), pack(raw_cards), pack(assessment),
+                 taxonomy_version, classifier_version, time.time()),
+            )
+
+    def get(self, ticker: str, filing_id: str) -> Optional[StoredAssessment]:
+        row = self._connection().execute(
+            f"SELECT {COLUMNS} FROM assessments WHERE ticker = ? AND filing_id = ?", (ticker, filing_id)
+        ).fetchone()
+        return self._record(row) if row else None
+
+    def current(self, ticker: str, filing_id: str, rules: CompiledScopeRules = DEFAULT_RULES,
+                classifier: CompiledClassifier = DEFAULT_CLASSIFIER) -> Optional[dict]:
+        """The stored assessment, re-scored first (and written back) if its versions are stale."""
+        record = self.get(ticker, filing_id)
+        if record is None:
+            return None
+        if (record.taxonomy_version, record.classifier_version) == (scope_version(rules), classifier.version):
+            return record.assessment
+        assessment = rescore(record, rules, classifier)
+        self._write_rescored([(record, assessment)], rules, classifier)
+        return assessment
+
+    def _write_rescored(self, results: list[tuple[StoredAssessment, dict]], rules: CompiledScopeRules,
+                        classifier: CompiledClassifier) -> int:
+        """Persist re-scored assessments; returns how many actually changed."""
+        now, version = time.time(), scope_version(rules)
+        changed = [(pack(assessment), version, classifier.version, now, record.ticker, record.filing_id)
+                   for record, assessment in results if assessment != record.assessment]
+        bumped = [(version, classifier.version, record.ticker, record.filing_id)
+                  for record, assessment in results if assessment == record.assessment]
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "UPDATE assessments SET assessment = ?, taxonomy_version = ?, classifier_version = ?, "
+                "updated_at = ? WHERE ticker = ? AND filing_id = ?", changed)
+            conn.executemany(
+                "UPDATE assessments SET taxonomy_version = ?, classifier_version = ? "
+                "WHERE ticker = ? AND filing_id = ?", bumped)
+        return len(changed)
+
+    def rescope(self, rules: CompiledScopeRules = DEFAULT_RULES,
+                classifier: CompiledClassifier = DEFAULT_CLASSIFIER) -> RescopeStats:
+        """Re-score every row built with other taxonomy or classifier versions."""
+        rows = self._connection().execute(
+            f"SELECT {COLUMNS} FROM assessments WHERE taxonomy_version != ? OR classifier_version != ?",
+            (scope_version(rules), classifier.version),
+        ).fetchall()
+        results = []
+        for row in rows:
+            record = self._record(row)
+            results.append((record, rescore(record, rules, classifier)))
+        rewritten = self._write_rescored(results, rules, classifier)
+        return RescopeStats(len(results), rewritten, len(results) - rewritten)
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM assessments").fetchone()[0]
+
+    def stale_count(self, rules: CompiledScopeRules = DEFAULT_RULES,
+                    classifier: CompiledClassifier = DEFAULT_CLASSIFIER) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM assessments WHERE taxonomy_version != ? OR classifier_version != ?",
+            (scope_version(rules), classifier.version),
+        ).fetchone()[0]
+
+
+_store: Optional[AssessmentStore] = None
+
+
+def get_store() -> Optional[AssessmentStore]:
+    """The configured store (created on first use), or None when ``ASSESSMENT_STORE_PATH`` is unset."""
+    global _store
+    path = settings.assessment_store_path
+    if not path:
+        return None
+    if _store is None or _store.path != path:
+        _store = AssessmentStore(path)
+    return _store
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=["rescope", "stats"])
+    parser.add_argument("--store", default=settings.assessment_store_path,
+                        help="SQLite assessment store (default: ASSESSMENT_STORE_PATH)")
+    args = parser.parse_args(argv)
+    if not args.store or not Path(args.store).exists():
+        parser.error("no assessment store found; pass --store or set ASSESSMENT_STORE_PATH")
+
+    store = AssessmentStore(args.store)
+    if args.command == "stats":
+        print(f"{store.count()} assessments, {store.stale_count()} stale "
+              f"(scope {scope_version()}, classifier {DEFAULT_CLASSIFIER.version})")
+        return
+    started = time.perf_counter()
+    stats = store.rescope()
+    print(f"Re-scored {stats.scanned} stale assessments in {time.perf_counter() - started:.1f}s: "
+          f"{stats.rewritten} rewritten, {stats.unchanged} unchanged", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Batch assessment jobs for whole ticker lists.
+
+A job validates and de-duplicates its tickers, then runs them through the
+regular assessment pipeline with a bounded number of tickers in flight.
+Upstream pressure is bounded separately by ``upstream.upstream_slot``, and
+repeated artifacts are served from the shared cache.
+
+A job runs in the worker process that accepted it. When the cache has a
+Redis tier, that worker publishes the job's counts there every
+``batch_publish_interval`` seconds, and its full results once it finishes,
+so any worker can answer status polls. Until then, polls answered by
+another worker show progress but no results.
+"""
+
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Optional
+
+from cache import cache, make_key, MISS
+from config import settings
+from exceptions import ValidationError
+from logger import get_logger
+import pipeline
+import rate_limit
+from ai_engine import PainCardBatcher
+from schemas import BatchItemResult, BatchJobStatus
+from validators import validate_ticker
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class BatchJob:
+    job_id: str
+    tickers: list[str]
+    results: list[BatchItemResult] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def status(self) -> str:
+        return "completed" if self.finished_at is not None else "running"
+
+    def snapshot(self, offset: int = 0, with_results: bool = True) -> BatchJobStatus:
+        results = self.results[offset:] if with_results else []
+        return BatchJobStatus(
+            job_id=self.job_id,
+            status=self.status,
+            total=len(self.tickers),
+            completed=len(self.results),
+            failed=sum(1 for r in self.results if r.status == "error"),
+            results=results,
+            next_offset=offset + len(results),
+        )
+
+
+_jobs: dict[str, BatchJob] = {}
+
+
+def _page(status: BatchJobStatus, offset: int) -> BatchJobStatus:
+    results = status.results[offset:]
+    return status.model_copy(update={"results": results, "next_offset": offset + len(results)})
+
+
+async def _publish(job: BatchJob, with_results: bool = True) -> None:
+    status = job.snapshot(with_results=with_results)
+    await cache.set(make_key("batch_job", job.job_id), status.model_dump(mode="json"))
+
+
+async def _publish_progress(job: BatchJob) -> None:
+    # Counts only: republishing every result on each tick would grow with the batch.
+    while True:
+        await _publish(job, with_results=False)
+        await asyncio.sleep(settings.batch_publish_interval)
+
+
+def _prune_jobs() -> None:
+    finished = sorted(
+        (job for job in _jobs.values() if job.finished_at is not None),
+        key=lambda job: job.finished_at,
+    )
+    while len(_jobs) > settings.batch_job_retention and finished:
+        del _jobs[finished.pop(0).job_id]
+
+
+async def _run_job(job: BatchJob, tickers: list[str]) -> None:
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for ticker in tickers:
+        queue.put_nowait(ticker)
+
+    # Pack the Gemini stage of concurrent workers into multi-company prompts.
+    batcher = PainCardBatcher() if settings.gemini_batch_enabled else None
+    generate_cards = batcher.generate if batcher else None
+
+    async def worker() -> None:
+        while not queue.empty():
+            ticker = queue.get_nowait()
+            try:
+                assessment = await pipeline.run_assessment(ticker, generate_cards)
+                job.results.append(BatchItemResult(ticker=ticker, status="done", assessment=assessment))
+            except Exception as e:
+                logger.error("Batch %s: assessment failed for %s: %s", job.job_id, ticker, e)
+                job.results.append(BatchItemResult(ticker=ticker, status="error", error=pipeline.error_detail(e)))
+
+    workers = min(settings.batch_max_concurrency, queue.qsize())
+    publisher = asyncio.create_task(_publish_progress(job)) if cache.shared else None
+    try:
+        # Queue behind interactive requests for rate-limited upstreams.
+        with rate_limit.priority(rate_limit.BATCH):
+            await asyncio.gather(*(worker() for _ in range(workers)))
+    finally:
+        job.finished_at = time.time()
+        if publisher is not None:
+            publisher.cancel()
+            await _publish(job)
+        logger.info("Batch %s finished: %s tickers in %.1fs%s", job.job_id, len(job.results),
+                    job.finished_at - job.created_at,
+                    f" using {batcher.calls} batched Gemini calls" if batcher else "")
+
+
+def start_job(raw_tickers: list[str]) -> BatchJob:
+    """Validate and de-duplicate ``raw_tickers`` and start assessing them in the background."""
+    if not raw_tickers:
+        raise ValidationError("At least one ticker is required")
+
+    tickers: list[str] = []
+    invalid: list[BatchItemResult] = []
+    seen: set[str] = set()
+    for raw in raw_tickers:
+        try:
+            ticker = validate_ticker(raw)
+        except ValidationError as e:
+            ticker = (raw or "").strip().upper()
+            if ticker not in seen:
+                invalid.append(BatchItemResult(ticker=ticker, status="error", error=str(e)))
+        if ticker not in seen:
+            seen.add(ticker)
+            tickers.append(ticker)
+
+    if len(tickers) > settings.batch_max_tickers:
+        raise ValidationError(f"A batch may contain at most {settings.batch_max_tickers} tickers")
+
+    _prune_jobs()
+    job = BatchJob(job_id=uuid.uuid4().hex, tickers=tickers, results=invalid)
+    _jobs[job.job_id] = job
+    failed = {r.ticker for r in invalid}
+    job.task = asyncio.create_task(_run_job(job, [t for t in tickers if t not in failed]))
+    logger.info("Batch %s started with %s unique tickers", job.job_id, len(tickers))
+    return job
+
+
+def get_job(job_id: str) -> Optional[BatchJob]:
+    return _jobs.get(job_id)
+
+
+async def get_job_status(job_id: str, offset: int = 0) -> Optional[BatchJobStatus]:
+    """Status of a job started by this or, through the shared cache, any other worker."""
+    job = get_job(job_id)
+    if job is not None:
+        return job.snapshot(offset)
+    published = await cache.get(make_key("batch_job", job_id), shared_only=True)
+    if published is MISS:
+        return None
+    return _page(BatchJobStatus(**published), offset)
@@ -0,0 +1,163 @@
+"""Benchmark the compiled industry classifier against the old if/elif chain.
+
+Usage (from backend/):
+
+    python benchmarks/bench_classifier.py [PROFILES] [--fetch] [--repeat 5]
+
+PROFILES is a saved FMP profile universe, either a JSON array of profile
+objects or the CSV from FMP's bulk profile endpoint. It defaults to
+benchmarks/fmp_profiles.json. ``--fetch`` downloads the bulk file into that
+path first (FMP_API_KEY must be set). Without a fixture, a synthetic universe
+of similar size and name distribution is generated.
+
+The script reports profiles/second for the legacy chain, for per-profile
+``classify_company`` and for ``classify_many``. It also reports how many
+profiles the table-driven classifier assigns a different group than the legacy
+chain did, broken down by (legacy, new) pair.
+"""
+
+import argparse
+import collections
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import classifier  # noqa: E402
+from classification_rules import (  # noqa: E402
+    FSI, INDUSTRY_GROUPS, LSHC, PROFESSIONAL_SERVICES, TMT,
+)
+
+DEFAULT_FIXTURE = Path(__file__).resolve().parent / "fmp_profiles.json"
+BULK_PROFILE_URL = "https://financialmodelingprep.com/api/v4/profile/all"
+UNIVERSE_SIZE = 70000
+GROUP_SECTORS = {
+    TMT: ["Technology", "Communication Services"],
+    FSI: ["Financial Services"],
+    LSHC: ["Healthcare"],
+    PROFESSIONAL_SERVICES: ["Industrials"],
+}
+OTHER_SECTORS = ["Consumer Cyclical", "Consumer Defensive", "Industrials", "Energy", "Basic Materials",
+                 "Real Estate", "Utilities", "Services", ""]
+OTHER_INDUSTRIES = ["Auto Parts", "Oil & Gas E&P", "Specialty Retail", "REIT - Office", "Restaurants",
+                    "Aerospace & Defense", "Chemicals", "Utilities - Regulated Electric", "Business Equipment",
+                    "Streaming Media", ""]
+DESCRIPTIONS = [
+    "The company designs, manufactures and sells products in the United States.",
+    "A global provider of solutions with international operations in over 40 countries.",
+    "Operates a network of regional locations serving domestic customers.",
+    "Serves customers worldwide through subsidiaries and distributors.",
+]
+
+
+def legacy_classify(profile: dict) -> tuple[str, str]:
+    """The original hard-coded chain, kept for comparison."""
+    industry = (profile.get("industry") or "").lower()
+    sector = (profile.get("sector") or "").lower()
+    description = (profile.get("description") or "").lower()
+    country = (profile.get("country") or "").upper()
+
+    classified_industry = "C&IP (Consumer & Industrial Products)"
+    if "tech" in sector or "communication" in sector or "software" in industry or "media" in industry or "entertainment" in industry:
+        classified_industry = "TMT (Technology, Media & Telecom)"
+    elif "financial" in sector or "insurance" in industry or "asset management" in industry:
+        classified_industry = "FSI (Financial Services Industry)"
+    elif "healthcare" in sector or "pharmaceuticals" in industry or "biotechnology" in industry:
+        classified_industry = "LSHC (Life Sciences & Health Care)"
+    elif "services" in sector and "business" in industry:
+        classified_industry = "Professional Services"
+
+    geo_scope = "More than 5 countries"
+    if country == "US":
+        if "global" not in description and "international" not in description and "worldwide" not in description:
+            geo_scope = "US-based only"
+    return classified_industry, geo_scope
+
+
+def synthetic_universe(size: int = UNIVERSE_SIZE, seed: int = 11) -> list[dict]:
+    """Profiles whose industry and sector agree, as in FMP's data."""
+    rng = random.Random(seed)
+    pairs = [(name.title(), sector) for name, group in INDUSTRY_GROUPS.items() for sector in GROUP_SECTORS[group]]
+    pairs += [(industry, sector) for industry in OTHER_INDUSTRIES for sector in OTHER_SECTORS]
+    profiles = []
+    for n in range(size):
+        industry, sector = rng.choice(pairs)
+        profiles.append({
+            "symbol": f"S{n}",
+            "industry": industry,
+            "sector": sector,
+            "country": rng.choice(["US", "US", "US", "CA", "GB", "DE", "JP", None]),
+            "description": " ".join(rng.choices(DESCRIPTIONS, k=3)),
+        })
+    return profiles
+
+
+def load_profiles(path: Path) -> list[dict]:
+    text = path.read_text(encoding="utf-8")
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def fetch_profiles(path: Path) -> None:
+    import httpx
+
+    response = httpx.get(BULK_PROFILE_URL, params={"apikey": os.environ["FMP_API_KEY"]}, timeout=300.0)
+    response.raise_for_status()
+    path.write_bytes(response.content)
+
+
+def timed(fn, profiles: list[dict], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(profiles)
+    return len(profiles) * repeat / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("profiles", nargs="?", type=Path, default=DEFAULT_FIXTURE)
+    parser.add_argument("--fetch", action="store_true", help="download FMP's bulk profiles into PROFILES first")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_profiles(args.profiles)
+    if args.profiles.exists():
+        profiles, source = load_profiles(args.profiles), args.profiles.name
+    else:
+        profiles, source = synthetic_universe(), "synthetic"
+    print(f"{len(profiles)} profiles ({source})")
+
+    fresh = classifier.CompiledClassifier(classifier.INDUSTRY_GROUPS, classifier.SECTOR_GROUPS,
+                                          classifier.FRAGMENT_RULES, classifier.GLOBAL_CUES)
+    start = time.perf_counter()
+    fresh.classify(profiles[0])
+    print(f"compile + first call: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    runs = [
+        ("legacy chain", lambda ps: [legacy_classify(p) for p in ps]),
+        ("classify_company", lambda ps: [classifier.classify_company(p) for p in ps]),
+        ("classify_many", classifier.classify_many),
+    ]
+    for name, fn in runs:
+        print(f"{name:<18} {timed(fn, profiles, args.repeat):>12,.0f} profiles/s")
+
+    changes = collections.Counter()
+    for profile in profiles:
+        old, new = legacy_classify(profile), classifier.classify_company(profile)
+        if old != new:
+            changes[(old[0], new[0]) if old[0] != new[0] else (old[1], new[1])] += 1
+    print(f"\n{sum(changes.values())} profiles classified differently from the legacy chain")
+    for (old, new), count in changes.most_common(10):
+        print(f"  {count:>7}  {old} -> {new}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Per-request setup overhead: fresh clients vs. the shared client registry.
+
+Usage (from backend/):
+
+    python benchmarks/bench_client_reuse.py [--requests 200]
+
+Starts a local HTTPS server (self-signed certificate generated with the
+openssl CLI; plain HTTP if openssl is unavailable) and times identical GETs
+made with a new httpx client per request versus one pooled keep-alive
+client. It also times Gemini SDK setup (``genai.configure`` plus
+``GenerativeModel``) per request versus reusing one model. That setup is
+cheap by itself; its real cost is that ``configure`` discards the SDK's
+cached transport, so the next call opens a new channel and TLS session,
+which is what the HTTP numbers approximate. No network access or API keys
+are needed.
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import ssl
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+async def _app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b'[{"symbol": "AAPL"}]'})
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _self_signed_cert(directory: str):
+    if not shutil.which("openssl"):
+        return None
+    cert, key = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=IP:127.0.0.1",
+         "-keyout", key, "-out", cert],
+        check=True, capture_output=True,
+    )
+    return cert, key
+
+
+def _start_server(port: int, cert_files) -> uvicorn.Server:
+    kwargs = {"ssl_certfile": cert_files[0], "ssl_keyfile": cert_files[1]} if cert_files else {}
+    server = uvicorn.Server(uvicorn.Config(_app, host="127.0.0.1", port=port, log_level="error", **kwargs))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def _summary(label: str, samples: list[float]) -> None:
+    ms = sorted(s * 1000 for s in samples)
+    print(f"{label:<40} mean {statistics.mean(ms):8.3f} ms   p50 {ms[len(ms) // 2]:8.3f} ms   "
+          f"p95 {ms[int(len(ms) * 0.95)]:8.3f} ms")
+
+
+async def _bench_http(url: str, verify, n: int) -> None:
+    fresh = []
+    for _ in range(n):
+        start = time.perf_counter()
+        async with httpx.AsyncClient(verify=verify) as client:
+            (await client.get(url)).raise_for_status()
+        fresh.append(time.perf_counter() - start)
+
+    pooled = []
+    async with httpx.AsyncClient(verify=verify) as client:
+        await client.get(url)  # open the keep-alive connection once
+        for _ in range(n):
+            start = time.perf_counter()
+            (await client.get(url)).raise_for_status()
+            pooled.append(time.perf_counter() - start)
+
+    _summary("HTTP: new client per request", fresh)
+    _summary("HTTP: shared keep-alive client", pooled)
+
+
+def _bench_gemini(n: int) -> None:
+    import google.generativeai as genai
+
+    fresh = []
+    for _ in range(n):
+        start = time.perf_counter()
+        genai.configure(api_key="benchmark-key")
+        genai.GenerativeModel("gemini-1.5-flash")
+        fresh.append(time.perf_counter() - start)
+
+    os.environ.setdefault("GOOGLE_API_KEY", "benchmark-key")
+    os.environ.setdefault("FMP_API_KEY", "benchmark-key")
+    from clients import ClientRegistry
+    registry = ClientRegistry()
+
+    async def reuse() -> list[float]:
+        await registry.gemini_model()
+        timings = []
+        for _ in range(n):
+            start = time.perf_counter()
+            await registry.gemini_model()
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    reused = asyncio.run(reuse())
+
+    _summary("Gemini: configure + model per request", fresh)
+    _summary("Gemini: registry model", reused)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cert_files = _self_signed_cert(tmp)
+        port = _free_port()
+        server = _start_server(port, cert_files)
+        scheme = "https" if cert_files else "http"
+        verify = ssl.create_default_context(cafile=cert_files[0]) if cert_files else True
+        print(f"{args.requests} requests against {scheme}://127.0.0.1:{port}\n")
+        try:
+            asyncio.run(_bench_http(f"{scheme}://127.0.0.1:{port}/profile/AAPL", verify, args.requests))
+        finally:
+            server.should_exit = True
+    _bench_gemini(args.requests)
+
+
+if __name__ == "__main__":
+    main()
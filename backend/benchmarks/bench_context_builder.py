@@ -0,0 +1,122 @@
+"""Compare the token-budgeted context builder with the old 3000-word truncation.
+
+Usage (from backend/):
+
+    python benchmarks/bench_context_builder.py [CORPUS_DIR] [--budget 2500] [--live]
+
+CORPUS_DIR holds saved 10-K documents (*.htm / *.html); it defaults to
+benchmarks/filings. Without filings, a synthetic risk-factor section is
+generated. Most of its paragraphs are boilerplate, and the taxonomy-relevant
+ones are scattered through it, as they are in real filings.
+
+For each document, the script reports prompt size (estimated tokens), the
+scope tiles the context can trigger, and the build time. With ``--live`` (and
+GOOGLE_API_KEY set) it also times a real Gemini call with each prompt.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("FMP_API_KEY", "benchmark")
+
+import context_builder  # noqa: E402
+from filing_parser import RiskFactorExtractor, join_paragraphs  # noqa: E402
+from scope_engine import DEFAULT_RULES  # noqa: E402
+from taxonomy import KEYWORD_RULES, PAIN_THEME_RULES  # noqa: E402
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent / "filings"
+BOILERPLATE = [
+    "Our business, financial condition and results of operations could be adversely affected by a number of factors.",
+    "Investors should carefully consider the risks described below before making an investment decision.",
+    "We operate in a highly regulated environment and changes in laws could affect our operations.",
+    "The market price of our common stock may be volatile and could decline significantly.",
+    "We depend on the continued service of our executive officers and other key employees.",
+    "Natural disasters, pandemics or other catastrophic events could disrupt our operations.",
+]
+
+
+def synthetic_risk_factors(n_paragraphs: int = 600, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    vocabulary = list(KEYWORD_RULES) + list(PAIN_THEME_RULES)
+    paragraphs = []
+    for _ in range(n_paragraphs):
+        sentences = rng.sample(BOILERPLATE, 3)
+        if rng.random() < 0.15:
+            sentences.insert(1, f"In particular, {rng.choice(vocabulary)} and {rng.choice(vocabulary)} "
+                                f"may pressure our margins and cash flow.")
+        paragraphs.append(" ".join(sentences))
+    return "\n".join(paragraphs)
+
+
+def load_documents(corpus: Path) -> list[tuple[str, str]]:
+    documents = []
+    for path in sorted(corpus.glob("*.htm*")) if corpus.is_dir() else []:
+        extractor = RiskFactorExtractor()
+        extractor.feed_bytes(path.read_bytes())
+        text = join_paragraphs(extractor.paragraphs())
+        if text:
+            documents.append((path.name, text))
+    return documents or [("synthetic", synthetic_risk_factors())]
+
+
+def naive_context(text: str) -> str:
+    """The original behaviour: the first 3000 words, whatever they are."""
+    return " ".join(text.split()[:3000])
+
+
+def tiles_covered(context: str) -> set[str]:
+    tiles, _ = DEFAULT_RULES.match(context.lower(), "")
+    return tiles
+
+
+def timed(fn, *args, repeat: int = 20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return result, (time.perf_counter() - start) / repeat
+
+
+async def gemini_latency(context: str) -> float:
+    import ai_engine
+    from clients import registry
+
+    model = await registry.gemini_model()
+    start = time.perf_counter()
+    await model.generate_content_async(ai_engine._build_prompt(context, "Benchmark Co"))
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("corpus", nargs="?", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--budget", type=int, default=2500, help="token budget for the context builder")
+    parser.add_argument("--live", action="store_true", help="also time real Gemini calls")
+    args = parser.parse_args()
+
+    all_tiles = {t for tiles in list(KEYWORD_RULES.values()) + list(PAIN_THEME_RULES.values()) for t in tiles}
+    print(f"{'document':<24} {'method':<10} {'tokens':>7} {'tiles':>9} {'build ms':>9}" +
+          (f" {'gemini s':>9}" if args.live else ""))
+    for name, text in load_documents(args.corpus):
+        available = len(tiles_covered(text))
+        print(f"{name[:24]:<24} {'full':<10} {context_builder.estimate_tokens(text):>7} "
+              f"{available:>4}/{available:<4} {'-':>9}")
+        for method, build in (("naive", naive_context),
+                              ("budgeted", lambda t: context_builder.build_context(t, args.budget))):
+            context, seconds = timed(build, text)
+            line = (f"{name[:24]:<24} {method:<10} {context_builder.estimate_tokens(context):>7} "
+                    f"{len(tiles_covered(context)):>4}/{available:<4} {seconds * 1000:>9.2f}")
+            if args.live:
+                line += f" {asyncio.run(gemini_latency(context)):>9.2f}"
+            print(line)
+    print(f"(taxonomy defines {len(all_tiles)} tiles)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Cost of near-duplicate merging on top of plain scope mapping.
+
+Usage (from backend/):
+
+    python benchmarks/bench_dedup.py [--companies 200] [--cards 8]
+
+Each synthetic company gets ``--cards`` cards drawn from a small pool of
+themes, each reworded by shuffling and dropping words, so cards repeat both
+within and across companies the way Gemini's do. The script reports
+per-card time for plain scope mapping and for ``scope_and_merge``, plus how
+many cards were merged.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import dedup  # noqa: E402
+from scope_engine import process_scope_and_cards  # noqa: E402
+
+THEMES = [
+    "rising input costs squeeze gross margin as raw material and freight prices climb",
+    "manual month end close and reconciliation delay financial reporting",
+    "supply chain disruption leaves inventory visibility poor across warehouses",
+    "legacy erp systems limit real time data and slow decision making",
+    "cybersecurity threats and data privacy regulation raise compliance costs",
+    "talent shortages and wage inflation strain workforce planning",
+    "currency volatility and interest rates complicate treasury and cash management",
+    "customer churn rises as digital channels fail to meet expectations",
+]
+
+
+def reword(rng: random.Random, theme: str) -> dict:
+    words = theme.split()
+    kept = [w for w in words if rng.random() > 0.15]
+    rng.shuffle(kept)
+    return {"title": " ".join(kept[:6]).capitalize(), "blurb": " ".join(kept) + "."}
+
+
+def companies(count: int, cards: int) -> list[list[dict]]:
+    rng = random.Random(7)
+    return [[reword(rng, rng.choice(THEMES)) for _ in range(cards)] for _ in range(count)]
+
+
+def timed(run) -> float:
+    started = time.perf_counter()
+    run()
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--companies", type=int, default=200)
+    parser.add_argument("--cards", type=int, default=8)
+    args = parser.parse_args()
+
+    batch = companies(args.companies, args.cards)
+    total = args.companies * args.cards
+    kept = []
+    plain = timed(lambda: [process_scope_and_cards([dict(c) for c in cards]) for cards in batch])
+    merged = timed(lambda: kept.extend(len(dedup.scope_and_merge([dict(c) for c in cards])[0]) for cards in batch))
+
+    print(f"{args.companies} companies x {args.cards} cards; {total - sum(kept)} of {total} cards merged")
+    print(f"  scope mapping only          {plain / total * 1e6:8.1f} us/card")
+    print(f"  scope_and_merge             {merged / total * 1e6:8.1f} us/card")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Cost of reading a 10-K section from the filing store versus parsing the filing again.
+
+Usage (from backend/):
+
+    python benchmarks/bench_filing_store.py [--paragraphs 4000] [--reads 200]
+
+The script uses the synthetic 10-K from ``bench_risk_factors``. It reports:
+
+* parse: one ``SectionIndexer`` pass over the whole document, the work every
+  new section used to cost on top of the download;
+* store: packing and writing the sections once;
+* read: slicing and decompressing Item 7 and Item 7A from the store.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_risk_factors import CHUNK_SIZE, synthetic_filing  # noqa: E402
+from filing_parser import SectionIndexer  # noqa: E402
+from filing_store import FilingStore  # noqa: E402
+
+
+def index(raw: bytes) -> dict[str, str]:
+    indexer = SectionIndexer()
+    for i in range(0, len(raw), CHUNK_SIZE):
+        indexer.feed_bytes(raw[i:i + CHUNK_SIZE])
+    return indexer.sections()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--paragraphs", type=int, default=4000)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    raw = synthetic_filing(args.paragraphs)
+    started = time.perf_counter()
+    sections = index(raw)
+    parse_ms = (time.perf_counter() - started) * 1000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = FilingStore(str(Path(tmp) / "filings.db"), max_bytes=1 << 30)
+        started = time.perf_counter()
+        stored = store.put("bench", "https://sec.test/10k.htm", sections)
+        store_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        for _ in range(args.reads):
+            store.section("bench", "7")
+        read_ms = (time.perf_counter() - started) * 1000 / args.reads
+        started = time.perf_counter()
+        for _ in range(args.reads):
+            store.section("bench", "7A")
+        small_read_ms = (time.perf_counter() - started) * 1000 / args.reads
+
+    print(f"filing: {len(raw) / 1e6:.1f} MB HTML, {len(sections)} sections, "
+          f"{sum(len(t) for t in sections.values()) / 1e6:.1f} MB text, {stored / 1e6:.2f} MB stored")
+    print(f"  parse whole filing        {parse_ms:9.1f} ms")
+    print(f"  store sections (once)     {store_ms:9.1f} ms")
+    print(f"  read Item 7 from store    {read_ms:9.2f} ms")
+    print(f"  read Item 7A from store   {small_read_ms:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Time re-scoping a populated assessment store after a taxonomy edit.
+
+Usage (from backend/):
+
+    python benchmarks/bench_rescope.py [--companies 10000] [--store PATH]
+
+The script fills a fresh store (a temporary file unless ``--store`` is given)
+with synthetic companies, eight raw pain cards each, scored with the current
+taxonomy. It then simulates an edit by adding one keyword rule, and times
+``AssessmentStore.rescope``. That run makes no network calls and only
+rewrites the companies whose tiles change. It also times the no-op rescope
+that follows.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("FMP_API_KEY", "benchmark")
+
+from assessment_store import AssessmentStore, StoredAssessment, pack, rescore, scope_version  # noqa: E402
+from classifier import DEFAULT_CLASSIFIER  # noqa: E402
+from scope_engine import CompiledScopeRules  # noqa: E402
+from taxonomy import KEYWORD_RULES, PAIN_THEME_RULES  # noqa: E402
+
+PHRASES = list(KEYWORD_RULES) + list(PAIN_THEME_RULES) + ["legacy systems", "talent shortages", "tariffs"]
+FILLER = ("Rising costs and slower growth weigh on results while management works to modernise "
+          "processes across business units.")
+
+
+def synthetic_cards(rng: random.Random) -> list[dict]:
+    return [{
+        "title": f"{rng.choice(PHRASES).capitalize()} pressure",
+        "blurb": f"{FILLER} Exposure to {rng.choice(PHRASES)} and {rng.choice(PHRASES)} persists."[:280],
+    } for _ in range(8)]
+
+
+def populate(store: AssessmentStore, companies: int, rules: CompiledScopeRules) -> None:
+    rng = random.Random(3)
+    profile = {"industry": "Semiconductors", "sector": "Technology", "country": "US", "description": "Global."}
+    conn = store._connection()
+    with conn:
+        for n in range(companies):
+            record = StoredAssessment(f"T{n}", "0001", profile, synthetic_cards(rng), {}, "", "")
+            assessment = rescore(record, rules)
+            conn.execute(
+                "INSERT OR REPLACE INTO assessments (ticker, filing_id, profile, raw_cards, assessment, "
+                "taxonomy_version, classifier_version, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (record.ticker, record.filing_id, *map(pack, (profile, record.raw_cards, assessment)),
+                 scope_version(rules), DEFAULT_CLASSIFIER.version),
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--companies", type=int, default=10000)
+    parser.add_argument("--store", type=Path, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.store or Path(tmp) / "assessments.db"
+        store = AssessmentStore(str(path))
+        rules = CompiledScopeRules(PAIN_THEME_RULES, KEYWORD_RULES)
+        started = time.perf_counter()
+        populate(store, args.companies, rules)
+        print(f"populated {store.count()} companies in {time.perf_counter() - started:.1f}s "
+              f"({path.stat().st_size / 2**20:.1f} MiB)")
+
+        edited = CompiledScopeRules(PAIN_THEME_RULES, {**KEYWORD_RULES, "tariffs": ["SCM-PROC"]})
+        started = time.perf_counter()
+        stats = store.rescope(edited)
+        print(f"rescope after edit: {time.perf_counter() - started:.2f}s, "
+              f"{stats.scanned} scanned, {stats.rewritten} rewritten, {stats.unchanged} unchanged")
+
+        started = time.perf_counter()
+        stats = store.rescope(edited)
+        print(f"rescope with nothing stale: {(time.perf_counter() - started) * 1000:.1f} ms, {stats.scanned} scanned")
+
+
+if __name__ == "__main__":
+    main()
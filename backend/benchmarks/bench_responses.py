@@ -0,0 +1,92 @@
+"""Per-request CPU cost of answering with a cached assessment.
+
+Usage (from backend/):
+
+    python benchmarks/bench_responses.py [--cards 8] [--requests 20000]
+
+For a realistic cached assessment, the script compares the work done
+between the cache lookup and the bytes on the wire:
+
+* before: ``AssessmentResponse(**cached)``, then FastAPI's ``response_model``
+  validation and serialization, then ``JSONResponse`` encoding;
+* encoded body: ``response_cache.for_cached`` and ``to_http``, with and
+  without gzip;
+* 304: the same, with a matching ``If-None-Match``.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+os.environ.setdefault("FMP_API_KEY", "benchmark")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+
+import pipeline  # noqa: E402
+import response_cache  # noqa: E402
+from main import app  # noqa: E402
+from schemas import AssessmentResponse, PainCard  # noqa: E402
+
+BLURB = ("Rising input costs and tariff exposure squeeze gross margin, while longer customer payment "
+         "terms strain working capital across the distribution network.")
+
+
+def cached_value(cards: int) -> dict:
+    response = AssessmentResponse(
+        pain_cards=[PainCard(title=f"Margin pressure {n}", blurb=BLURB,
+                             triggered_tiles=["FIN-CTRL", "FIN-TCM", "SCM-PROC"],
+                             triggering_keywords=["margin", "working capital", "tariffs"]) for n in range(cards)],
+        scope_summary="Finance (Controllership, Treasury & Cash Management); Supply Chain (Procurement)",
+        activated_tiles=["FIN-CTRL", "FIN-TCM", "SCM-PROC"],
+        industry="Consumer Electronics", revenue=394328000000.0,
+        classified_industry="TMT (Technology, Media & Telecom)", geo_scope="Global",
+    )
+    return pipeline._cache_value(response)
+
+
+def per_request_us(fn, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        fn()
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--cards", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    cached = cached_value(args.cards)
+    route = next(r for r in app.routes if getattr(r, "path", "") == "/api/v1/assessment/{ticker}")
+    loop = asyncio.new_event_loop()
+
+    def before():
+        content = loop.run_until_complete(
+            serialize_response(field=route.response_field, response_content=AssessmentResponse(**cached)))
+        return JSONResponse(content)
+
+    encoded = response_cache.for_cached(cached)
+    cases = {
+        "before (validate + response_model)": before,
+        "encoded body, identity": lambda: response_cache.to_http(
+            response_cache.for_cached(cached), {"accept-encoding": "identity"}),
+        "encoded body, gzip": lambda: response_cache.to_http(
+            response_cache.for_cached(cached), {"accept-encoding": "gzip, deflate"}),
+        "304 not modified": lambda: response_cache.to_http(
+            response_cache.for_cached(cached), {"if-none-match": encoded.etag}),
+    }
+    print(f"{args.cards} cards, {len(encoded.body)} bytes JSON, "
+          f"{len(encoded.gzip) if encoded.gzip else '-'} bytes gzip")
+    for name, fn in cases.items():
+        print(f"  {name:<36} {per_request_us(fn, args.requests):8.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
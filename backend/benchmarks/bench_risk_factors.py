@@ -0,0 +1,116 @@
+"""Benchmark the streaming risk-factor extractor against the BeautifulSoup one.
+
+Usage (from backend/):
+
+    python benchmarks/bench_risk_factors.py [CORPUS_DIR]
+
+CORPUS_DIR holds saved 10-K documents (*.htm / *.html); it defaults to
+benchmarks/filings. When no filings are found a synthetic 10-K is generated
+so the script still runs. Each extraction runs in a fresh subprocess so the
+reported peak RSS belongs to that implementation alone.
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent / "filings"
+CHUNK_SIZE = 64 * 1024
+
+
+def synthetic_filing(paragraphs_per_item: int = 4000) -> bytes:
+    items = ["1. Business", "1A. Risk Factors", "1B. Unresolved Staff Comments", "2. Properties",
+             "7. Management's Discussion and Analysis", "7A. Quantitative and Qualitative Disclosures",
+             "8. Financial Statements"]
+    body = ["<html><body><table>"]
+    # Like most real filings, the table of contents splits item numbers and titles into cells.
+    body += [
+        f"<tr><td>Item {item.split(' ', 1)[0]}</td><td><a href='#i{n}'>{item.split(' ', 1)[1]}</a></td></tr>"
+        for n, item in enumerate(items)
+    ]
+    body.append("</table>")
+    for n, item in enumerate(items):
+        body.append(f"<h2 id='i{n}'>Item {item}</h2>")
+        for i in range(paragraphs_per_item):
+            body.append(
+                f"<p><span style='font-family:Times'>Paragraph {i} of item {n}: our supply chain, "
+                f"inventory and cash flow are exposed to market volatility &amp; competition.</span></p>"
+            )
+    body.append("</body></html>")
+    return "\n".join(body).encode()
+
+
+def _run_worker(impl: str, path: str) -> None:
+    with open(path, "rb") as f:
+        raw = f.read()
+    start = time.perf_counter()
+    if impl == "soup":
+        from scraper import _extract_risk_factors
+        text = _extract_risk_factors(raw)
+        consumed = len(raw)
+    else:
+        from filing_parser import RiskFactorExtractor
+        extractor = RiskFactorExtractor()
+        for i in range(0, len(raw), CHUNK_SIZE):
+            if extractor.feed_bytes(raw[i:i + CHUNK_SIZE]):
+                break
+        text = extractor.result()
+        consumed = extractor.bytes_consumed
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "seconds": elapsed,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "bytes_read": consumed,
+        "text": text,
+    }))
+
+
+def _measure(impl: str, path: Path) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--worker", impl, str(path)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> None:
+    corpus = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_CORPUS
+    files = sorted(p for p in corpus.glob("*") if p.suffix.lower() in (".htm", ".html")) if corpus.is_dir() else []
+    tmp = None
+    if not files:
+        tmp = tempfile.NamedTemporaryFile(suffix=".htm", delete=False)
+        tmp.write(synthetic_filing())
+        tmp.close()
+        files = [Path(tmp.name)]
+        print(f"No filings found in {corpus}; using a synthetic 10-K.")
+
+    header = f"{'filing':<32} {'size MB':>8} {'impl':>9} {'seconds':>8} {'RSS MB':>8} {'read MB':>8} {'chars':>9}  same"
+    print(header)
+    print("-" * len(header))
+    try:
+        for path in files:
+            size_mb = path.stat().st_size / 1e6
+            soup = _measure("soup", path)
+            stream = _measure("stream", path)
+            same = soup["text"] == stream["text"]
+            for impl, r in (("soup", soup), ("streaming", stream)):
+                print(f"{path.name[:32]:<32} {size_mb:>8.2f} {impl:>9} {r['seconds']:>8.3f} "
+                      f"{r['max_rss_mb']:>8.1f} {r['bytes_read'] / 1e6:>8.2f} {len(r['text']):>9}  {same}")
+    finally:
+        if tmp is not None:
+            os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--worker":
+        _run_worker(sys.argv[2], sys.argv[3])
+    else:
+        main()
@@ -0,0 +1,98 @@
+"""Micro-benchmark: compiled scope matcher vs. the per-keyword substring loop.
+
+Usage (from backend/):
+
+    python benchmarks/bench_scope_engine.py [--keywords 5000] [--cards 2000]
+
+Builds a synthetic taxonomy with the requested number of keywords (plus a
+tenth as many themes), maps the same synthetic pain cards with both
+implementations, checks the results are identical and reports timings.
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scope_engine import CompiledScopeRules, process_scope_and_cards  # noqa: E402
+
+TILES = ["FIN-CTRL", "FIN-FPA", "FIN-TCM", "FIN-MDM", "FIN-P2P", "COM-RAR", "COM-OM", "COM-INV",
+         "COM-ATP", "SCM-DPF", "SCM-IM", "SCM-WMS", "SCM-TRA", "OPS-PP", "OPS-EXEC", "OPS-QM", "OPS-PM"]
+WORDS = ["supply", "chain", "cash", "flow", "margin", "inventory", "forecast", "revenue", "cost",
+         "pressure", "data", "close", "planning", "logistics", "quality", "asset", "customer", "order",
+         "treasury", "invoice", "procurement", "warehouse", "production", "volatility", "churn", "compliance"]
+
+
+def _phrase(rng: random.Random, n_words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n_words)) + f" {rng.randrange(10**6)}"
+
+
+def synthetic_rules(n_keywords: int, rng: random.Random) -> tuple[dict, dict]:
+    keywords = {_phrase(rng, rng.randint(1, 3)): rng.sample(TILES, rng.randint(1, 3)) for _ in range(n_keywords)}
+    # Keep some short real words so cards actually trigger tiles.
+    keywords.update({w: [rng.choice(TILES)] for w in WORDS})
+    themes = {_phrase(rng, 2): rng.sample(TILES, 1) for _ in range(max(1, n_keywords // 10))}
+    return themes, keywords
+
+
+def synthetic_cards(n_cards: int, rng: random.Random) -> list[dict]:
+    return [{"title": " ".join(rng.choice(WORDS) for _ in range(4)).title(),
+             "blurb": " ".join(rng.choice(WORDS) for _ in range(30))} for _ in range(n_cards)]
+
+
+def naive_process(raw_cards, theme_rules, keyword_rules):
+    """The original scope_engine loop, kept here as the baseline."""
+    enriched_cards, all_tiles = [], set()
+    for card_data in raw_cards:
+        title_text = card_data.get('title', '').lower()
+        blurb_text = card_data.get('blurb', '').lower()
+        tiles, keywords = set(), set()
+        for theme, modules in theme_rules.items():
+            if theme in title_text:
+                keywords.add(theme)
+                tiles.update(modules)
+        for keyword, modules in keyword_rules.items():
+            if keyword in f"{title_text} {blurb_text}":
+                keywords.add(keyword)
+                tiles.update(modules)
+        card_data['triggered_tiles'] = sorted(tiles)
+        card_data['triggering_keywords'] = sorted(keywords)
+        enriched_cards.append(card_data)
+        all_tiles.update(tiles)
+    return enriched_cards, sorted(all_tiles)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keywords", type=int, default=5000)
+    parser.add_argument("--cards", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    themes, keywords = synthetic_rules(args.keywords, rng)
+    cards = synthetic_cards(args.cards, rng)
+
+    start = time.perf_counter()
+    rules = CompiledScopeRules(themes, keywords)
+    compile_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = naive_process([dict(c) for c in cards], themes, keywords)
+    naive_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = process_scope_and_cards([dict(c) for c in cards], rules)
+    compiled_s = time.perf_counter() - start
+
+    print(f"taxonomy: {len(keywords)} keywords, {len(themes)} themes; {len(cards)} cards")
+    print(f"compile once:        {compile_s * 1000:9.1f} ms")
+    print(f"substring loop:      {naive_s * 1000:9.1f} ms  ({naive_s / len(cards) * 1e6:8.1f} us/card)")
+    print(f"compiled automaton:  {compiled_s * 1000:9.1f} ms  ({compiled_s / len(cards) * 1e6:8.1f} us/card)")
+    print(f"speed-up: {naive_s / compiled_s:.1f}x, identical output: {expected == actual}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Measure how long a fresh interpreter takes to import the app and to become healthy.
+
+Usage (from backend/):
+
+    python benchmarks/bench_startup.py [--repeat 5] [--top 15] [--port 8766]
+                                       [--max-import-ms N] [--max-healthy-ms N]
+
+Each run imports ``main`` in a new ``python -X importtime`` process. That
+cost is paid once per worker without ``preload_app``, and once in the
+gunicorn master with it. The script reports the median wall time, then the
+modules with the largest cumulative import time in the median run.
+
+It then starts ``uvicorn main:app`` the same number of times and measures
+the time from process start to the first ``200`` from ``/health``. This is
+the cold start an autoscaled container pays.
+
+With ``--max-import-ms`` or ``--max-healthy-ms``, the script exits with
+status 1 when the median exceeds that budget, so CI can track both numbers
+as regressions.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+ENV = {**os.environ, "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "benchmark"),
+       "FMP_API_KEY": os.environ.get("FMP_API_KEY", "benchmark")}
+
+
+def import_once() -> tuple[float, str]:
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=BACKEND, env=ENV,
+                            capture_output=True, text=True, check=True)
+    return time.perf_counter() - started, result.stderr
+
+
+def healthy_once(port: int) -> float:
+    """Seconds from spawning ``uvicorn main:app`` to its first successful ``/health``."""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND, env=ENV, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            if server.poll() is not None or time.perf_counter() - started > 60:
+                raise RuntimeError("uvicorn exited or never became healthy")
+            time.sleep(0.005)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def slowest_imports(report: str, top: int) -> list[tuple[int, str]]:
+    """(cumulative microseconds, module) for ``main`` and its direct imports, largest first."""
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        # Nesting is shown as two spaces per level; keep ``main`` and what it imports directly.
+        if len(name) - len(name.lstrip()) <= 2:
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def summary(name: str, seconds: list[float]) -> float:
+    median = statistics.median(seconds) * 1000
+    print(f"{name}: median {median:.0f} ms over {len(seconds)} runs "
+          f"(min {min(seconds) * 1000:.0f}, max {max(seconds) * 1000:.0f}, "
+          f"stdev {statistics.pstdev(seconds) * 1000:.0f})")
+    return median
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--max-import-ms", type=float)
+    parser.add_argument("--max-healthy-ms", type=float)
+    args = parser.parse_args()
+
+    runs = sorted((import_once() for _ in range(args.repeat)), key=lambda run: run[0])
+    import_ms = summary("import main", [run[0] for run in runs])
+    print("\nslowest imports (cumulative ms):")
+    for micros, name in slowest_imports(runs[len(runs) // 2][1], args.top):
+        print(f"  {micros / 1000:8.1f}  {name}")
+
+    print()
+    healthy_ms = summary("first healthy /health", [healthy_once(args.port) for _ in range(args.repeat)])
+
+    over = [f"{label} {value:.0f} ms > {budget:.0f} ms"
+            for label, value, budget in (("import", import_ms, args.max_import_ms),
+                                         ("healthy", healthy_ms, args.max_healthy_ms))
+            if budget is not None and value > budget]
+    if over:
+        print("\nover budget: " + "; ".join(over))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Compare gunicorn startup time and memory per worker with and without preloading.
+
+Usage (from backend/, Linux only):
+
+    python benchmarks/bench_workers.py [--workers 4] [--port 8765]
+
+For each mode the script starts ``gunicorn main:app`` with the production
+config (``gunicorn.conf.py``), once with ``preload_app`` and once without. It
+times how long it takes until every worker has finished application startup.
+It then sends a few requests, so each worker has served traffic, and reads
+``/proc/<pid>/smaps_rollup`` for the master and each worker:
+
+* RSS: resident memory, counting shared pages in full;
+* PSS: shared pages split between the processes sharing them;
+* USS: pages private to the process, i.e. what one more worker costs.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parent.parent
+STARTUP_LINE = re.compile(rb"Application startup complete")
+
+
+def memory_kib(pid: int) -> dict[str, int]:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {"rss": fields["Rss"], "pss": fields["Pss"],
+            "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)}
+
+
+def children(pid: int) -> list[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+
+def run_mode(preload: bool, workers: int, port: int) -> dict:
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as config:
+        config.write(f"exec(open({str(BACKEND / 'gunicorn.conf.py')!r}).read())\npreload_app = {preload}\n")
+    env = {**os.environ, "WEB_CONCURRENCY": str(workers), "SERVER_BIND": f"127.0.0.1:{port}",
+           "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "benchmark"),
+           "FMP_API_KEY": os.environ.get("FMP_API_KEY", "benchmark")}
+    log = tempfile.TemporaryFile()
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "-c", config.name, "main:app"],
+                              cwd=BACKEND, env=env, stdout=log, stderr=subprocess.STDOUT)
+    try:
+        while True:
+            log.seek(0)
+            if len(STARTUP_LINE.findall(log.read())) >= workers:
+                break
+            if server.poll() is not None or time.perf_counter() - started > 120:
+                log.seek(0)
+                raise RuntimeError(f"gunicorn did not start:\n{log.read().decode(errors='replace')[-2000:]}")
+            time.sleep(0.01)
+        ready = time.perf_counter() - started
+
+        for _ in range(workers * 10):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics").read()
+        worker_memory = [memory_kib(pid) for pid in children(server.pid)]
+        return {"ready": ready, "master": memory_kib(server.pid), "workers": worker_memory}
+    finally:
+        server.terminate()
+        server.wait()
+        log.close()
+        os.unlink(config.name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    for preload in (False, True):
+        result = run_mode(preload, args.workers, args.port)
+        per_worker = {key: sum(w[key] for w in result["workers"]) / len(result["workers"]) / 1024
+                      for key in ("rss", "pss", "uss")}
+        total_pss = (result["master"]["pss"] + sum(w["pss"] for w in result["workers"])) / 1024
+        print(f"{'preload' if preload else 'no preload':>10}: {args.workers} workers ready in "
+              f"{result['ready']:.2f}s; per worker RSS {per_worker['rss']:.1f} MiB, "
+              f"PSS {per_worker['pss']:.1f} MiB, USS {per_worker['uss']:.1f} MiB; "
+              f"total PSS {total_pss:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""Local stand-ins for FMP, SEC EDGAR and Gemini, with injectable latency and errors.
+
+Usage (from backend/):
+
+    python benchmarks/fake_upstreams.py [--fmp-latency 80] [--sec-latency 150] \\
+        [--gemini-latency 2000] [--error-rate 0.0] [--corpus DIR]
+
+The script prints the environment variables that point the API at the
+stand-ins (``FMP_BASE_URL``, ``GEMINI_API_ENDPOINT`` and
+``GRPC_DEFAULT_SSL_ROOTS_FILE_PATH``) and serves until interrupted.
+``loadtest.py`` starts the same servers in-process.
+
+The stand-ins:
+
+* FMP: ``/api/v3/profile``, ``/income-statement`` and ``/sec_filings``. Every
+  ticker exists, and its ``finalLink`` points at the fake EDGAR archive.
+* SEC: ``/Archives/edgar/data/...`` streams saved 10-K fixtures
+  (``--corpus``, default benchmarks/filings) or the synthetic 10-K from
+  ``bench_risk_factors``, in 64 KiB chunks at a configurable bandwidth.
+* Gemini: a TLS gRPC server implementing ``GenerativeService``
+  (GenerateContent and StreamGenerateContent). The real
+  ``google.generativeai`` client runs unmodified against it. Its self-signed
+  certificate is trusted through ``GRPC_DEFAULT_SSL_ROOTS_FILE_PATH``.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import grpc
+import uvicorn
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from google.ai.generativelanguage_v1beta.types import (
+    Candidate,
+    Content,
+    GenerateContentRequest,
+    GenerateContentResponse,
+    Part,
+)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_risk_factors import synthetic_filing  # noqa: E402
+
+DEFAULT_CORPUS = Path(__file__).resolve().parent / "filings"
+SEC_CHUNK_SIZE = 64 * 1024
+BATCH_SECTION = re.compile(r"^\s*### (\w+)$", re.MULTILINE)
+GEMINI_SERVICE = "google.ai.generativelanguage.v1beta.GenerativeService"
+CARD_TITLES = [
+    ("Slow financial close", "Manual reconciliations delay the financial close and financial reporting."),
+    ("Inventory blind spots", "Limited inventory visibility ties up working capital across the supply chain."),
+    ("Cash flow volatility", "Weak cash forecasting leaves treasury reacting to market volatility."),
+    ("Margin pressure", "Rising input costs and competition squeeze gross margin."),
+    ("Fragmented master data", "Inconsistent financial data slows planning and analysis."),
+    ("Order-to-cash friction", "Revenue recognition and billing errors delay collections."),
+    ("Procurement leakage", "Off-contract spend erodes savings in procurement."),
+    ("Production inefficiency", "Unplanned downtime and quality issues raise unit costs."),
+]
+
+
+@dataclass
+class Behaviour:
+    """Latency (mean and jitter, in milliseconds) and error rate for one upstream."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+
+    async def delay(self, scale: float = 1.0) -> None:
+        seconds = max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) * scale / 1000
+        if seconds:
+            await asyncio.sleep(seconds)
+
+    def should_fail(self) -> bool:
+        return random.random() < self.error_rate
+
+
+@dataclass
+class FakeConfig:
+    fmp: Behaviour = field(default_factory=Behaviour)
+    sec: Behaviour = field(default_factory=Behaviour)
+    gemini: Behaviour = field(default_factory=Behaviour)
+    # SEC download speed (bytes/second); 0 means unthrottled.
+    sec_bandwidth: float = 0.0
+    # Number of streamed chunks a Gemini answer is split into.
+    gemini_chunks: int = 8
+    corpus: Path = DEFAULT_CORPUS
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def load_filings(corpus: Path) -> list[bytes]:
+    filings = [p.read_bytes() for p in sorted(corpus.glob("*.htm*"))] if corpus.is_dir() else []
+    return filings or [synthetic_filing()]
+
+
+def _cik(ticker: str) -> int:
+    return zlib.crc32(ticker.encode()) % 10**7
+
+
+def fake_http_app(config: FakeConfig, base_url: str) -> FastAPI:
+    """FMP and SEC endpoints on one app; ``base_url`` is where the app itself is served."""
+    app = FastAPI()
+    filings = load_filings(config.corpus)
+
+    async def _fmp(payload) -> Response:
+        await config.fmp.delay()
+        if config.fmp.should_fail():
+            return JSONResponse({"error": "injected failure"}, status_code=503)
+        return JSONResponse(payload)
+
+    @app.get("/api/v3/profile/{ticker}")
+    async def profile(ticker: str):
+        return await _fmp([{
+            "symbol": ticker,
+            "companyName": f"{ticker} Holdings Inc.",
+            "industry": random.Random(ticker).choice(["Software", "Consumer Electronics", "Auto Manufacturers"]),
+            "sector": "Technology",
+            "country": "US",
+            "revenue": 1.0e9,
+            "description": f"{ticker} Holdings designs, manufactures and sells products worldwide.",
+        }])
+
+    @app.get("/api/v3/income-statement/{ticker}")
+    async def income_statement(ticker: str):
+        return await _fmp([{"symbol": ticker, "revenue": 2.5e9 + _cik(ticker)}])
+
+    @app.get("/api/v3/sec_filings/{ticker}")
+    async def sec_filings(ticker: str):
+        cik = _cik(ticker)
+        accession = f"{cik:010d}24{cik % 10**6:06d}"
+        link = f"{base_url}/Archives/edgar/data/{cik}/{accession}/{ticker.lower()}-10k.htm"
+        return await _fmp([{"symbol": ticker, "type": "10-K", "finalLink": link}])
+
+    @app.get("/Archives/edgar/data/{cik}/{accession}/{name}")
+    async def filing(cik: int, accession: str, name: str):
+        await config.sec.delay()
+        if config.sec.should_fail():
+            return Response("injected failure", status_code=503)
+        document = filings[cik % len(filings)]
+
+        async def body():
+            for start in range(0, len(document), SEC_CHUNK_SIZE):
+                chunk = document[start:start + SEC_CHUNK_SIZE]
+                if config.sec_bandwidth:
+                    await asyncio.sleep(len(chunk) / config.sec_bandwidth)
+                yield chunk
+
+        return StreamingResponse(body(), media_type="text/html; charset=utf-8")
+
+    return app
+
+
+def _answer_text(prompt: str) -> str:
+    def cards(seed: str) -> list[dict]:
+        rng = random.Random(seed)
+        return [{"title": title, "blurb": blurb} for title, blurb in rng.sample(CARD_TITLES, len(CARD_TITLES))]
+
+    # Multi-company prompts list each company under a "### TICKER" heading.
+    tickers = BATCH_SECTION.findall(prompt)
+    if tickers:
+        return json.dumps({ticker: cards(ticker) for ticker in tickers}, indent=1)
+    return json.dumps(cards(prompt[:200]), indent=1)
+
+
+def _response(text: str) -> GenerateContentResponse:
+    return GenerateContentResponse(candidates=[Candidate(
+        content=Content(parts=[Part(text=text)], role="model"),
+        finish_reason=Candidate.FinishReason.STOP,
+        index=0,
+    )])
+
+
+def _prompt_text(request: GenerateContentRequest) -> str:
+    return "".join(part.text for content in request.contents for part in content.parts)
+
+
+def gemini_handler(config: FakeConfig) -> grpc.GenericRpcHandler:
+    behaviour = config.gemini
+
+    async def generate_content(request, context):
+        await behaviour.delay()
+        if behaviour.should_fail():
+            await context.abort(grpc.StatusCode.UNAVAILABLE, "injected failure")
+        return _response(_answer_text(_prompt_text(request)))
+
+    async def stream_generate_content(request, context):
+        # Time to first chunk is ~1/4 of the latency; the rest is spread over the chunks.
+        await behaviour.delay(0.25)
+        if behaviour.should_fail():
+            await context.abort(grpc.StatusCode.UNAVAILABLE, "injected failure")
+        text = _answer_text(_prompt_text(request))
+        step = -(-len(text) // config.gemini_chunks)
+        for start in range(0, len(text), step):
+            if start:
+                await behaviour.delay(0.75 / config.gemini_chunks)
+            yield _response(text[start:start + step])
+
+    return grpc.method_handlers_generic_handler(GEMINI_SERVICE, {
+        "GenerateContent": grpc.unary_unary_rpc_method_handler(
+            generate_content,
+            request_deserializer=GenerateContentRequest.deserialize,
+            response_serializer=GenerateContentResponse.serialize,
+        ),
+        "StreamGenerateContent": grpc.unary_stream_rpc_method_handler(
+            stream_generate_content,
+            request_deserializer=GenerateContentRequest.deserialize,
+            response_serializer=GenerateContentResponse.serialize,
+        ),
+    })
+
+
+def _self_signed_certificate(directory: str) -> tuple[str, str]:
+    key, cert = os.path.join(directory, "key.pem"), os.path.join(directory, "cert.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-keyout", key, "-out", cert,
+         "-days", "1", "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost,IP:127.0.0.1"],
+        check=True, capture_output=True,
+    )
+    return key, cert
+
+
+class FakeUpstreams:
+    """Runs the fake HTTP and gRPC servers on the current event loop."""
+
+    def __init__(self, config: FakeConfig):
+        self.config = config
+        self.http_port = _free_port()
+        self._tmpdir = tempfile.TemporaryDirectory(prefix="leadscope-fakes-")
+        self._http: uvicorn.Server | None = None
+        self._http_task: asyncio.Task | None = None
+        self._grpc: grpc.aio.Server | None = None
+        self.grpc_port = 0
+        self.cert_path = ""
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.http_port}"
+
+    def environment(self) -> dict[str, str]:
+        """Environment variables that point the API at these stand-ins."""
+        return {
+            "FMP_BASE_URL": f"{self.base_url}/api/v3",
+            "GEMINI_API_ENDPOINT": f"localhost:{self.grpc_port}",
+            "GRPC_DEFAULT_SSL_ROOTS_FILE_PATH": self.cert_path,
+        }
+
+    async def start(self) -> None:
+        app = fake_http_app(self.config, self.base_url)
+        self._http = uvicorn.Server(uvicorn.Config(
+            app, host="127.0.0.1", port=self.http_port, log_level="warning", backlog=4096))
+        self._http_task = asyncio.create_task(self._http.serve())
+        while not self._http.started:
+            await asyncio.sleep(0.01)
+
+        key, self.cert_path = _self_signed_certificate(self._tmpdir.name)
+        credentials = grpc.ssl_server_credentials([(Path(key).read_bytes(), Path(self.cert_path).read_bytes())])
+        self._grpc = grpc.aio.server()
+        self._grpc.add_generic_rpc_handlers((gemini_handler(self.config),))
+        self.grpc_port = self._grpc.add_secure_port("localhost:0", credentials)
+        await self._grpc.start()
+
+    async def stop(self) -> None:
+        if self._grpc is not None:
+            await self._grpc.stop(None)
+        if self._http is not None:
+            self._http.should_exit = True
+            await self._http_task
+        self._tmpdir.cleanup()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--fmp-latency", type=float, default=80.0, help="mean FMP latency (ms)")
+    parser.add_argument("--sec-latency", type=float, default=150.0, help="mean SEC time to first byte (ms)")
+    parser.add_argument("--sec-bandwidth", type=float, default=20e6, help="SEC bytes/second (0 = unthrottled)")
+    parser.add_argument("--gemini-latency", type=float, default=2000.0, help="mean Gemini latency (ms)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="latency standard deviation, as a fraction")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of upstream calls that fail")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS, help="directory of 10-K fixtures")
+
+
+def config_from_args(args: argparse.Namespace) -> FakeConfig:
+    def behaviour(latency: float) -> Behaviour:
+        return Behaviour(latency, latency * args.jitter, args.error_rate)
+
+    return FakeConfig(
+        fmp=behaviour(args.fmp_latency),
+        sec=behaviour(args.sec_latency),
+        gemini=behaviour(args.gemini_latency),
+        sec_bandwidth=args.sec_bandwidth,
+        corpus=args.corpus,
+    )
+
+
+async def _serve(config: FakeConfig) -> None:
+    fakes = FakeUpstreams(config)
+    await fakes.start()
+    for name, value in fakes.environment().items():
+        print(f"export {name}={value}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await fakes.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    add_arguments(parser)
+    try:
+        asyncio.run(_serve(config_from_args(parser.parse_args())))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
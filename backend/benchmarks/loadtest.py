@@ -0,0 +1,244 @@
+"""Load-test the API against local FMP/SEC/Gemini stand-ins.
+
+Usage (from backend/):
+
+    python benchmarks/loadtest.py [--concurrency 1,8,32] [--requests 64] [--tickers 0] \\
+        [--endpoint assessment|stream] [--cache] [--rate-limits] [--workers 1] [fake upstream options]
+
+The script starts the servers from ``fake_upstreams.py`` in-process. It then
+launches the API under uvicorn in a subprocess pointed at them, and drives
+the API at each concurrency level. Per level it reports:
+
+* throughput (requests/second) and the error count;
+* p50/p95/p99 latency (time to the complete response; for ``stream``, also
+  time to the first event);
+* peak RSS of the API process;
+* mean per-stage timings, taken from the difference between ``/metrics``
+  scrapes before and after the level.
+
+Tickers are unique unless ``--tickers N`` limits them to a pool of N, which
+exercises caching and request coalescing. Caching is disabled unless
+``--cache`` is given, so every request runs the full pipeline. Upstream rate
+limits are off unless ``--rate-limits`` is given; the default quotas (Gemini's
+15 calls a minute) would otherwise be what the run measures.
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import re
+import string
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fake_upstreams  # noqa: E402
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+STAGE_SAMPLE = re.compile(r'^leadscope_stage_duration_seconds_(sum|count)\{stage="([^"]+)"\} (\S+)$', re.MULTILINE)
+
+
+def ticker_names(pool: int) -> "itertools.cycle[str] | itertools.product":
+    """Endless supply of valid 1-5 letter tickers; a pool of N repeats the same N."""
+    names = ("".join(letters) for n in range(2, 6)
+             for letters in itertools.product(string.ascii_uppercase, repeat=n))
+    return itertools.cycle(list(itertools.islice(names, pool))) if pool else names
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def rss_kib(pid: int) -> int:
+    """Current resident set size of ``pid`` and its children (Linux /proc), in KiB."""
+    total = 0
+    pids = [pid]
+    try:
+        pids += [int(p) for p in Path(f"/proc/{pid}/task/{pid}/children").read_text().split()]
+    except OSError:
+        pass
+    for p in pids:
+        try:
+            for line in Path(f"/proc/{p}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1])
+        except OSError:
+            continue
+    return total
+
+
+def stage_totals(metrics_text: str) -> dict[str, list[float]]:
+    totals: dict[str, list[float]] = {}
+    for kind, stage, value in STAGE_SAMPLE.findall(metrics_text):
+        totals.setdefault(stage, [0.0, 0.0])[0 if kind == "sum" else 1] = float(value)
+    return totals
+
+
+async def _one_request(client: httpx.AsyncClient, endpoint: str, ticker: str) -> tuple[bool, float, float]:
+    """Returns (ok, seconds to first byte/event, seconds to completion)."""
+    path = f"/api/v1/assessment/{ticker}" + ("/stream" if endpoint == "stream" else "")
+    start = time.perf_counter()
+    first = None
+    ok = False
+    try:
+        async with client.stream("GET", path) as response:
+            async for chunk in response.aiter_bytes():
+                if first is None:
+                    first = time.perf_counter() - start
+                if endpoint == "stream" and b"event: error" in chunk:
+                    ok = False
+                    break
+            else:
+                ok = response.status_code == 200
+    except httpx.HTTPError:
+        ok = False
+    total = time.perf_counter() - start
+    return ok, first if first is not None else total, total
+
+
+async def run_level(client: httpx.AsyncClient, endpoint: str, concurrency: int, n_requests: int,
+                    tickers, pid: int) -> dict:
+    before = stage_totals((await client.get("/metrics")).text)
+    peak_rss = rss_kib(pid)
+    sampling = True
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while sampling:
+            peak_rss = max(peak_rss, rss_kib(pid))
+            await asyncio.sleep(0.05)
+
+    sampler = asyncio.create_task(sample_rss())
+    queue: asyncio.Queue[str] = asyncio.Queue()
+    for _ in range(n_requests):
+        queue.put_nowait(next(tickers))
+    results: list[tuple[bool, float, float]] = []
+
+    async def worker():
+        while not queue.empty():
+            results.append(await _one_request(client, endpoint, queue.get_nowait()))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    sampling = False
+    await sampler
+
+    after = stage_totals((await client.get("/metrics")).text)
+    stages = {}
+    for stage, (total, count) in after.items():
+        prev_total, prev_count = before.get(stage, [0.0, 0.0])
+        if count > prev_count:
+            stages[stage] = (total - prev_total) / (count - prev_count)
+
+    latencies = [r[2] for r in results if r[0]]
+    first_bytes = [r[1] for r in results if r[0]]
+    return {
+        "concurrency": concurrency,
+        "rps": len(results) / elapsed,
+        "errors": sum(1 for r in results if not r[0]),
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "ttfb_p50": percentile(first_bytes, 50),
+        "peak_rss_mib": peak_rss / 1024,
+        "stages": stages,
+    }
+
+
+def start_api(port: int, env: dict[str, str], workers: int) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+    )
+
+
+async def wait_until_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("API process exited during startup")
+        try:
+            if (await client.get("/metrics")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("API did not become ready")
+
+
+def print_report(results: list[dict], endpoint: str) -> None:
+    print(f"\n{'conc':>5} {'rps':>8} {'err':>5} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} "
+          f"{'first s':>8} {'rss MiB':>8}")
+    for r in results:
+        first = f"{r['ttfb_p50']:>8.3f}" if endpoint == "stream" else f"{'-':>8}"
+        print(f"{r['concurrency']:>5} {r['rps']:>8.2f} {r['errors']:>5} {r['p50']:>7.3f} {r['p95']:>7.3f} "
+              f"{r['p99']:>7.3f} {first} {r['peak_rss_mib']:>8.1f}")
+    stages = sorted({s for r in results for s in r["stages"]})
+    if stages:
+        print(f"\nmean stage time (ms)\n{'stage':<18}" + "".join(f"{r['concurrency']:>9}" for r in results))
+        for stage in stages:
+            print(f"{stage:<18}" + "".join(
+                f"{r['stages'][stage] * 1000:>9.1f}" if stage in r["stages"] else f"{'-':>9}" for r in results))
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    fakes = fake_upstreams.FakeUpstreams(fake_upstreams.config_from_args(args))
+    await fakes.start()
+    port = fake_upstreams._free_port()
+    env = {
+        **fakes.environment(),
+        "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "loadtest"),
+        "FMP_API_KEY": os.environ.get("FMP_API_KEY", "loadtest"),
+        "CACHE_ENABLED": "true" if args.cache else "false",
+        "LOG_LEVEL": "WARNING",
+    }
+    if not args.rate_limits:
+        env.update({f"{upstream.upper()}_REQUESTS_PER_MINUTE": "0" for upstream in ("fmp", "sec", "gemini")})
+    process = start_api(port, env, args.workers)
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=120.0, limits=limits) as client:
+            await wait_until_ready(client, process)
+            print(f"API ready (pid {process.pid}, idle RSS {rss_kib(process.pid) / 1024:.1f} MiB); "
+                  f"endpoint={args.endpoint} cache={'on' if args.cache else 'off'} "
+                  f"rate-limits={'on' if args.rate_limits else 'off'}")
+            tickers = ticker_names(args.tickers)
+            results = []
+            for concurrency in args.concurrency:
+                results.append(await run_level(client, args.endpoint, concurrency, args.requests, tickers, process.pid))
+                print(f"  concurrency {concurrency}: {results[-1]['rps']:.2f} rps")
+        print_report(results, args.endpoint)
+    finally:
+        process.terminate()
+        process.wait()
+        await fakes.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--concurrency", type=lambda v: [int(c) for c in v.split(",")], default=[1, 8, 32],
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=64, help="requests per concurrency level")
+    parser.add_argument("--tickers", type=int, default=0, help="size of the ticker pool (0 = always unique)")
+    parser.add_argument("--endpoint", choices=["assessment", "stream"], default="assessment")
+    parser.add_argument("--cache", action="store_true", help="leave response caching enabled")
+    parser.add_argument("--rate-limits", action="store_true", help="leave the upstream rate limits enabled")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    fake_upstreams.add_arguments(parser)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Tiered response cache for Lead-Scope AI backend.
+
+Artifacts are stored in an in-process LRU tier and, when ``REDIS_URL`` is
+configured, in a shared Redis tier. Keys are ``<kind>:<ticker>[:<filing id>]``
+so anything derived from a 10-K is naturally keyed by the filing it came from.
+"""
+
+import json
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from config import settings
+from logger import get_logger
+import metrics
+
+logger = get_logger(__name__)
+
+MISS = object()
+
+
+def connect_redis(url: str):
+    """An asyncio Redis client for ``url``, or None without the ``redis`` package.
+
+    ``redis`` is imported here rather than at module level, so processes
+    without ``REDIS_URL`` never load it.
+    """
+    try:
+        import redis.asyncio as redis_asyncio
+    except ImportError:  # pragma: no cover - Redis is optional
+        return None
+    return redis_asyncio.from_url(url)
+
+# Artifacts derived from a specific 10-K filing; dropped when a newer one appears.
+FILING_SCOPED_KINDS = ("risk_factors", "pain_cards", "assessment")
+
+
+def ttl_for(kind: str) -> int:
+    """Return the configured TTL (seconds) for an artifact kind."""
+    return getattr(settings, f"cache_ttl_{kind}", settings.cache_ttl_default)
+
+
+def make_key(kind: str, ticker: str, filing_id: Optional[str] = None) -> str:
+    """Build a cache key for an artifact."""
+    return f"{kind}:{ticker}:{filing_id}" if filing_id else f"{kind}:{ticker}"
+
+
+class LRUCache:
+    """Bounded in-process cache with per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return MISS
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return MISS
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: int) -> None:
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TieredCache:
+    """LRU tier in front of an optional Redis tier, with hit/miss counters."""
+
+    def __init__(self, max_entries: int, redis_url: Optional[str] = None, namespace: str = "leadscope"):
+        self.local = LRUCache(max_entries)
+        self.redis_url = redis_url
+        self.namespace = namespace
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self._redis = None
+
+    def _redis_client(self):
+        if self._redis is None and self.redis_url:
+            self._redis = connect_redis(self.redis_url)
+        return self._redis
+
+    @property
+    def shared(self) -> bool:
+        """Whether values are visible to other worker processes (a Redis tier is configured)."""
+        return self._redis_client() is not None
+
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str, shared_only: bool = False) -> Any:
+        """Look ``key`` up locally, then in Redis. ``shared_only`` skips the local tier
+        for values another worker keeps updating."""
+        kind = key.split(":", 1)[0]
+        value = self.local.get(key) if not shared_only else MISS
+        if value is not MISS:
+            self.hits[f"{kind}.local"] += 1
+            return value
+
+        client = self._redis_client()
+        if client is not None:
+            try:
+                raw = await client.get(self._redis_key(key))
+            except Exception as e:
+                logger.warning("Redis cache read failed for %s: %s", key, e)
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                if not shared_only:
+                    self.local.set(key, value, ttl_for(kind))
+                self.hits[f"{kind}.redis"] += 1
+                return value
+
+        self.misses[kind] += 1
+        return MISS
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        ttl = ttl if ttl is not None else ttl_for(key.split(":", 1)[0])
+        self.local.set(key, value, ttl)
+        client = self._redis_client()
+        if client is not None:
+            try:
+                await client.set(self._redis_key(key), json.dumps(value), ex=ttl)
+            except Exception as e:
+                logger.warning("Redis cache write failed for %s: %s", key, e)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.local.delete(key)
+        client = self._redis_client()
+        if client is not None and keys:
+            try:
+                await client.delete(*(self._redis_key(key) for key in keys))
+            except Exception as e:
+                logger.warning("Redis cache delete failed for %s: %s", keys, e)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for ``key`` or compute, store and return it."""
+        if not settings.cache_enabled:
+            return await loader()
+        value = await self.get(key)
+        if value is MISS:
+            value = await loader()
+            # None means "nothing found upstream"; retry on the next request.
+            if value is not None:
+                await self.set(key, value)
+        return value
+
+    async def invalidate_filing(self, ticker: str, filing_id: str) -> None:
+        """Drop every artifact derived from an outdated 10-K filing."""
+        logger.info("Invalidating cached artifacts for %s filing %s", ticker, filing_id)
+        await self.delete(*(make_key(kind, ticker, filing_id) for kind in FILING_SCOPED_KINDS))
+
+    def stats(self) -> dict:
+        return {
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+            "local_entries": len(self.local),
+            "redis_enabled": self.shared,
+        }
+
+
+cache = TieredCache(settings.cache_max_entries, settings.redis_url)
+
+
+def _render_cache_metrics() -> list[str]:
+    lines = [
+        "# HELP leadscope_cache_hits_total Cache hits by artifact kind and tier.",
+        "# TYPE leadscope_cache_hits_total counter",
+    ]
+    for label, count in sorted(cache.hits.items()):
+        kind, _, tier = label.partition(".")
+        lines.append(f'leadscope_cache_hits_total{{kind="{kind}",tier="{tier}"}} {count}')
+    lines += [
+        "# HELP leadscope_cache_misses_total Cache misses by artifact kind.",
+        "# TYPE leadscope_cache_misses_total counter",
+    ]
+    for kind, count in sorted(cache.misses.items()):
+        lines.append(f'leadscope_cache_misses_total{{kind="{kind}"}} {count}')
+    return lines
+
+
+metrics.registry.add_collector(_render_cache_metrics)
@@ -0,0 +1,151 @@
+# backend/classification_rules.py
+# Data tables for classifier.py. They are compiled once at import into exact-match
+# dictionaries and single-pass keyword automata, so adding rows costs nothing per request.
+
+TMT = "TMT (Technology, Media & Telecom)"
+FSI = "FSI (Financial Services Industry)"
+LSHC = "LSHC (Life Sciences & Health Care)"
+PROFESSIONAL_SERVICES = "Professional Services"
+CIP = "C&IP (Consumer & Industrial Products)"
+
+DEFAULT_INDUSTRY_GROUP = CIP
+
+# Exact (lowercased) FMP/GICS industry names. Checked first: the industry is more
+# specific than the sector.
+INDUSTRY_GROUPS = {
+    # Technology, media & telecom
+    'software - application': TMT,
+    'software - infrastructure': TMT,
+    'software—application': TMT,
+    'software—infrastructure': TMT,
+    'information technology services': TMT,
+    'communication equipment': TMT,
+    'computer hardware': TMT,
+    'consumer electronics': TMT,
+    'electronic components': TMT,
+    'electronics & computer distribution': TMT,
+    'scientific & technical instruments': TMT,
+    'semiconductors': TMT,
+    'semiconductor equipment & materials': TMT,
+    'solar': TMT,
+    'telecom services': TMT,
+    'telecommunications services': TMT,
+    'internet content & information': TMT,
+    'electronic gaming & multimedia': TMT,
+    'entertainment': TMT,
+    'broadcasting': TMT,
+    'publishing': TMT,
+    'advertising agencies': TMT,
+    'media & entertainment': TMT,
+    'interactive media & services': TMT,
+    'it services': TMT,
+    'application software': TMT,
+    'systems software': TMT,
+    'technology hardware, storage & peripherals': TMT,
+    'diversified telecommunication services': TMT,
+    'wireless telecommunication services': TMT,
+
+    # Financial services
+    'banks - diversified': FSI,
+    'banks - regional': FSI,
+    'banks—diversified': FSI,
+    'banks—regional': FSI,
+    'asset management': FSI,
+    'capital markets': FSI,
+    'credit services': FSI,
+    'financial conglomerates': FSI,
+    'financial data & stock exchanges': FSI,
+    'insurance - diversified': FSI,
+    'insurance - life': FSI,
+    'insurance - property & casualty': FSI,
+    'insurance - reinsurance': FSI,
+    'insurance - specialty': FSI,
+    'insurance brokers': FSI,
+    'mortgage finance': FSI,
+    'shell companies': FSI,
+    'banks': FSI,
+    'consumer finance': FSI,
+    'diversified financial services': FSI,
+    'insurance': FSI,
+    'thrifts & mortgage finance': FSI,
+
+    # Life sciences & health care
+    'biotechnology': LSHC,
+    'drug manufacturers - general': LSHC,
+    'drug manufacturers - specialty & generic': LSHC,
+    'drug manufacturers—general': LSHC,
+    'drug manufacturers—specialty & generic': LSHC,
+    'diagnostics & research': LSHC,
+    'health information services': LSHC,
+    'healthcare plans': LSHC,
+    'medical care facilities': LSHC,
+    'medical devices': LSHC,
+    'medical distribution': LSHC,
+    'medical instruments & supplies': LSHC,
+    'pharmaceutical retailers': LSHC,
+    'pharmaceuticals': LSHC,
+    'life sciences tools & services': LSHC,
+    'health care equipment & supplies': LSHC,
+    'health care providers & services': LSHC,
+
+    # Professional services
+    'specialty business services': PROFESSIONAL_SERVICES,
+    'consulting services': PROFESSIONAL_SERVICES,
+    'staffing & employment services': PROFESSIONAL_SERVICES,
+    'professional services': PROFESSIONAL_SERVICES,
+    'commercial services & supplies': PROFESSIONAL_SERVICES,
+}
+
+# Exact (lowercased) FMP/GICS sector names. Consumer, industrial, energy, materials,
+# real-estate and utilities sectors are left out: they fall through to the fragment
+# rules below and then to DEFAULT_INDUSTRY_GROUP.
+SECTOR_GROUPS = {
+    'technology': TMT,
+    'information technology': TMT,
+    'communication services': TMT,
+    'telecommunication services': TMT,
+    'financial services': FSI,
+    'financial': FSI,
+    'financials': FSI,
+    'healthcare': LSHC,
+    'health care': LSHC,
+}
+
+# Fallback for names missing from the tables above, in priority order. Each group
+# lists clauses; a clause matches when every (field, fragment) in it is a substring
+# of that lowercased profile field.
+FRAGMENT_RULES = [
+    (TMT, [
+        {'sector': 'tech'},
+        {'sector': 'communication'},
+        {'industry': 'software'},
+        {'industry': 'media'},
+        {'industry': 'entertainment'},
+    ]),
+    (FSI, [
+        {'sector': 'financial'},
+        {'industry': 'insurance'},
+        {'industry': 'asset management'},
+    ]),
+    (LSHC, [
+        {'sector': 'healthcare'},
+        {'industry': 'pharmaceuticals'},
+        {'industry': 'biotechnology'},
+    ]),
+    (PROFESSIONAL_SERVICES, [
+        {'sector': 'services', 'industry': 'business'},
+    ]),
+]
+
+# Geographic scope
+US_ONLY_SCOPE = "US-based only"
+MULTI_COUNTRY_SCOPE = "More than 5 countries"  # Default for large public companies
+HOME_COUNTRY = "US"
+
+# A US company whose description mentions none of these is assumed to operate in the US only.
+GLOBAL_CUES = [
+    'global',
+    'international',
+    'worldwide',
+    'multinational',
+]
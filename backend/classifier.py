@@ -1,31 +1,95 @@
-def classify_company(profile: dict) -> tuple[str, str]:
+# backend/classifier.py
+import hashlib
+import json
+import re
+from typing import Iterable
+
+from classification_rules import (
+    DEFAULT_INDUSTRY_GROUP, FRAGMENT_RULES, GLOBAL_CUES, HOME_COUNTRY, INDUSTRY_GROUPS,
+    MULTI_COUNTRY_SCOPE, SECTOR_GROUPS, US_ONLY_SCOPE,
+)
+from keyword_matcher import KeywordMatcher
+
+# Distinct (industry, sector) pairs across the whole FMP universe number in the hundreds.
+GROUP_CACHE_SIZE = 4096
+
+
+class CompiledClassifier:
+    """Classification tables compiled into exact-match lookups and single-pass matchers.
+
+    Industry groups resolve in this order: exact industry name, exact sector
+    name, the first fragment rule whose clause matches, then the default. The
+    result per (industry, sector) pair is memoised. Geographic cues in the
+    description are found in one pass of a compiled alternation.
+    """
+
+    def __init__(self, industry_groups: dict[str, str], sector_groups: dict[str, str],
+                 fragment_rules: list[tuple[str, list[dict[str, str]]]], global_cues: list[str],
+                 default_group: str = DEFAULT_INDUSTRY_GROUP):
+        self.industry_groups = {name.lower(): group for name, group in industry_groups.items()}
+        self.sector_groups = {name.lower(): group for name, group in sector_groups.items()}
+        self.default_group = default_group
+        self.fragment_rules = [(group, [tuple(clause.items()) for clause in clauses])
+                               for group, clauses in fragment_rules]
+        fragments = {"sector": [], "industry": []}
+        for _, clauses in self.fragment_rules:
+            for clause in clauses:
+                for field, fragment in clause:
+                    fragments[field].append(fragment)
+        self.matchers = {field: KeywordMatcher(words) for field, words in fragments.items()}
+        # One alternation: the regex engine scans the description once, in C, and stops at the first cue.
+        self.cue_pattern = re.compile("|".join(re.escape(cue.lower()) for cue in global_cues))
+        self._groups: dict[tuple[str, str], str] = {}
+        # Changes whenever the rules are edited; stored assessments are re-classified when it does.
+        self.version = hashlib.sha1(json.dumps(
+            [industry_groups, sector_groups, fragment_rules, global_cues, default_group], sort_keys=True,
+        ).encode()).hexdigest()[:12]
+
+    def _resolve_group(self, industry: str, sector: str) -> str:
+        group = self.industry_groups.get(industry) or self.sector_groups.get(sector)
+        if group:
+            return group
+        found = {"sector": self.matchers["sector"].find(sector),
+                 "industry": self.matchers["industry"].find(industry)}
+        for group, clauses in self.fragment_rules:
+            if any(all(fragment in found[field] for field, fragment in clause) for clause in clauses):
+                return group
+        return self.default_group
+
+    def industry_group(self, industry: str, sector: str) -> str:
+        # Keyed on the raw strings, so the common case is a single dict lookup.
+        group = self._groups.get((industry, sector))
+        if group is None:
+            if len(self._groups) >= GROUP_CACHE_SIZE:
+                self._groups.clear()
+            group = self._groups[industry, sector] = self._resolve_group(industry.strip().lower(),
+                                                                           sector.strip().lower())
+        return group
+
+    def geo_scope(self, country: str, description: str) -> str:
+        if country.strip().upper() != HOME_COUNTRY:
+            return MULTI_COUNTRY_SCOPE
+        # A US company that doesn't mention operating abroad is assumed to be US-only.
+        return MULTI_COUNTRY_SCOPE if self.cue_pattern.search(description.lower()) else US_ONLY_SCOPE
+
+    def classify(self, profile: dict) -> tuple[str, str]:
+        # FMP sends null for fields it has no data for.
+        get = profile.get
+        return (self.industry_group(get("industry") or "", get("sector") or ""),
+                self.geo_scope(get("country") or "", get("description") or ""))
+
+
+DEFAULT_CLASSIFIER = CompiledClassifier(INDUSTRY_GROUPS, SECTOR_GROUPS, FRAGMENT_RULES, GLOBAL_CUES)
+
+
+def classify_company(profile: dict, classifier: CompiledClassifier = DEFAULT_CLASSIFIER) -> tuple[str, str]:
     """
     Takes a company profile from the FMP API and classifies it into
     a custom industry group and geographical scope.
     """
-    industry = profile.get("industry", "").lower()
-    sector = profile.get("sector", "").lower()
-    description = profile.get("description", "").lower()
-    country = profile.get("country", "").upper()
-
-    # --- Industry Classification Logic ---
-    classified_industry = "C&IP (Consumer & Industrial Products)" # Default
-
-    if "tech" in sector or "communication" in sector or "software" in industry or "media" in industry or "entertainment" in industry:
-        classified_industry = "TMT (Technology, Media & Telecom)"
-    elif "financial" in sector or "insurance" in industry or "asset management" in industry:
-        classified_industry = "FSI (Financial Services Industry)"
-    elif "healthcare" in sector or "pharmaceuticals" in industry or "biotechnology" in industry:
-        classified_industry = "LSHC (Life Sciences & Health Care)"
-    elif "services" in sector and "business" in industry:
-        classified_industry = "Professional Services"
-
-    # --- Geographical Scope Logic ---
-    geo_scope = "More than 5 countries" # Default for large public companies
-
-    if country == "US":
-        # A simple check: if it's US-based and doesn't mention global operations, assume US-only.
-        if "global" not in description and "international" not in description and "worldwide" not in description:
-            geo_scope = "US-based only"
-
-    return classified_industry, geo_scope
\ No newline at end of file
+    return classifier.classify(profile)
+
+
+def classify_many(profiles: Iterable[dict], classifier: CompiledClassifier = DEFAULT_CLASSIFIER) -> list[tuple[str, str]]:
+    """Classify a batch of profiles (e.g. a watchlist run), in input order."""
+    return [classifier.classify(profile) for profile in profiles]
@@ -0,0 +1,154 @@
+"""Application-lifetime client registry.
+
+Holds pooled keep-alive HTTP clients for financialmodelingprep.com and
+sec.gov and a configured Gemini model, so requests don't pay connection,
+TLS and SDK setup costs. ``main`` starts and stops the registry from the
+FastAPI lifespan; scripts that never start it get clients lazily on first use.
+
+The Gemini SDK (``google.generativeai``, with protobuf and gRPC) is by far the
+heaviest import in the app, so it is imported on first use instead of with
+this module. ``start`` loads it in a thread once the server is up, and Gemini
+calls await that load instead of blocking the event loop on the import;
+``gunicorn.conf`` loads it in the master before forking workers.
+
+Each Gemini API key gets its own SDK client, so rotating keys never touches
+the SDK's process-wide ``genai.configure`` state.
+"""
+
+import asyncio
+from typing import Optional
+
+import httpx
+
+from config import settings, SEC_HEADERS
+from logger import get_logger
+from upstream import worker_limit
+
+logger = get_logger(__name__)
+
+GEMINI_MODEL_NAME = "gemini-1.5-flash"
+
+
+class ClientRegistry:
+    """Shared upstream clients, bound to the event loop that created them."""
+
+    def __init__(self):
+        self._fmp: Optional[httpx.AsyncClient] = None
+        self._sec: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._gemini_models: dict = {}
+        self._gemini_sdk: Optional[asyncio.Future] = None
+
+    def _new_http_client(self, max_connections: int, headers: Optional[dict] = None) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            headers=headers,
+            timeout=httpx.Timeout(settings.http_timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=settings.http_keepalive_expiry,
+            ),
+        )
+
+    def _ensure_http(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        if self._loop is not None:
+            # Sockets can't move between event loops; start fresh pools on this one.
+            logger.warning("HTTP clients were created on another event loop; recreating them")
+        # Pools hold this worker's share of the limits, so N workers open no more than the totals.
+        self._fmp = self._new_http_client(worker_limit("fmp"))
+        self._sec = self._new_http_client(worker_limit("sec"), headers=SEC_HEADERS)
+        self._loop = loop
+
+    @property
+    def fmp(self) -> httpx.AsyncClient:
+        self._ensure_http()
+        return self._fmp
+
+    @property
+    def sec(self) -> httpx.AsyncClient:
+        self._ensure_http()
+        return self._sec
+
+    async def gemini_model(self, key: Optional[str] = None) -> "GeminiModel":
+        """The Gemini model for API ``key`` (the primary ``GOOGLE_API_KEY`` by default)."""
+        key = key or settings.google_api_key
+        model = self._gemini_models.get(key)
+        if model is None:
+            if not key:
+                raise ValueError("GOOGLE_API_KEY not found in .env file.")
+            await self._load_gemini_sdk()
+            # Another caller may have built it while this one waited for the SDK.
+            model = self._gemini_models.get(key)
+            if model is None:
+                model = self._gemini_models[key] = GeminiModel(key)
+        return model
+
+    def _start_gemini_load(self) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        if self._gemini_sdk is None or self._gemini_sdk.get_loop() is not loop:
+            self._gemini_sdk = loop.run_in_executor(None, load_gemini_sdk)
+            self._gemini_sdk.add_done_callback(_log_gemini_load_failure)
+        return self._gemini_sdk
+
+    async def _load_gemini_sdk(self) -> None:
+        # Shielded: a cancelled caller must not cancel the load the others are waiting for.
+        await asyncio.shield(self._start_gemini_load())
+
+    async def start(self) -> None:
+        """Open the HTTP pools and start loading the Gemini SDK (if a key is present)."""
+        self._ensure_http()
+        if settings.google_api_key:
+            # In a thread, so the server answers while the SDK loads.
+            self._start_gemini_load()
+        logger.info("Upstream client registry started")
+
+    async def aclose(self) -> None:
+        for client in (self._fmp, self._sec):
+            if client is not None:
+                await client.aclose()
+        self._fmp = self._sec = None
+        self._loop = None
+        logger.info("Upstream client registry stopped")
+
+
+class GeminiModel:
+    """``generate_content_async`` of the SDK's ``GenerativeModel``, on a client of its own API key."""
+
+    def __init__(self, key: str):
+        from google.ai import generativelanguage as glm
+
+        client_options = {"api_key": key}
+        if settings.gemini_api_endpoint:
+            client_options["api_endpoint"] = settings.gemini_api_endpoint
+        self.model_name = f"models/{GEMINI_MODEL_NAME}"
+        self._client = glm.GenerativeServiceAsyncClient(client_options=client_options)
+
+    async def generate_content_async(self, prompt, stream: bool = False):
+        import google.generativeai as genai
+        from google.generativeai.types import content_types
+
+        contents = content_types.to_contents(prompt)
+        if contents and not contents[-1].role:
+            contents[-1].role = "user"
+        request = genai.protos.GenerateContentRequest(model=self.model_name, contents=contents)
+        if stream:
+            iterator = await self._client.stream_generate_content(request)
+            return await genai.types.AsyncGenerateContentResponse.from_aiterator(iterator)
+        response = await self._client.generate_content(request)
+        return genai.types.AsyncGenerateContentResponse.from_response(response)
+
+
+registry = ClientRegistry()
+
+
+def load_gemini_sdk() -> None:
+    """Import the Gemini SDK now (about a second, mostly protobuf and gRPC modules)."""
+    import google.generativeai  # noqa: F401
+
+
+def _log_gemini_load_failure(future: asyncio.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning("Could not load the Gemini SDK: %s", future.exception())
@@ -2,7 +2,7 @@
 
 # backend/config.py
 import os
-from typing import List, Union
+from typing import List, Optional, Union
 from pydantic import field_validator
 from pydantic_settings import BaseSettings
 
@@ -20,9 +20,120 @@ class Settings(BaseSettings):
     # We accept a string from the .env file and will convert it to a list
     cors_origins: Union[List[str], str] = "http://localhost:3000"
 
+    # Production server (gunicorn.conf.py); 0 workers means one per CPU
+    web_concurrency: int = 0
+    server_bind: str = "0.0.0.0:8000"
+    server_timeout: int = 120
+    server_graceful_timeout: int = 30
+
     log_level: str = "INFO"
+    # "json" (one object per line) or "text"
+    log_format: str = "json"
+    # Per-module overrides, e.g. "scraper=DEBUG,cache=WARNING"
+    log_levels: str = ""
+    # Fraction of records kept per sampled event, e.g. "health_check=0.01"
+    log_sample_rates: str = "health_check=0.01"
+
+    # Cache Configuration (TTLs in seconds)
+    cache_enabled: bool = True
+    cache_max_entries: int = 1024
+    redis_url: Optional[str] = None
+    cache_ttl_default: int = 3600
+    cache_ttl_filing: int = 6 * 3600
+    cache_ttl_latest_filing: int = 400 * 24 * 3600
+    cache_ttl_profile: int = 24 * 3600
+    cache_ttl_revenue: int = 24 * 3600
+    cache_ttl_risk_factors: int = 30 * 24 * 3600
+    cache_ttl_pain_cards: int = 30 * 24 * 3600
+    cache_ttl_assessment: int = 24 * 3600
+    # Serialized assessment bodies kept per worker; bodies at least this large are also pre-compressed
+    response_cache_entries: int = 1024
+    response_compress_min_bytes: int = 1024
+
+    # Offline risk-factor store written by ingest.py (unset disables it)
+    risk_store_path: Optional[str] = None
+    # Persistent assessments and raw pain cards, re-scored locally on taxonomy edits (unset disables it)
+    assessment_store_path: Optional[str] = None
+    # Downloaded 10-Ks split into sections, LRU-capped at filing_store_max_bytes compressed (unset disables it)
+    filing_store_path: Optional[str] = None
+    filing_store_max_bytes: int = 512 * 1024 * 1024
+
+    # Prompt context budget (estimated tokens of risk-factor text sent to Gemini)
+    context_token_budget: int = 2500
+
+    # Cards the model is asked for, and follow-up prompts asking only for the ones an answer lacked
+    pain_card_count: int = 8
+    pain_card_reask_attempts: int = 1
+    # Merge pain cards whose estimated title+blurb word similarity (MinHash Jaccard) is at least this
+    dedup_enabled: bool = True
+    dedup_similarity: float = 0.4
+
+    # Upstream endpoints (overridable to point at local stand-ins, see benchmarks/)
+    fmp_base_url: str = "https://financialmodelingprep.com/api/v3"
+    gemini_api_endpoint: Optional[str] = None
+
+    # Upstream HTTP clients (seconds)
+    http_timeout: float = 30.0
+    http_keepalive_expiry: float = 60.0
+
+    # Upstream concurrency limits (simultaneous in-flight calls, split between server workers)
+    fmp_max_concurrency: int = 8
+    sec_max_concurrency: int = 4
+    gemini_max_concurrency: int = 4
+
+    # Extra API keys rotated with the primary ones (comma-separated); quotas are per key
+    fmp_api_keys: Union[List[str], str] = []
+    google_api_keys: Union[List[str], str] = []
+    # Upstream quotas per key (requests per minute, 0 = unlimited). Buckets hold <upstream>_burst
+    # calls; batch and pre-warm calls leave rate_limit_reserve of a bucket to interactive ones.
+    # Without rate_limit_redis_enabled, each server worker gets an equal share of these.
+    fmp_requests_per_minute: float = 300
+    sec_requests_per_minute: float = 600
+    gemini_requests_per_minute: float = 15
+    fmp_burst: float = 10
+    sec_burst: float = 20
+    gemini_burst: float = 8
+    rate_limit_reserve: float = 0.25
+    # Seconds a key rests after a 429 without Retry-After
+    rate_limit_cooldown: float = 10.0
+    # Share the buckets across worker processes through REDIS_URL
+    rate_limit_redis_enabled: bool = False
+
+    # Upstream retries, deadlines and circuit breakers (seconds)
+    fmp_retry_attempts: int = 3
+    sec_retry_attempts: int = 3
+    gemini_retry_attempts: int = 2
+    retry_base_delay: float = 0.25
+    retry_max_delay: float = 4.0
+    request_deadline: float = 25.0
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+
+    # Request coalescing; the Redis lock extends it across worker processes
+    singleflight_redis_enabled: bool = False
+    singleflight_lock_ttl: float = 60.0
+    singleflight_poll_interval: float = 0.1
+
+    # Batch Assessment Configuration
+    batch_max_tickers: int = 2000
+    # Multi-company Gemini prompts for batch jobs (token budget covers the packed contexts)
+    gemini_batch_enabled: bool = True
+    gemini_batch_token_budget: int = 30000
+    gemini_batch_max_companies: int = 10
+    gemini_batch_window: float = 0.5
+    batch_max_concurrency: int = 16
+    batch_job_retention: int = 100
+    # How often a running job's progress is published to Redis for the other workers (seconds)
+    batch_publish_interval: float = 1.0
+
+    # Watchlist pre-warming (seconds); its upstream calls queue at the rate governor's lowest priority
+    prewarm_enabled: bool = False
+    prewarm_watchlist: Union[List[str], str] = []
+    prewarm_filing_interval: float = 15 * 60
+    prewarm_profile_interval: float = 6 * 3600
+    prewarm_concurrency: int = 2
 
-    @field_validator("cors_origins", mode='before')
+    @field_validator("cors_origins", "prewarm_watchlist", "fmp_api_keys", "google_api_keys", mode='before')
     @classmethod
     def assemble_cors_origins(cls, v: Union[List[str], str]) -> List[str]:
         if isinstance(v, str) and not v.startswith("["):
@@ -0,0 +1,107 @@
+"""Relevance-ranked, token-budgeted prompt context.
+
+Risk factors arrive one paragraph per line (see
+``filing_parser.join_paragraphs``). Each paragraph is scored against the
+scope taxonomy: the pain themes and keywords that ``scope_engine`` later maps
+onto tiles. Scoring uses the precompiled ``scope_engine.DEFAULT_RULES``
+matchers, so it is one pass per paragraph no matter how large the
+vocabulary is.
+
+Paragraphs are then picked greedily by marginal value per token. A paragraph
+that adds tiles not covered yet is worth more than one that repeats them.
+Picking stops at ``settings.context_token_budget``, and the chosen
+paragraphs are emitted in document order.
+"""
+
+from typing import NamedTuple
+
+from config import settings
+from filing_parser import PARAGRAPH_SEPARATOR
+from scope_engine import CompiledScopeRules, DEFAULT_RULES
+
+# Rough tokens-per-character ratio for English prose in Gemini's tokenizer.
+CHARS_PER_TOKEN = 4
+# Longer "paragraphs" (e.g. text cached before paragraphs were preserved) are cut into windows.
+MAX_PARAGRAPH_WORDS = 250
+NEW_TILE_WEIGHT = 3.0
+KEYWORD_WEIGHT = 1.0
+
+
+class Paragraph(NamedTuple):
+    position: int
+    text: str
+    tokens: int
+    tiles: frozenset[str]
+    keywords: frozenset[str]
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, -(-len(text) // CHARS_PER_TOKEN))
+
+
+def split_paragraphs(text: str) -> list[str]:
+    """Split stored risk-factor text into paragraphs of at most ``MAX_PARAGRAPH_WORDS`` words."""
+    paragraphs = []
+    for line in text.split(PARAGRAPH_SEPARATOR):
+        words = line.split()
+        for start in range(0, len(words), MAX_PARAGRAPH_WORDS):
+            paragraphs.append(" ".join(words[start:start + MAX_PARAGRAPH_WORDS]))
+    return paragraphs
+
+
+def score_paragraphs(paragraphs: list[str], rules: CompiledScopeRules = DEFAULT_RULES) -> list[Paragraph]:
+    scored = []
+    for position, text in enumerate(paragraphs):
+        lowered = text.lower()
+        # Unlike cards, a paragraph has no title; match themes against the whole text.
+        tiles, keywords = rules.match(lowered, "")
+        scored.append(Paragraph(position, text, estimate_tokens(text), frozenset(tiles), frozenset(keywords)))
+    return scored
+
+
+def select_paragraphs(scored: list[Paragraph], token_budget: int) -> list[Paragraph]:
+    """Greedy budgeted selection by marginal taxonomy coverage per token, returned in document order."""
+    selected: list[Paragraph] = []
+    covered_tiles: set[str] = set()
+    covered_keywords: set[str] = set()
+    remaining = [p for p in scored if p.keywords]
+    budget = token_budget
+
+    while remaining and budget > 0:
+        best, best_value = None, 0.0
+        for paragraph in remaining:
+            if paragraph.tokens > budget:
+                continue
+            gain = (NEW_TILE_WEIGHT * len(paragraph.tiles - covered_tiles)
+                    + KEYWORD_WEIGHT * len(paragraph.keywords - covered_keywords))
+            value = gain / paragraph.tokens
+            if value > best_value:
+                best, best_value = paragraph, value
+        if best is None:
+            break
+        selected.append(best)
+        remaining.remove(best)
+        covered_tiles |= best.tiles
+        covered_keywords |= best.keywords
+        budget -= best.tokens
+
+    # Spend what is left on the section's opening paragraphs, which usually summarise it.
+    chosen = {p.position for p in selected}
+    for paragraph in scored:
+        if budget <= 0:
+            break
+        if paragraph.position not in chosen and paragraph.tokens <= budget:
+            selected.append(paragraph)
+            budget -= paragraph.tokens
+
+    return sorted(selected, key=lambda p: p.position)
+
+
+def build_context(text: str, token_budget: int | None = None) -> str:
+    """Return the most relevant paragraphs of ``text`` that fit in ``token_budget`` tokens."""
+    token_budget = token_budget if token_budget is not None else settings.context_token_budget
+    paragraphs = split_paragraphs(text)
+    if sum(estimate_tokens(p) for p in paragraphs) <= token_budget:
+        return PARAGRAPH_SEPARATOR.join(paragraphs)
+    selected = select_paragraphs(score_paragraphs(paragraphs), token_budget)
+    return PARAGRAPH_SEPARATOR.join(p.text for p in selected)
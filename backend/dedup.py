@@ -0,0 +1,125 @@
+"""Near-duplicate pain-card merging.
+
+Gemini often returns overlapping pain cards, e.g. two margin-pressure cards
+in different words. ``scope_and_merge`` replaces a plain
+``scope_engine.process_scope_and_cards`` call, so each theme reaches the
+response once:
+
+1. every card is fingerprinted with a MinHash signature of the word
+   shingles of its title and blurb: its words, lowercased, with stop words
+   dropped and plural "s" stripped. Paraphrases keep most words but few
+   word pairs, so single words separate them best;
+2. a card whose signature agrees with an earlier card's on at least
+   ``dedup_similarity`` of its positions is merged into that card. That
+   fraction estimates the Jaccard similarity of their shingle sets;
+3. the card kept, the first in Gemini's order, keeps its own title and blurb
+   and takes the union of its group's triggered tiles and keywords.
+"""
+
+import hashlib
+import random
+import re
+from typing import Iterable, Optional
+
+from config import settings
+import metrics
+from scope_engine import CompiledScopeRules, DEFAULT_RULES, process_scope_and_cards
+
+MERGED = metrics.registry.counter(
+    "leadscope_pain_cards_merged_total", "Pain cards merged into an earlier near-duplicate card.")
+
+NUM_HASHES = 64
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240611)
+_PERMUTATIONS = tuple((_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_HASHES))
+
+WORD = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset("""
+a an and are as at be by can could for from has have in into is it its may might of on or our
+over such that the their this those to under was were which while will with within
+""".split())
+
+Signature = tuple[int, ...]
+
+
+def _stem(word: str) -> str:
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def shingles(text: str) -> set[str]:
+    """The normalized words of ``text``."""
+    return {_stem(word) for word in WORD.findall(text.lower()) if word not in STOP_WORDS}
+
+
+def minhash(items: Iterable[str]) -> Signature:
+    """MinHash signature of a set of strings (all zeros for an empty set)."""
+    hashes = [int.from_bytes(hashlib.blake2b(item.encode(), digest_size=8).digest(), "big") for item in items]
+    if not hashes:
+        return (0,) * NUM_HASHES
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def signature(card: dict) -> Signature:
+    return minhash(shingles(f"{card.get('title', '')} {card.get('blurb', '')}"))
+
+
+def similarity(a: Signature, b: Signature) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+class CardGroups:
+    """Cards grouped with their near-duplicates, in order of each group's first card."""
+
+    def __init__(self, threshold: Optional[float] = None):
+        if threshold is None:
+            threshold = settings.dedup_similarity if settings.dedup_enabled else float("inf")
+        self.threshold = threshold
+        self._groups: list[tuple[dict, Signature, set[str], set[str]]] = []
+
+    def add(self, card: dict, sig: Signature, tiles: Iterable[str], keywords: Iterable[str]) -> bool:
+        """Add a scope-mapped card; True if it starts a new group, False if it was merged."""
+        for _, kept_sig, kept_tiles, kept_keywords in self._groups:
+            if similarity(sig, kept_sig) >= self.threshold:
+                kept_tiles.update(tiles)
+                kept_keywords.update(keywords)
+                MERGED.inc()
+                return False
+        self._groups.append((card, sig, set(tiles), set(keywords)))
+        return True
+
+    def cards(self) -> list[dict]:
+        """One card per group, annotated with the group's tiles and keywords (like ``process_scope_and_cards``)."""
+        merged = []
+        for card, _, tiles, keywords in self._groups:
+            card["triggered_tiles"] = sorted(tiles)
+            card["triggering_keywords"] = sorted(keywords)
+            merged.append(card)
+        return merged
+
+    def activated_tiles(self) -> list[str]:
+        return sorted(set().union(*(tiles for _, _, tiles, _ in self._groups)))
+
+
+def merge_version() -> str:
+    """Identifies how ``scope_and_merge`` merges cards under the current settings."""
+    return f"dedup-{settings.dedup_similarity:g}" if settings.dedup_enabled else "dedup-off"
+
+
+def scope_card(card: dict, rules: CompiledScopeRules = DEFAULT_RULES) -> tuple[set[str], set[str]]:
+    """(triggered tiles, triggering keywords) of one card."""
+    return rules.match(card.get("title", "").lower(), card.get("blurb", "").lower())
+
+
+def scope_and_merge(raw_cards: list[dict],
+                    rules: CompiledScopeRules = DEFAULT_RULES) -> tuple[list[dict], list[str]]:
+    """Scope-map ``raw_cards`` (annotated in place) and merge near-duplicates; returns (cards, activated tiles)."""
+    if not settings.dedup_enabled:
+        return process_scope_and_cards(raw_cards, rules)
+    groups = CardGroups()
+    for card in raw_cards:
+        tiles, keywords = scope_card(card, rules)
+        groups.add(card, signature(card), tiles, keywords)
+    return groups.cards(), groups.activated_tiles()
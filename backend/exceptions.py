@@ -18,4 +18,12 @@ class DataParsingError(LeadScopeAIError):
 
 class AIGenerationError(LeadScopeAIError):
     """Raised for errors during AI content generation."""
-    pass
\ No newline at end of file
+    pass
+
+class UpstreamUnavailableError(ExternalAPIError):
+    """Raised when an upstream's circuit breaker is open or the request deadline is spent."""
+    pass
+
+class RateLimitedError(UpstreamUnavailableError):
+    """Raised when an upstream call is shed because its rate limit leaves no token before the deadline."""
+    pass
@@ -0,0 +1,351 @@
+"""Streaming extraction of 10-K sections.
+
+``RiskFactorExtractor`` reproduces the text that the BeautifulSoup-based
+``scraper._extract_risk_factors`` returns (same start markers, same ``<p>``
+text, same "Item N." stop rule) without building a document tree. It is fed
+the filing in chunks as they arrive and reports when the section has ended,
+so the caller can stop downloading the rest of the document.
+
+``SectionIndexer`` reads a whole filing in one pass and splits its visible
+text into every "Item N." section, for ``filing_store``.
+"""
+
+import codecs
+import html
+import re
+from html.entities import html5
+from html.parser import HTMLParser
+from typing import Iterable, Optional
+
+PRIMARY_MARKER = re.compile(r'Item\s+1A\.\s+Risk\s+Factors', re.IGNORECASE)
+FALLBACK_MARKER = re.compile(r'Risk\s+Factors', re.IGNORECASE)
+NEXT_ITEM = re.compile(r'Item\s+\d+[A-Z]?\.', re.IGNORECASE)
+# A line that starts a section, e.g. "ITEM 7. Management's Discussion" or "Item 1A: Risk Factors".
+ITEM_HEADING = re.compile(r'\s*Item\s+(\d{1,2}[A-Z]?)\s*[.:\u2014\u2013-]', re.IGNORECASE)
+
+PARAGRAPH_SEPARATOR = "\n"
+
+TRACKED_TAGS = frozenset(['p', 'h2', 'h3', 'h4'])
+# Tags closed as soon as they open (BeautifulSoup's HTML empty-element tags).
+VOID_TAGS = frozenset([
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link',
+    'menuitem', 'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound',
+    'command', 'frame', 'image', 'isindex', 'nextid', 'spacer',
+])
+# Strings inside these tags are not part of their ancestors' visible text.
+STRING_CONTAINER_TAGS = frozenset(['rt', 'rp', 'style', 'script', 'template'])
+# Tags that end a line of text for ``SectionIndexer`` (table cells share their row's line).
+LINE_BREAK_TAGS = frozenset([
+    'p', 'div', 'br', 'hr', 'li', 'tr', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'section', 'article', 'header', 'footer', 'title', 'body',
+])
+
+
+class _ChunkDecoder:
+    """Incremental decoder for a filing's bytes, falling back to cp1252 on invalid input."""
+
+    def __init__(self, encoding: Optional[str] = None):
+        self._decoder = codecs.getincrementaldecoder(encoding or 'utf-8')()
+        self._fallback = None
+
+    def decode(self, chunk: bytes, final: bool = False) -> str:
+        if self._fallback is None:
+            buffered = self._decoder.getstate()[0]
+            try:
+                return self._decoder.decode(chunk, final)
+            except UnicodeDecodeError:
+                # Not the declared/default encoding; EDGAR's usual suspect is cp1252.
+                self._fallback = codecs.getincrementaldecoder('cp1252')(errors='replace')
+                chunk = buffered + chunk
+        return self._fallback.decode(chunk, final)
+
+
+class _Record:
+    """Text collected for one tracked element."""
+
+    __slots__ = ('collector', 'slot', 'is_heading', 'parts', 'open')
+
+    def __init__(self, collector: '_SectionCollector', slot: int, is_heading: bool):
+        self.collector = collector
+        self.slot = slot
+        self.is_heading = is_heading
+        self.parts: list[str] = []
+        self.open = True
+
+    def add(self, text: str) -> None:
+        # Headings are matched on their raw text; paragraphs keep stripped text.
+        self.parts.append(text if self.is_heading else text.strip())
+
+
+class _SectionCollector:
+    """Collects the elements that follow a start marker until the next "Item N." heading."""
+
+    def __init__(self):
+        self.records: list[_Record] = []
+        self.stop_slot: Optional[int] = None
+
+    def open(self, name: str) -> Optional[_Record]:
+        if self.stop_slot is not None:
+            return None
+        record = _Record(self, len(self.records), name[0] == 'h')
+        self.records.append(record)
+        return record
+
+    def close(self, record: _Record) -> None:
+        record.open = False
+        if record.is_heading and NEXT_ITEM.search("".join(record.parts)):
+            if self.stop_slot is None or record.slot < self.stop_slot:
+                self.stop_slot = record.slot
+
+    @property
+    def done(self) -> bool:
+        if self.stop_slot is None:
+            return False
+        return not any(r.open for r in self.records[:self.stop_slot])
+
+    def paragraphs(self) -> list[str]:
+        records = self.records if self.stop_slot is None else self.records[:self.stop_slot]
+        return ["".join(r.parts) for r in records if not r.is_heading]
+
+    def text(self) -> str:
+        return " ".join(self.paragraphs())
+
+
+class RiskFactorExtractor(HTMLParser):
+    """Incremental risk-factor extractor; feed text or bytes, then call ``result()``."""
+
+    def __init__(self, encoding: Optional[str] = None):
+        super().__init__(convert_charrefs=False)
+        self._decoder = _ChunkDecoder(encoding)
+        self._pending: list[str] = []
+        # Open elements as [name, records] pairs, innermost last.
+        self._stack: list[list] = []
+        self._open_records: list[_Record] = []
+        self._collectors: list[_SectionCollector] = []
+        self._containers = 0
+        self._closed_void: list[str] = []
+        self._primary: Optional[_SectionCollector] = None
+        self._fallback: Optional[_SectionCollector] = None
+        self.bytes_consumed = 0
+
+    # -- public API ---------------------------------------------------------
+
+    @property
+    def done(self) -> bool:
+        """True once the primary section has ended; later input cannot change the result."""
+        return self._primary is not None and self._primary.done
+
+    def feed(self, data: str) -> bool:
+        if not self.done:
+            super().feed(data)
+        return self.done
+
+    def feed_bytes(self, chunk: bytes) -> bool:
+        """Decode and feed a chunk of the raw document. Returns ``done``."""
+        self.bytes_consumed += len(chunk)
+        return self.feed(self._decode(chunk))
+
+    def result(self) -> str:
+        return " ".join(self.paragraphs())
+
+    def paragraphs(self) -> list[str]:
+        """The section's ``<p>`` texts, in document order (finishes parsing if needed)."""
+        if not self.done:
+            self.feed(self._decode(b'', final=True))
+            self.close()
+        collector = self._primary or self._fallback
+        return collector.paragraphs() if collector else []
+
+    # -- decoding -----------------------------------------------------------
+
+    def _decode(self, chunk: bytes, final: bool = False) -> str:
+        return self._decoder.decode(chunk, final)
+
+    # -- string handling ----------------------------------------------------
+
+    def _flush(self) -> None:
+        if self._pending:
+            text = "".join(self._pending)
+            self._pending = []
+            self._on_string(text, visible=self._containers == 0)
+
+    def _on_string(self, text: str, visible: bool) -> None:
+        if self._fallback is None and FALLBACK_MARKER.search(text):
+            self._fallback = self._new_collector()
+            if PRIMARY_MARKER.search(text):
+                self._primary = self._fallback
+        elif self._primary is None and PRIMARY_MARKER.search(text):
+            self._primary = self._new_collector()
+        if visible:
+            for record in self._open_records:
+                record.add(text)
+
+    def _new_collector(self) -> _SectionCollector:
+        collector = _SectionCollector()
+        self._collectors.append(collector)
+        return collector
+
+    def handle_data(self, data: str) -> None:
+        self._pending.append(data)
+
+    def handle_charref(self, name: str) -> None:
+        self._pending.append(html.unescape(f"&#{name};"))
+
+    def handle_entityref(self, name: str) -> None:
+        self._pending.append(html5.get(f"{name};", f"&{name}"))
+
+    def handle_comment(self, data: str) -> None:
+        self._flush()
+        self._on_string(data, visible=False)
+
+    def handle_decl(self, decl: str) -> None:
+        self._flush()
+        self._on_string(decl[len("DOCTYPE "):], visible=False)
+
+    def unknown_decl(self, data: str) -> None:
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            self._on_string(data[len("CDATA["):], visible=True)
+        else:
+            self._on_string(data, visible=False)
+
+    def handle_pi(self, data: str) -> None:
+        self._flush()
+        self._on_string(data, visible=False)
+
+    # -- element handling ---------------------------------------------------
+
+    def handle_starttag(self, tag: str, attrs, handle_empty_element: bool = True) -> None:
+        self._flush()
+        records = []
+        if tag in TRACKED_TAGS:
+            for collector in self._collectors:
+                record = collector.open(tag)
+                if record is not None:
+                    records.append(record)
+                    self._open_records.append(record)
+        self._stack.append([tag, records])
+        if tag in STRING_CONTAINER_TAGS:
+            self._containers += 1
+        if handle_empty_element and tag in VOID_TAGS:
+            self._pop_to(tag)
+            self._closed_void.append(tag)
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        self.handle_starttag(tag, attrs, handle_empty_element=False)
+        self._flush()
+        self._pop_to(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in self._closed_void:
+            # Redundant end tag for an empty element; it doesn't end the current string.
+            self._closed_void.remove(tag)
+            return
+        self._flush()
+        self._pop_to(tag)
+
+    def close(self) -> None:
+        super().close()
+        self._flush()
+        while self._stack:
+            self._pop()
+
+    def _pop_to(self, tag: str) -> None:
+        if not any(name == tag for name, _ in self._stack):
+            return
+        while self._stack:
+            if self._pop() == tag:
+                break
+
+    def _pop(self) -> str:
+        name, records = self._stack.pop()
+        if name in STRING_CONTAINER_TAGS:
+            self._containers -= 1
+        for record in records:
+            self._open_records.remove(record)
+            record.collector.close(record)
+        return name
+
+
+class SectionIndexer(HTMLParser):
+    """Split a filing's visible text into its "Item N." sections in a single pass.
+
+    Text is collected line by line (block elements end a line). A line that
+    starts with "Item N." opens section N; the section holds the lines up to
+    the next such line. A filing names each item twice, in its table of
+    contents and in the body, so the longest occurrence of each item wins.
+    """
+
+    def __init__(self, encoding: Optional[str] = None):
+        super().__init__(convert_charrefs=True)
+        self._decoder = _ChunkDecoder(encoding)
+        self._line: list[str] = []
+        self._hidden = 0
+        # Finished sections as (item, lines) and the one being read.
+        self._sections: list[tuple[str, list[str]]] = []
+        self._current: Optional[tuple[str, list[str]]] = None
+        self.bytes_consumed = 0
+
+    def feed_bytes(self, chunk: bytes) -> None:
+        self.bytes_consumed += len(chunk)
+        self.feed(self._decoder.decode(chunk))
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag in STRING_CONTAINER_TAGS:
+            self._hidden += 1
+        elif tag in LINE_BREAK_TAGS:
+            self._end_line()
+        elif tag in ('td', 'th'):
+            self._line.append(" ")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in STRING_CONTAINER_TAGS:
+            self._hidden = max(0, self._hidden - 1)
+        elif tag in LINE_BREAK_TAGS:
+            self._end_line()
+
+    def handle_data(self, data: str) -> None:
+        if not self._hidden:
+            self._line.append(data)
+
+    def _end_line(self) -> None:
+        line = " ".join("".join(self._line).split())
+        self._line = []
+        if not line:
+            return
+        heading = ITEM_HEADING.match(line)
+        if heading:
+            if self._current is not None:
+                self._sections.append(self._current)
+            self._current = (heading.group(1).upper(), [])
+        elif self._current is not None:
+            self._current[1].append(line)
+
+    def sections(self) -> dict[str, str]:
+        """``{item: text}`` in document order, one line per paragraph (finishes parsing)."""
+        self.feed(self._decoder.decode(b'', final=True))
+        self.close()
+        self._end_line()
+        if self._current is not None:
+            self._sections.append(self._current)
+            self._current = None
+        longest: dict[str, tuple[int, str]] = {}
+        for position, (item, lines) in enumerate(self._sections):
+            text = PARAGRAPH_SEPARATOR.join(lines)
+            if item not in longest or len(text) > len(longest[item][1]):
+                longest[item] = (position, text)
+        return {item: text for item, (_, text) in sorted(longest.items(), key=lambda entry: entry[1][0])}
+
+
+def join_paragraphs(paragraphs: Iterable[str]) -> str:
+    """One line per non-empty paragraph, whitespace collapsed; the form risk factors are stored in."""
+    return PARAGRAPH_SEPARATOR.join(filter(None, (" ".join(p.split()) for p in paragraphs)))
+
+
+def extract_risk_factors(chunks: Iterable[bytes], encoding: Optional[str] = None) -> str:
+    """Extract the risk-factor text from an iterable of raw document chunks."""
+    extractor = RiskFactorExtractor(encoding)
+    for chunk in chunks:
+        if extractor.feed_bytes(chunk):
+            break
+    return extractor.result()
@@ -0,0 +1,203 @@
+"""On-disk store of downloaded 10-K filings, split into their sections.
+
+When the store is configured, fetching a filing's risk factors still stops
+the download at the end of Item 1A and returns them at once. A background
+task then downloads the whole filing again, at pre-warm priority, and
+``filing_parser.SectionIndexer`` splits it into its "Item N." sections,
+which are saved here with Item 1A as the extractor returned it.
+``scraper.get_filing_section`` does the same, on the request, for a filing
+not stored yet. Any later read of a section (risk factors, Item 7 MD&A,
+Item 7A market risk, ...) then comes from disk, with no download and no
+parsing.
+
+Filings are content-addressed: the key is the accession number
+(``scraper._filing_id``), or a hash of the URL when that is unknown. Each
+section is zlib-compressed on its own, and the compressed sections are
+concatenated into one blob per filing. A JSON index maps each item to its
+``(offset, length)`` in the blob, so reading a section reads and
+decompresses only that slice.
+
+The store is capped at ``filing_store_max_bytes`` of compressed sections.
+Storing a filing evicts the least recently read filings until the store fits
+again. Reads don't write: each process remembers what it read and records
+it with its next ``put``, or at most every ``TOUCH_FLUSH_INTERVAL`` seconds
+when the database isn't busy.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Optional
+
+from config import settings
+from logger import get_logger
+
+logger = get_logger(__name__)
+
+SCHEMA = """
+PRAGMA auto_vacuum = FULL;
+PRAGMA journal_mode = WAL;
+CREATE TABLE IF NOT EXISTS filings (
+    filing_key TEXT PRIMARY KEY,
+    url        TEXT NOT NULL,
+    sections   TEXT NOT NULL,
+    body       BLOB NOT NULL,
+    size       INTEGER NOT NULL,
+    stored_at  REAL NOT NULL,
+    last_used  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS filings_last_used ON filings (last_used);
+"""
+TOUCH_FLUSH_INTERVAL = 60.0
+
+
+def filing_key(url: str, filing_id: Optional[str] = None) -> str:
+    """The store key of a filing: its accession number, else a hash of its URL."""
+    if filing_id:
+        return filing_id
+    return "url:" + hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+
+
+def pack(sections: dict[str, str]) -> tuple[dict[str, tuple[int, int]], bytes]:
+    """Compress each section separately; returns ``({item: (offset, length)}, body)``."""
+    index = {}
+    body = bytearray()
+    for item, text in sections.items():
+        blob = zlib.compress(text.encode("utf-8"), 6)
+        index[item] = (len(body), len(blob))
+        body += blob
+    return index, bytes(body)
+
+
+class FilingStore:
+    """SQLite-backed store; safe to use from several threads and processes at once."""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        # Read times not yet written to ``last_used``, by filing key.
+        self._touched: dict[str, float] = {}
+        self._touch_lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def index(self, key: str) -> Optional[dict[str, tuple[int, int]]]:
+        """``{item: (offset, length)}`` for a stored filing, or None."""
+        row = self._connection().execute("SELECT sections FROM filings WHERE filing_key = ?", (key,)).fetchone()
+        return {item: tuple(span) for item, span in json.loads(row[0]).items()} if row else None
+
+    def section(self, key: str, item: str) -> Optional[str]:
+        """The text of one section; "" if the filing has no such item, None if it isn't stored."""
+        conn = self._connection()
+        index = self.index(key)
+        if index is None:
+            return None
+        self._touch(key)
+        span = index.get(item.upper())
+        if span is None:
+            return ""
+        offset, length = span
+        row = conn.execute("SELECT substr(body, ?, ?) FROM filings WHERE filing_key = ?",
+                           (offset + 1, length, key)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def _touch(self, key: str) -> None:
+        with self._touch_lock:
+            self._touched[key] = time.time()
+            due = time.monotonic() - self._flushed_at >= TOUCH_FLUSH_INTERVAL
+        if due:
+            self.flush_touches()
+
+    def _take_touches(self) -> list[tuple[float, str]]:
+        with self._touch_lock:
+            touched, self._touched = self._touched, {}
+            self._flushed_at = time.monotonic()
+        return [(used, key) for key, used in touched.items()]
+
+    @staticmethod
+    def _write_touches(conn: sqlite3.Connection, touches: list[tuple[float, str]]) -> None:
+        conn.executemany("UPDATE filings SET last_used = MAX(last_used, ?) WHERE filing_key = ?", touches)
+
+    def flush_touches(self) -> None:
+        """Record pending reads in ``last_used``; skipped (and kept for later) while the database is busy."""
+        touches = self._take_touches()
+        if not touches:
+            return
+        conn = self._connection()
+        try:
+            with conn:
+                self._write_touches(conn, touches)
+        except sqlite3.OperationalError as e:
+            logger.debug("Filing store busy; deferring %s last-used updates: %s", len(touches), e)
+            with self._touch_lock:
+                for used, key in touches:
+                    self._touched[key] = max(used, self._touched.get(key, 0.0))
+
+    def put(self, key: str, url: str, sections: dict[str, str]) -> int:
+        """Store a filing's sections, evicting old filings to stay under the cap; returns bytes stored."""
+        index, body = pack(sections)
+        if len(body) > self.max_bytes:
+            logger.warning("Filing %s (%s bytes compressed) exceeds the filing store cap; not stored",
+                           key, len(body))
+            return 0
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            # Eviction goes by last_used, so record this process's reads first.
+            self._write_touches(conn, self._take_touches())
+            conn.execute(
+                "INSERT OR REPLACE INTO filings (filing_key, url, sections, body, size, stored_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, url, json.dumps(index), body, len(body), now, now),
+            )
+            evicted = self._evict(conn, keep=key)
+        if evicted:
+            logger.info("Filing store evicted %s least recently used filings", evicted)
+        return len(body)
+
+    def _evict(self, conn: sqlite3.Connection, keep: str) -> int:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM filings").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        victims = []
+        for key, size in conn.execute(
+                "SELECT filing_key, size FROM filings WHERE filing_key != ? ORDER BY last_used", (keep,)):
+            victims.append((key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+        conn.executemany("DELETE FROM filings WHERE filing_key = ?", victims)
+        return len(victims)
+
+    def total_bytes(self) -> int:
+        return self._connection().execute("SELECT COALESCE(SUM(size), 0) FROM filings").fetchone()[0]
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM filings").fetchone()[0]
+
+
+_store: Optional[FilingStore] = None
+
+
+def get_store() -> Optional[FilingStore]:
+    """The configured store (created on first use), or None when ``FILING_STORE_PATH`` is unset."""
+    global _store
+    path = settings.filing_store_path
+    if not path:
+        return None
+    if _store is None or _store.path != path:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        _store = FilingStore(path, settings.filing_store_max_bytes)
+    return _store
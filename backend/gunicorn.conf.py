@@ -0,0 +1,74 @@
+"""Production server profile: ``gunicorn main:app`` from backend/.
+
+gunicorn reads this file automatically. It runs ``web_concurrency`` uvicorn
+workers (0 means one per CPU) behind a single master. The app is imported
+once in the master (``preload_app``), so the pydantic models, the compiled
+taxonomy and (loaded explicitly, since the app defers it) the Gemini SDK are
+in memory before forking. Workers share those pages copy-on-write instead of
+each importing them again.
+
+State that must be consistent across workers lives in Redis (``REDIS_URL``):
+the response cache, batch job progress, and, with
+``SINGLEFLIGHT_REDIS_ENABLED``, request coalescing, and, with
+``RATE_LIMIT_REDIS_ENABLED``, the upstream rate limits. Each worker gets an
+equal share of the per-upstream concurrency limits (at least one slot), and
+of the rate limits when they are not shared, so the configured totals hold
+as long as there are no more workers than slots or burst calls.
+In-process pre-warming, if enabled, runs in exactly one worker.
+
+Development keeps using ``uvicorn main:app --reload``.
+"""
+
+import gc
+import os
+
+from config import settings
+
+bind = settings.server_bind
+workers = settings.web_concurrency or os.cpu_count() or 1
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+timeout = settings.server_timeout
+graceful_timeout = settings.server_graceful_timeout
+keepalive = 5
+# Logging goes through the app's own JSON logger; gunicorn's access log would duplicate it.
+accesslog = None
+
+# The worker that runs the pre-warm scheduler, if any (tracked in the master).
+_prewarm_owner = None
+
+
+def when_ready(server):
+    import clients
+    import logger as app_logger
+
+    if preload_app:
+        clients.load_gemini_sdk()
+
+    # Everything imported so far is shared with the workers; keep the collector from touching
+    # (and so copying) those pages in every worker.
+    gc.collect()
+    gc.freeze()
+    if workers > 1 and not settings.redis_url:
+        app_logger.logger.warning(
+            "Running %s workers without REDIS_URL: caches, batch jobs and coalescing are per worker", workers)
+    if workers > 1 and not (settings.redis_url and settings.rate_limit_redis_enabled):
+        app_logger.logger.warning(
+            "Running %s workers without shared rate limits: each worker gets 1/%s of every upstream quota",
+            workers, workers)
+
+
+def pre_fork(server, worker):
+    global _prewarm_owner
+    if settings.prewarm_enabled and _prewarm_owner not in server.WORKERS.values():
+        _prewarm_owner = worker
+    worker.runs_prewarm = worker is _prewarm_owner
+
+
+def post_fork(server, worker):
+    import rate_limit
+    import upstream
+
+    upstream.set_worker_count(server.num_workers)
+    rate_limit.governor.reset()
+    settings.prewarm_enabled = settings.prewarm_enabled and worker.runs_prewarm
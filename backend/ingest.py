@@ -0,0 +1,202 @@
+"""Offline ingestion of 10-K risk factors from EDGAR bulk archives.
+
+Usage (from backend/):
+
+    python ingest.py --index master.idx [--index ...] --tickers company_tickers.json \\
+        --store risk_factors.db ARCHIVE [ARCHIVE ...]
+
+``--index``: EDGAR full-index ``master.idx`` files (``CIK|Company Name|Form
+Type|Date Filed|Filename``). Only their ``10-K`` entries are ingested.
+
+``--tickers``: SEC's ``company_tickers.json``, used to map CIKs to tickers.
+
+``ARCHIVE``: a filing tarball (``.tar``, ``.tar.gz``, ``.tgz``), a directory
+of them, or complete-submission files named ``<accession>.txt`` /
+``<accession>.nc``.
+
+Archives are processed in parallel across a process pool. Each worker pulls
+the 10-K document out of every wanted submission and streams it through
+``filing_parser.RiskFactorExtractor``, the same extractor the request path
+uses. Workers return compressed text and the parent process writes it to the
+store. Point ``RISK_STORE_PATH`` at the resulting file and the API serves
+these filings without touching sec.gov.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import tarfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import BinaryIO, Iterator, NamedTuple
+
+from filing_parser import RiskFactorExtractor, join_paragraphs
+from risk_store import RiskFactorStore, compress
+
+ACCESSION_IN_NAME = re.compile(r'(\d{10})-?(\d{2})-?(\d{6})')
+SUBMISSION_SUFFIXES = (".txt", ".nc")
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz")
+CHUNK_SIZE = 64 * 1024
+
+
+class IndexEntry(NamedTuple):
+    cik: int
+    filed_at: str
+
+
+def accession_id(name: str) -> str | None:
+    """18-digit accession number from a file name or index path, or None."""
+    match = ACCESSION_IN_NAME.search(os.path.basename(name))
+    return "".join(match.groups()) if match else None
+
+
+def read_master_index(path: str, form_type: str = "10-K") -> dict[str, IndexEntry]:
+    """Map accession id -> (CIK, date filed) for every ``form_type`` entry in a master.idx file."""
+    entries = {}
+    with open(path, encoding="latin-1") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("|")
+            if len(parts) != 5 or parts[2] != form_type or not parts[0].isdigit():
+                continue
+            filing_id = accession_id(parts[4])
+            if filing_id:
+                entries[filing_id] = IndexEntry(int(parts[0]), parts[3])
+    return entries
+
+
+def read_ticker_map(path: str) -> dict[int, list[str]]:
+    """Map CIK -> tickers from SEC's company_tickers.json."""
+    with open(path) as f:
+        data = json.load(f)
+    tickers: dict[int, list[str]] = {}
+    for company in data.values():
+        tickers.setdefault(int(company["cik_str"]), []).append(company["ticker"].upper())
+    return tickers
+
+
+def iter_document_chunks(stream: BinaryIO, form_type: str = "10-K") -> Iterator[bytes]:
+    """Yield the ``<TEXT>`` body of the first ``form_type`` document in an EDGAR submission."""
+    in_document = in_text = False
+    doc_type = None
+    buffered: list[bytes] = []
+    size = 0
+    for line in stream:
+        if in_text:
+            if line.lstrip().upper().startswith(b"</TEXT>"):
+                break
+            buffered.append(line)
+            size += len(line)
+            if size >= CHUNK_SIZE:
+                yield b"".join(buffered)
+                buffered, size = [], 0
+            continue
+        upper = line.strip().upper()
+        if upper == b"<DOCUMENT>":
+            in_document, doc_type = True, None
+        elif upper == b"</DOCUMENT>":
+            in_document = False
+        elif in_document and upper.startswith(b"<TYPE>"):
+            doc_type = upper[len(b"<TYPE>"):].strip().decode("ascii", "replace")
+        elif in_document and upper.startswith(b"<TEXT>") and doc_type == form_type:
+            in_text = True
+    if buffered:
+        yield b"".join(buffered)
+
+
+def extract_submission(stream: BinaryIO) -> str:
+    """Risk-factor paragraphs of the 10-K in a complete-submission stream, one per line (empty if none)."""
+    extractor = RiskFactorExtractor()
+    for chunk in iter_document_chunks(stream):
+        if extractor.feed_bytes(chunk):
+            break
+    return join_paragraphs(extractor.paragraphs())
+
+
+_wanted: frozenset[str] = frozenset()
+
+
+def _init_worker(wanted: frozenset[str]) -> None:
+    global _wanted
+    _wanted = wanted
+
+
+def _process_archive(path: str) -> list[tuple[str, bytes]]:
+    """Worker: return ``(filing_id, compressed text)`` for wanted 10-Ks in one archive or submission file."""
+    results = []
+
+    def _handle(name: str, stream: BinaryIO) -> None:
+        filing_id = accession_id(name)
+        if filing_id not in _wanted:
+            return
+        text = extract_submission(stream)
+        if text:
+            results.append((filing_id, compress(text)))
+
+    if path.endswith(ARCHIVE_SUFFIXES):
+        with tarfile.open(path, "r:*") as tar:
+            for member in tar:
+                if member.isfile() and member.name.endswith(SUBMISSION_SUFFIXES):
+                    with tar.extractfile(member) as stream:
+                        _handle(member.name, stream)
+    else:
+        with open(path, "rb") as stream:
+            _handle(path, stream)
+    return results
+
+
+def _expand_inputs(paths: list[str]) -> list[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(
+                str(p) for p in Path(path).rglob("*") if p.name.endswith(ARCHIVE_SUFFIXES + SUBMISSION_SUFFIXES)
+            )
+        else:
+            files.append(path)
+    return files
+
+
+def ingest(index_paths: list[str], ticker_path: str, store_path: str, archives: list[str],
+           workers: int | None = None) -> int:
+    """Ingest every indexed 10-K found in ``archives`` into the store; returns rows written."""
+    index: dict[str, IndexEntry] = {}
+    for path in index_paths:
+        index.update(read_master_index(path))
+    tickers = read_ticker_map(ticker_path)
+    wanted = frozenset(fid for fid, entry in index.items() if entry.cik in tickers)
+
+    store = RiskFactorStore(store_path)
+    files = _expand_inputs(archives)
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(wanted,)) as pool:
+        futures = {pool.submit(_process_archive, path): path for path in files}
+        for future in as_completed(futures):
+            rows = []
+            for filing_id, blob in future.result():
+                entry = index[filing_id]
+                rows += [(ticker, filing_id, entry.cik, entry.filed_at, blob) for ticker in tickers[entry.cik]]
+            if rows:
+                written += store.put_many(rows)
+            print(f"{futures[future]}: {len(rows)} records", file=sys.stderr)
+    return written
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("archives", nargs="+", help="filing tarballs, submission files or directories of them")
+    parser.add_argument("--index", action="append", required=True, help="EDGAR full-index master.idx (repeatable)")
+    parser.add_argument("--tickers", required=True, help="SEC company_tickers.json")
+    parser.add_argument("--store", required=True, help="SQLite risk-factor store to create or update")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    written = ingest(args.index, args.tickers, args.store, args.archives, args.workers)
+    print(f"Wrote {written} records to {args.store} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Aho-Corasick multi-keyword matcher.
+
+Finds every keyword that occurs as a substring of a text in a single pass,
+independent of how many keywords were compiled in. Semantics are exactly
+those of ``keyword in text`` evaluated for each keyword, including
+overlapping and nested matches.
+"""
+
+from collections import deque
+from typing import Iterable
+
+
+class KeywordMatcher:
+    """Automaton compiled once from a keyword list and reused for every text."""
+
+    def __init__(self, keywords: Iterable[str]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[str, ...]] = [()]
+
+        for keyword in dict.fromkeys(keywords):
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                state = nxt
+            self._out[state] += (keyword,)
+
+        # Breadth-first pass: fail links point at the longest proper suffix that
+        # is also a trie prefix, and each state inherits that suffix's outputs.
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> set[str]:
+        """Return the set of keywords that occur anywhere in ``text``."""
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set(out[0])
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
@@ -1,35 +1,183 @@
-"""Logging configuration for Lead-Scope AI backend."""
+"""Logging configuration for Lead-Scope AI backend.
 
+Callers never block on output. Records pass through a ``QueueHandler`` to a
+``QueueListener`` thread, which formats and writes them. Messages use
+%-style arguments and are only rendered on that thread, if at all.
+
+* ``LOG_FORMAT=json`` (the default) writes one JSON object per line, with the
+  request id and any ``extra`` fields such as stage timings. ``text`` writes
+  the classic single-line format.
+* ``LOG_LEVELS="scraper=DEBUG,cache=WARNING"`` sets per-module levels on top
+  of ``LOG_LEVEL``. Module loggers are children of ``lead_scope_ai``; get one
+  with ``get_logger(__name__)``.
+* ``LOG_SAMPLE_RATES="health_check=0.01"`` keeps only that fraction of
+  records logged with ``extra={"event": "health_check"}``.
+"""
+
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
+from contextvars import ContextVar
 from typing import Optional
+
 from config import settings
 
+ROOT_LOGGER_NAME = "lead_scope_ai"
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+_STANDARD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "event"}
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def parse_pairs(spec: str) -> dict[str, str]:
+    """Parse ``"a=1,b=2"`` into ``{"a": "1", "b": "2"}``; blank entries are ignored."""
+    pairs = {}
+    for item in spec.split(","):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            pairs[key.strip()] = value.strip()
+    return pairs
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        if getattr(record, "event", None):
+            entry["event"] = record.event
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Stamps the current request id onto records in the calling thread."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps every Nth record of each sampled event (N = 1 / rate); warnings and above always pass."""
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.every = {event: max(1, round(1 / rate)) if rate > 0 else 0 for event, rate in rates.items()}
+        self._seen: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, "event", None)
+        if event is None or event not in self.every or record.levelno >= logging.WARNING:
+            return True
+        every = self.every[event]
+        if every == 0:
+            return False
+        with self._lock:
+            seen = self._seen.get(event, 0)
+            self._seen[event] = seen + 1
+        return seen % every == 0
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """Queues the record as-is; the stdlib handler would render the message in the calling thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info:
+            # Tracebacks can't wait: the frames they reference may change before the listener runs.
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def _formatter() -> logging.Formatter:
+    return JSONFormatter() if settings.log_format.lower() == "json" else logging.Formatter(TEXT_FORMAT)
+
+
+def _level(name: str) -> int:
+    return getattr(logging, name.upper(), logging.INFO)
+
+
 def setup_logger(name: Optional[str] = None) -> logging.Logger:
-    """Set up and configure logger."""
-    logger = logging.getLogger(name or __name__)
-    
+    """Set up the application logger: queue handler, background writer, filters and levels."""
+    global _listener
+    logger = logging.getLogger(name or ROOT_LOGGER_NAME)
+
     if logger.handlers:
         return logger
-    
-    # Set log level
-    log_level = getattr(logging, settings.log_level.upper(), logging.INFO)
-    logger.setLevel(log_level)
-    
-    # Create console handler
-    handler = logging.StreamHandler(sys.stdout)
-    handler.setLevel(log_level)
-    
-    # Create formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    handler.setFormatter(formatter)
-    
-    # Add handler to logger
+
+    logger.setLevel(_level(settings.log_level))
+    logger.propagate = False
+    for module, level in parse_pairs(settings.log_levels).items():
+        logging.getLogger(f"{logger.name}.{module}").setLevel(_level(level))
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(_formatter())
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = LazyQueueHandler(records)
+    handler.addFilter(SamplingFilter({event: float(rate) for event, rate in parse_pairs(settings.log_sample_rates).items()}))
+    handler.addFilter(ContextFilter())
     logger.addHandler(handler)
-    
+
+    _listener = logging.handlers.QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+    os.register_at_fork(after_in_child=_restart_after_fork)
     return logger
 
+
+def _restart_after_fork() -> None:
+    """Give a forked worker its own queue and writer thread; threads don't survive ``fork``."""
+    global _listener
+    if _listener is None:
+        return
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    for handler in logging.getLogger(ROOT_LOGGER_NAME).handlers:
+        if isinstance(handler, LazyQueueHandler):
+            handler.queue = records
+    _listener = logging.handlers.QueueListener(records, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def bind_request_id(value: Optional[str]) -> None:
+    """Tag every record logged from the current context (request) with ``value``."""
+    request_id.set(value)
+
+
+def get_logger(module: str) -> logging.Logger:
+    """The logger for a module (pass ``__name__``); its level can be set with ``LOG_LEVELS``."""
+    short = module.rsplit(".", 1)[-1]
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{short}")
+
+
 # Global logger instance
-logger = setup_logger("lead_scope_ai")
\ No newline at end of file
+logger = setup_logger(ROOT_LOGGER_NAME)
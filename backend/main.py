@@ -1,8 +1,13 @@
 # backend/main.py - FINAL CORRECTED VERSION
 
-from fastapi import FastAPI, HTTPException
+import json
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from tenacity import retry, stop_after_attempt, wait_exponential
+from fastapi.responses import StreamingResponse
 
 # Import custom modules and error types
 from exceptions import (
@@ -10,17 +15,43 @@ from exceptions import (
     ExternalAPIError,
     DataParsingError,
     AIGenerationError,
+    UpstreamUnavailableError,
+    LeadScopeAIError,
 )
-from logger import logger
+from logger import get_logger, bind_request_id
 from config import settings
-import scraper
-import ai_engine
-import scope_engine
-import classifier
-from schemas import AssessmentResponse, PainCard # <-- Ensure PainCard is also imported
+import batch
+import metrics
+import pipeline
+import prewarm
+import resilience
+import response_cache
+from cache import cache
+from clients import registry
+from schemas import AssessmentResponse, BatchAssessmentRequest, BatchJobStatus
 from validators import validate_ticker
 
+logger = get_logger(__name__)
+
+STARTED_AT = time.time()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await registry.start()
+    prewarmer = None
+    if settings.prewarm_enabled:
+        prewarmer = prewarm.Prewarmer(settings.prewarm_watchlist)
+        prewarmer.start()
+    app.state.prewarmer = prewarmer
+    yield
+    if prewarmer is not None:
+        await prewarmer.stop()
+    await registry.aclose()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title=settings.project_name,
     version=settings.project_version,
     description="API for generating CFO-level pain points from company data.",
@@ -34,50 +65,130 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_timings(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    bind_request_id(request_id)
+    timings = metrics.begin_request_timings()
+    started = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - started
+    route = request.scope.get("route")
+    route_path = route.path if route else "unmatched"
+    metrics.REQUEST_SECONDS.observe(elapsed, route=route_path, status=str(response.status_code))
+    if timings:
+        response.headers["Server-Timing"] = metrics.server_timing_header(timings)
+    response.headers["X-Request-ID"] = request_id
+    logger.info(
+        "%s %s -> %s in %.1f ms", request.method, route_path, response.status_code, elapsed * 1000,
+        extra={
+            "event": "health_check" if route_path == "/health" else "request",
+            "method": request.method,
+            "route": route_path,
+            "status": response.status_code,
+            "duration_ms": round(elapsed * 1000, 1),
+            "stages_ms": metrics.stage_totals_ms(timings),
+        },
+    )
+    return response
+
+
 @app.get("/health")
 def health_check():
-    logger.info("Health check endpoint accessed")
-    return {"status": "ok", "timestamp": settings.start_time}
+    return {"status": "ok", "timestamp": STARTED_AT}
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/v1/cache/stats")
+def cache_stats():
+    return cache.stats()
+
+
+@app.get("/api/v1/prewarm")
+def prewarm_status(request: Request):
+    prewarmer = getattr(request.app.state, "prewarmer", None)
+    return {"enabled": prewarmer is not None, "tickers": prewarmer.status() if prewarmer else {}}
+
+
+@app.get("/api/v1/upstreams")
+def upstream_status():
+    return resilience.breaker_states()
 
 
 @app.get("/api/v1/assessment/{ticker}", response_model=AssessmentResponse)
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-def get_assessment_data(ticker: str):
-    logger.info(f"Assessment request started for: {ticker}")
+async def get_assessment_data(ticker: str, request: Request):
+    logger.info("Assessment request started for: %s", ticker)
     try:
-        validated_ticker = validate_ticker(ticker)
-        logger.info(f"Validated ticker: {validated_ticker}")
-
-        context, company_profile = scraper.get_company_context(validated_ticker)
-        logger.info(f"Successfully retrieved company context for {validated_ticker}")
-
-        raw_cards = ai_engine.generate_pain_cards(context, validated_ticker)
-        
-        enriched_cards_data, activated_tiles = scope_engine.process_scope_and_cards(raw_cards)
-        
-        # This line now works because 'PainCard' is imported
-        validated_cards = [PainCard(**card) for card in enriched_cards_data]
-        
-        classified_industry, geo_scope = classifier.classify_company(company_profile)
-
-        return AssessmentResponse(
-            pain_cards=validated_cards,
-            scope_summary=f"Phase 1 Scope includes {len(activated_tiles)} key modules...",
-            activated_tiles=activated_tiles,
-            industry=company_profile.get("industry"),
-            revenue=company_profile.get("revenue"),
-            classified_industry=classified_industry,
-            geo_scope=geo_scope,
-        )
+        with metrics.stage("validate"):
+            validated_ticker = validate_ticker(ticker)
+        logger.info("Validated ticker: %s", validated_ticker)
+
+        # Already serialized (and validated) once; returned as-is instead of through response_model.
+        encoded = await pipeline.run_assessment_encoded(validated_ticker)
+        return response_cache.to_http(encoded, request.headers)
     except ValidationError as e:
-        logger.warning(f"Validation error for ticker {ticker}: {e}")
+        logger.warning("Validation error for ticker %s: %s", ticker, e)
         raise HTTPException(status_code=400, detail=str(e))
+    except UpstreamUnavailableError as e:
+        logger.error("Upstream unavailable for %s: %s", ticker, e)
+        raise HTTPException(status_code=503, detail="Upstream data provider temporarily unavailable.")
     except (ExternalAPIError, DataParsingError) as e:
-        logger.error(f"Unexpected error retrieving company data for {ticker}: {e}")
+        logger.error("Unexpected error retrieving company data for %s: %s", ticker, e)
         raise HTTPException(status_code=500, detail="Failed to retrieve or parse company data.")
     except AIGenerationError as e:
-        logger.error(f"AI generation failed for {ticker}: {e}")
+        logger.error("AI generation failed for %s: %s", ticker, e)
         raise HTTPException(status_code=500, detail="AI engine failed to generate pain cards.")
     except Exception as e:
-        logger.critical(f"An unhandled exception occurred for ticker {ticker}: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="An unexpected internal server error occurred.")
\ No newline at end of file
+        logger.critical("An unhandled exception occurred for ticker %s: %s", ticker, e, exc_info=True)
+        raise HTTPException(status_code=500, detail="An unexpected internal server error occurred.")
+
+
+@app.get("/api/v1/assessment/{ticker}/stream")
+async def stream_assessment_data(ticker: str):
+    """Server-Sent Events variant of the assessment: profile first, then each pain card as it is generated."""
+    try:
+        with metrics.stage("validate"):
+            validated_ticker = validate_ticker(ticker)
+    except ValidationError as e:
+        logger.warning("Validation error for ticker %s: %s", ticker, e)
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def events():
+        try:
+            async for event, data in pipeline.stream_assessment(validated_ticker):
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        except LeadScopeAIError as e:
+            logger.error("Streaming assessment failed for %s: %s", validated_ticker, e)
+            yield f"event: error\ndata: {json.dumps({'detail': pipeline.error_detail(e)})}\n\n"
+        except Exception as e:
+            logger.critical("An unhandled exception occurred streaming %s: %s", validated_ticker, e,
+                            exc_info=True)
+            yield f"event: error\ndata: {json.dumps({'detail': pipeline.error_detail(e)})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/v1/assessments", response_model=BatchJobStatus, status_code=202)
+async def create_batch_assessment(request: BatchAssessmentRequest):
+    try:
+        job = batch.start_job(request.tickers)
+    except ValidationError as e:
+        logger.warning("Rejected batch assessment request: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.snapshot()
+
+
+@app.get("/api/v1/assessments/{job_id}", response_model=BatchJobStatus)
+async def get_batch_assessment(job_id: str, offset: int = Query(0, ge=0)):
+    status = await batch.get_job_status(job_id, offset)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch job not found.")
+    return status
@@ -0,0 +1,170 @@
+"""Prometheus-format metrics and per-request stage timings.
+
+Pipeline code wraps each stage in ``stage("<name>")``. Every observation
+feeds a process-wide histogram served on ``/metrics``. It is also added to
+the current request's timing list, which ``main`` turns into a
+``Server-Timing`` response header.
+"""
+
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, Optional
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: LabelKey, extra: Optional[tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._series: dict[LabelKey, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+        counts = series[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: list = []
+        self._collectors: list[Callable[[], list[str]]] = []
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        metric = Counter(name, help_text)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], list[str]]) -> None:
+        """Register a callback producing exposition lines at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    "leadscope_stage_duration_seconds", "Time spent in each assessment pipeline stage.")
+REQUEST_SECONDS = registry.histogram(
+    "leadscope_request_duration_seconds", "End-to-end HTTP request latency.")
+UPSTREAM_ERRORS = registry.counter(
+    "leadscope_upstream_errors_total", "Failed calls to upstream services.")
+UPSTREAM_BYTES = registry.counter(
+    "leadscope_upstream_bytes_total", "Response bytes downloaded from upstream services.")
+
+_request_timings: ContextVar[Optional[list[tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def observe_stage(name: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as pipeline stage ``name``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+
+def record_upstream_error(upstream: str) -> None:
+    UPSTREAM_ERRORS.inc(upstream=upstream)
+
+
+def record_upstream_bytes(upstream: str, n_bytes: int) -> None:
+    UPSTREAM_BYTES.inc(n_bytes, upstream=upstream)
+
+
+def begin_request_timings() -> list[tuple[str, float]]:
+    """Start collecting stage timings for the current request and return the list."""
+    timings: list[tuple[str, float]] = []
+    _request_timings.set(timings)
+    return timings
+
+
+def stage_totals_ms(timings: list[tuple[str, float]]) -> dict[str, float]:
+    """Total milliseconds per stage; streamed requests repeat stages once per card."""
+    totals: dict[str, float] = {}
+    for name, seconds in timings:
+        totals[name] = totals.get(name, 0.0) + seconds * 1000
+    return {name: round(ms, 1) for name, ms in totals.items()}
+
+
+def server_timing_header(timings: list[tuple[str, float]]) -> str:
+    """Format stage timings as a ``Server-Timing`` header value (durations in ms)."""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings)
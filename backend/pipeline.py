@@ -0,0 +1,286 @@
+"""Assessment pipeline shared by the API endpoints."""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+from config import settings
+from exceptions import (
+    ValidationError,
+    ExternalAPIError,
+    DataParsingError,
+    AIGenerationError,
+    UpstreamUnavailableError,
+)
+from logger import get_logger
+from cache import cache, make_key, MISS
+import scraper
+import ai_engine
+import dedup
+import classifier
+from schemas import AssessmentResponse, PainCard
+import assessment_store
+from assessment_store import build_response
+import metrics
+import rate_limit
+import resilience
+import response_cache
+from singleflight import assessments
+
+logger = get_logger(__name__)
+
+# Cached assessments built with another taxonomy, card merging or classifier are treated as misses.
+SCORING_VERSION = f"{assessment_store.scope_version()}.{classifier.DEFAULT_CLASSIFIER.version}"
+
+
+def error_detail(e: Exception) -> str:
+    """Client-facing message for a pipeline failure, shared by every endpoint."""
+    if isinstance(e, ValidationError):
+        return str(e)
+    if isinstance(e, UpstreamUnavailableError):
+        return "Upstream data provider temporarily unavailable."
+    if isinstance(e, (ExternalAPIError, DataParsingError)):
+        return "Failed to retrieve or parse company data."
+    if isinstance(e, AIGenerationError):
+        return "AI engine failed to generate pain cards."
+    return "An unexpected internal server error occurred."
+
+
+CardGenerator = Callable[[str, str], Awaitable[list[dict]]]
+
+
+def _cache_value(response: AssessmentResponse) -> dict:
+    etag = response_cache.encode_response(response).etag
+    return {**response.model_dump(), "scoring_version": SCORING_VERSION, "etag": etag}
+
+
+def is_current_assessment(cached: Any) -> bool:
+    return cached is not MISS and cached.get("scoring_version") == SCORING_VERSION
+
+
+async def _stored_assessment(ticker: str, filing_id: Optional[str]) -> Optional[dict]:
+    store = assessment_store.get_store()
+    if store is None or filing_id is None:
+        return None
+    with metrics.stage("assessment_store_lookup"):
+        return await asyncio.to_thread(store.current, ticker, filing_id)
+
+
+async def _stored_or_generated_cards(ticker: str, filing_id: Optional[str], context: str,
+                                     generate_cards: CardGenerator) -> list[dict]:
+    """Raw pain cards from the assessment store when it has this filing, else freshly generated."""
+    store = assessment_store.get_store()
+    if store is not None and filing_id is not None:
+        record = await asyncio.to_thread(store.get, ticker, filing_id)
+        if record is not None:
+            return record.raw_cards
+    return await generate_cards(context, ticker)
+
+
+async def _save_assessment(ticker: str, filing_id: Optional[str], profile: dict, raw_cards: list[dict],
+                           response: AssessmentResponse) -> None:
+    store = assessment_store.get_store()
+    if store is None or filing_id is None:
+        return
+    try:
+        await asyncio.to_thread(
+            store.save, ticker, filing_id, profile, raw_cards, response.model_dump(),
+            assessment_store.scope_version(), classifier.DEFAULT_CLASSIFIER.version)
+    except Exception as e:
+        # The store is an optimisation; never fail a finished assessment over it.
+        logger.warning("Could not persist assessment for %s: %s", ticker, e)
+
+
+async def run_assessment(validated_ticker: str, generate_cards: Optional[CardGenerator] = None,
+                         refresh: bool = False) -> AssessmentResponse:
+    """Build the assessment for an already-validated ticker, using cached artifacts where possible.
+
+    Concurrent calls for the same ticker share a single pipeline run when they
+    run it the same way: same priority, ``refresh`` and card generator kind.
+    An interactive request therefore never waits behind a batch or prewarm run.
+    ``generate_cards(context, ticker)`` replaces ``ai_engine.generate_pain_cards``,
+    e.g. with a ``PainCardBatcher`` for batch jobs. ``refresh`` rebuilds (and
+    re-caches) the assessment itself even when a cached one exists.
+    """
+    return await assessments.do(
+        _flight_key(validated_ticker, generate_cards, refresh),
+        lambda: _run_with_deadline(validated_ticker, generate_cards, refresh))
+
+
+def _flight_key(validated_ticker: str, generate_cards: Optional[CardGenerator], refresh: bool) -> str:
+    # The shared run keeps its leader's priority, deadline, card generator and refresh flag.
+    mode = rate_limit.PRIORITY_NAMES[rate_limit.current_priority()]
+    if refresh:
+        mode += ":refresh"
+    if generate_cards is not None:
+        mode += ":custom-cards"
+    return f"{validated_ticker}:{mode}"
+
+
+async def run_assessment_encoded(validated_ticker: str) -> response_cache.EncodedResponse:
+    """``run_assessment`` for the HTTP endpoint, returning the serialized response.
+
+    A current cached assessment is answered from the worker's encoded-body
+    cache without building an ``AssessmentResponse`` at all.
+    """
+    if settings.cache_enabled:
+        with resilience.deadline(settings.request_deadline):
+            filing = await scraper.get_latest_filing(validated_ticker)
+        if filing is not None:
+            cached = await cache.get(make_key("assessment", validated_ticker, filing["id"]))
+            if is_current_assessment(cached):
+                return response_cache.for_cached(cached)
+    return response_cache.encode_response(await run_assessment(validated_ticker))
+
+
+async def _run_with_deadline(validated_ticker: str, generate_cards: Optional[CardGenerator],
+                             refresh: bool = False) -> AssessmentResponse:
+    with resilience.deadline(settings.request_deadline):
+        return await _run_assessment(validated_ticker, generate_cards or ai_engine.generate_pain_cards, refresh)
+
+
+async def _run_assessment(validated_ticker: str, generate_cards: CardGenerator,
+                          refresh: bool = False) -> AssessmentResponse:
+    filing = await scraper.get_latest_filing(validated_ticker)
+    filing_id = filing["id"] if filing else None
+    use_cache = settings.cache_enabled and filing_id is not None
+
+    assessment_key = make_key("assessment", validated_ticker, filing_id)
+    cached = await cache.get(assessment_key) if use_cache and not refresh else MISS
+    if is_current_assessment(cached):
+        logger.info("Serving cached assessment for %s (filing %s)", validated_ticker, filing_id)
+        return AssessmentResponse(**cached)
+
+    stored = await _stored_assessment(validated_ticker, filing_id) if not refresh else None
+    if stored is not None:
+        logger.info("Serving stored assessment for %s (filing %s)", validated_ticker, filing_id)
+        response = AssessmentResponse(**stored)
+        if use_cache:
+            await cache.set(assessment_key, _cache_value(response))
+        return response
+
+    context, company_profile = await scraper.get_company_context(validated_ticker, filing)
+    logger.info("Successfully retrieved company context for %s", validated_ticker)
+
+    raw_cards = await cache.get_or_load(
+        make_key("pain_cards", validated_ticker, filing_id or "profile"),
+        lambda: _stored_or_generated_cards(validated_ticker, filing_id, context, generate_cards),
+    )
+
+    # Scope mapping annotates cards in place; keep the cached raw cards pristine.
+    with metrics.stage("scope_mapping"):
+        enriched_cards_data, activated_tiles = dedup.scope_and_merge([dict(card) for card in raw_cards])
+
+    validated_cards = [PainCard(**card) for card in enriched_cards_data]
+
+    with metrics.stage("classification"):
+        classified_industry, geo_scope = classifier.classify_company(company_profile)
+
+    response = build_response(validated_cards, activated_tiles, company_profile, classified_industry, geo_scope)
+    if use_cache:
+        await cache.set(assessment_key, _cache_value(response))
+    await _save_assessment(validated_ticker, filing_id, company_profile, raw_cards, response)
+    return response
+
+
+async def _iterate(items: list) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+
+async def _until(source: AsyncIterator[Any], expires: float) -> AsyncIterator[Any]:
+    """Iterate ``source`` under the request deadline ending at ``expires`` (``time.monotonic()``).
+
+    The deadline is entered around each step rather than across the yields, so
+    it never leaks into the consumer's context; a stalled step is cancelled.
+    """
+    while True:
+        left = expires - time.monotonic()
+        if left <= 0:
+            raise UpstreamUnavailableError("Request deadline exceeded while streaming pain cards")
+        with resilience.deadline(left):
+            try:
+                item = await asyncio.wait_for(source.__anext__(), left)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                raise UpstreamUnavailableError("Request deadline exceeded while streaming pain cards") from None
+        yield item
+
+
+async def stream_assessment(validated_ticker: str) -> AsyncIterator[tuple[str, dict]]:
+    """Yield ``(event, data)`` pairs as the assessment is built.
+
+    A ``profile`` event (profile fields plus classification) is sent as soon
+    as the FMP profile arrives. Then comes one ``card`` event per scope-mapped
+    pain card, as Gemini streams it, skipping near-duplicates of a card already
+    sent, and finally a ``complete`` event with the scope summary. The whole
+    stream shares one ``request_deadline``, like ``run_assessment``. The
+    finished assessment is cached exactly like ``run_assessment``'s.
+    """
+    expires = time.monotonic() + settings.request_deadline
+    with resilience.deadline(settings.request_deadline):
+        filing = await scraper.get_latest_filing(validated_ticker)
+        # Start the filing download now; it overlaps with the profile event.
+        profile_task = asyncio.create_task(scraper.get_company_profile(validated_ticker))
+        risk_task = asyncio.create_task(scraper.get_risk_factors(validated_ticker, filing))
+    filing_id = filing["id"] if filing else None
+    use_cache = settings.cache_enabled and filing_id is not None
+
+    try:
+        company_profile = await profile_task
+        with metrics.stage("classification"):
+            classified_industry, geo_scope = classifier.classify_company(company_profile)
+        yield "profile", {
+            "ticker": validated_ticker,
+            "company_name": company_profile.get("companyName"),
+            "industry": company_profile.get("industry"),
+            "revenue": company_profile.get("revenue"),
+            "classified_industry": classified_industry,
+            "geo_scope": geo_scope,
+        }
+
+        assessment_key = make_key("assessment", validated_ticker, filing_id)
+        cached = await cache.get(assessment_key) if use_cache else MISS
+        if not is_current_assessment(cached):
+            stored = await _stored_assessment(validated_ticker, filing_id)
+            cached = stored if stored is not None else MISS
+        if cached is not MISS:
+            risk_task.cancel()
+            for card in cached["pain_cards"]:
+                yield "card", card
+            yield "complete", {"scope_summary": cached["scope_summary"], "activated_tiles": cached["activated_tiles"]}
+            return
+
+        context = scraper.build_context(validated_ticker, await risk_task, company_profile)
+        cards_key = make_key("pain_cards", validated_ticker, filing_id or "profile")
+        cached_cards = await cache.get(cards_key) if settings.cache_enabled else MISS
+        if cached_cards is not MISS:
+            source = _iterate(cached_cards)
+        else:
+            source = _until(ai_engine.stream_pain_cards(context, validated_ticker), expires)
+
+        # Near-duplicates of a card already sent are not sent; their tiles join it in the final response.
+        raw_cards, groups = [], dedup.CardGroups()
+        async for raw_card in source:
+            raw_cards.append(raw_card)
+            card = dict(raw_card)
+            with metrics.stage("scope_mapping"):
+                tiles, keywords = dedup.scope_card(card)
+                card["triggered_tiles"], card["triggering_keywords"] = sorted(tiles), sorted(keywords)
+                is_new = groups.add(card, dedup.signature(card), tiles, keywords)
+            if is_new:
+                yield "card", PainCard(**card).model_dump()
+
+        if cached_cards is MISS and settings.cache_enabled:
+            await cache.set(cards_key, raw_cards)
+        validated_cards = [PainCard(**card) for card in groups.cards()]
+        response = build_response(
+            validated_cards, groups.activated_tiles(), company_profile, classified_industry, geo_scope)
+        if use_cache:
+            await cache.set(assessment_key, _cache_value(response))
+        await _save_assessment(validated_ticker, filing_id, company_profile, raw_cards, response)
+        yield "complete", {"scope_summary": response.scope_summary, "activated_tiles": response.activated_tiles}
+    finally:
+        for task in (profile_task, risk_task):
+            task.cancel()
@@ -0,0 +1,175 @@
+"""Background pre-warming of watchlist assessments.
+
+Watched tickers are kept warm so that user requests for them are served from
+the cache. On a cadence, each ticker:
+
+* re-fetches its FMP profile and revenue every ``prewarm_profile_interval``;
+* looks up its latest 10-K every ``prewarm_filing_interval``, bypassing the
+  cached lookup. A new filing invalidates the old filing's artifacts;
+* re-computes the assessment whenever those inputs changed, or when the cached
+  assessment has expired.
+
+Background calls go through the regular ``upstream_slot`` limits and wait
+for rate-limit tokens at the lowest priority, behind the reserve kept for
+interactive calls (see ``rate_limit``), so pre-warming never takes more
+than its share from user traffic.
+
+The scheduler starts from the API lifespan when ``prewarm_enabled`` is set.
+It can also run as a separate worker with ``python prewarm.py``. A separate
+worker needs ``redis_url`` configured so the API processes see what it
+computed.
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from cache import cache, make_key
+from config import settings
+from exceptions import ValidationError
+from logger import get_logger
+import metrics
+import pipeline
+import rate_limit
+import scraper
+from validators import validate_ticker
+
+logger = get_logger(__name__)
+
+# Profile fields that end up in the assessment response.
+ASSESSMENT_PROFILE_FIELDS = ("industry", "sector", "country", "description", "revenue")
+
+REFRESHES = metrics.registry.counter(
+    "leadscope_prewarm_refreshes_total", "Watchlist refreshes by outcome (warm, recomputed, error).")
+
+
+@dataclass
+class WatchState:
+    filing_id: Optional[str] = None
+    profile_fingerprint: Optional[str] = None
+    profile_refreshed_at: float = float("-inf")
+    filing_checked_at: float = float("-inf")
+    assessed_at: Optional[float] = None
+    last_error: Optional[str] = None
+
+
+def _fingerprint(profile: dict) -> str:
+    relevant = {field: profile.get(field) for field in ASSESSMENT_PROFILE_FIELDS}
+    return hashlib.sha1(json.dumps(relevant, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class Prewarmer:
+    def __init__(self, tickers: list[str], concurrency: Optional[int] = None):
+        self.tickers = []
+        for ticker in tickers:
+            if not ticker or not ticker.strip():
+                continue
+            try:
+                self.tickers.append(validate_ticker(ticker))
+            except ValidationError as e:
+                logger.warning("Ignoring watchlist entry %r: %s", ticker, e)
+        self.tickers = list(dict.fromkeys(self.tickers))
+        self.concurrency = concurrency or settings.prewarm_concurrency
+        self.state = {ticker: WatchState() for ticker in self.tickers}
+        self._task: Optional[asyncio.Task] = None
+
+    async def refresh(self, ticker: str) -> str:
+        """Bring one ticker up to date; returns ``"warm"`` or ``"recomputed"``."""
+        state = self.state[ticker]
+        now = time.monotonic()
+        inputs_changed = False
+
+        if now - state.profile_refreshed_at >= settings.prewarm_profile_interval:
+            profile = await scraper.refresh_company_profile(ticker)
+            state.profile_refreshed_at = now
+            fingerprint = _fingerprint(profile)
+            inputs_changed |= fingerprint != state.profile_fingerprint
+            state.profile_fingerprint = fingerprint
+
+        if now - state.filing_checked_at >= settings.prewarm_filing_interval:
+            filing = await scraper.refresh_latest_filing(ticker)
+            state.filing_checked_at = now
+            filing_id = filing["id"] if filing else None
+            inputs_changed |= filing_id != state.filing_id
+            state.filing_id = filing_id
+
+        # Assessments are only cached for companies with a 10-K; without one there is nothing to keep warm.
+        if not inputs_changed and (state.filing_id is None or pipeline.is_current_assessment(
+                await cache.get(make_key("assessment", ticker, state.filing_id)))):
+            return "warm"
+
+        # Pain cards are keyed by filing, so a profile-only change reuses them without new SEC/Gemini calls.
+        await pipeline.run_assessment(ticker, refresh=True)
+        state.assessed_at = time.time()
+        return "recomputed"
+
+    async def run_once(self) -> dict[str, int]:
+        """Refresh every watched ticker once; returns the count per outcome."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        outcomes = {"warm": 0, "recomputed": 0, "error": 0}
+
+        async def _one(ticker: str) -> None:
+            async with semaphore:
+                try:
+                    outcome = await self.refresh(ticker)
+                    self.state[ticker].last_error = None
+                except Exception as e:
+                    outcome = "error"
+                    self.state[ticker].last_error = pipeline.error_detail(e)
+                    logger.warning("Pre-warming %s failed: %s", ticker, e)
+            outcomes[outcome] += 1
+            REFRESHES.inc(outcome=outcome)
+
+        with rate_limit.priority(rate_limit.PREWARM):
+            await asyncio.gather(*(_one(ticker) for ticker in self.tickers))
+        return outcomes
+
+    async def run_forever(self) -> None:
+        logger.info("Pre-warming %s watchlist tickers", len(self.tickers))
+        # Wake often enough to honour the shorter of the two cadences.
+        period = min(settings.prewarm_filing_interval, settings.prewarm_profile_interval)
+        while True:
+            started = time.monotonic()
+            outcomes = await self.run_once()
+            logger.info("Pre-warm pass finished in %.1fs: %s", time.monotonic() - started, outcomes)
+            await asyncio.sleep(max(0.0, period - (time.monotonic() - started)))
+
+    def start(self) -> asyncio.Task:
+        self._task = asyncio.create_task(self.run_forever())
+        return self._task
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> dict:
+        return {
+            ticker: {
+                "filing_id": state.filing_id,
+                "assessed_at": state.assessed_at,
+                "last_error": state.last_error,
+            }
+            for ticker, state in self.state.items()
+        }
+
+
+async def main() -> None:
+    from clients import registry
+
+    await registry.start()
+    try:
+        await Prewarmer(settings.prewarm_watchlist).run_forever()
+    finally:
+        await registry.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
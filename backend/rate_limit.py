@@ -0,0 +1,348 @@
+"""Upstream rate governor: token buckets per upstream API key.
+
+FMP and Gemini quotas are per key, so every configured key gets its own
+token bucket. A bucket refills at ``<upstream>_requests_per_minute`` and holds
+up to ``<upstream>_burst`` calls. The burst is set per upstream because a few
+seconds' worth of a slow quota such as Gemini's is less than one call, which
+would leave no room for the reserve below. ``resilience.call`` asks
+the governor for a key before every attempt. The governor takes a token from
+the first key with one to spare, rotating the starting key so load spreads
+evenly, and the attempt runs with that key (``current_key()``). A 429 blocks
+the key that got it for the ``Retry-After`` period (or
+``rate_limit_cooldown``), so the retry moves on to another key.
+
+Callers wait in a per-upstream queue ordered by priority: interactive
+requests first, then batch jobs, then pre-warming (see ``priority``). A
+caller that could not get a token before its request deadline is shed
+immediately with ``RateLimitedError``, instead of queueing and then timing out.
+Background priorities also leave ``rate_limit_reserve`` of each bucket for
+interactive traffic, which holds across processes.
+
+With ``rate_limit_redis_enabled`` and a ``REDIS_URL``, buckets live in Redis
+and are updated by a Lua script, so all workers draw from the same quota.
+Otherwise, and whenever Redis fails, each worker process uses in-process
+buckets holding its share of the quota: the rate and burst divided by the
+number of workers (``upstream.worker_count()``), with room for at least one call.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+from config import settings
+from exceptions import RateLimitedError
+from logger import get_logger
+from cache import connect_redis
+import metrics
+from upstream import worker_count
+
+logger = get_logger(__name__)
+
+INTERACTIVE, BATCH, PREWARM = 0, 1, 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch", PREWARM: "prewarm"}
+
+WAIT_SECONDS = metrics.registry.histogram(
+    "leadscope_rate_limit_wait_seconds", "Time upstream calls waited for a rate-limit token.")
+SHED = metrics.registry.counter(
+    "leadscope_rate_limit_shed_total", "Upstream calls shed because no token was due before their deadline.")
+THROTTLED = metrics.registry.counter(
+    "leadscope_upstream_throttled_total", "429 / quota errors reported by upstreams, per upstream.")
+
+_priority: ContextVar[int] = ContextVar("upstream_priority", default=INTERACTIVE)
+_granted: ContextVar[Optional[str]] = ContextVar("granted_key", default=None)
+
+# Take a token from the first bucket (KEYS, in rotation order) holding at least ARGV[3].
+# Returns {index, "0"} on success (1-based) or {0, seconds until the soonest bucket is ready}.
+_TAKE_SCRIPT = """
+local rate, capacity, needed, ttl = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), ARGV[4]
+local t = redis.call("TIME")
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local best = -1
+for i, key in ipairs(KEYS) do
+    local state = redis.call("HMGET", key, "tokens", "updated", "blocked_until")
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    local blocked = tonumber(state[3]) or 0
+    local wait
+    if now < blocked then
+        wait = blocked - now
+    else
+        tokens = math.min(capacity, tokens + (now - updated) * rate)
+        if tokens >= needed then
+            redis.call("HSET", key, "tokens", tostring(tokens - 1), "updated", tostring(now))
+            redis.call("EXPIRE", key, ttl)
+            return {i, "0"}
+        end
+        wait = (needed - tokens) / rate
+    end
+    if best < 0 or wait < best then
+        best = wait
+    end
+end
+return {0, tostring(best)}
+"""
+
+_BLOCK_SCRIPT = """
+local t = redis.call("TIME")
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call("HSET", KEYS[1], "tokens", "0", "updated", tostring(now), "blocked_until", tostring(now + tonumber(ARGV[1])))
+redis.call("EXPIRE", KEYS[1], ARGV[2])
+return 1
+"""
+
+
+@contextmanager
+def priority(level: int) -> Iterator[None]:
+    """Run the enclosed upstream calls (and the tasks they start) at ``level``."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    """The priority upstream calls made here would queue at."""
+    return _priority.get()
+
+
+@contextmanager
+def granted(key: str) -> Iterator[None]:
+    token = _granted.set(key)
+    try:
+        yield
+    finally:
+        _granted.reset(token)
+
+
+def current_key() -> str:
+    """The API key granted to the upstream call in progress."""
+    key = _granted.get()
+    if key is None:
+        raise RuntimeError("No upstream key granted; upstream calls must go through resilience.call")
+    return key
+
+
+def api_keys(upstream: str) -> list[str]:
+    """The configured keys for ``upstream``, primary first. SEC has no key; it gets one shared bucket."""
+    if upstream == "fmp":
+        keys = [settings.fmp_api_key, *settings.fmp_api_keys]
+    elif upstream == "gemini":
+        keys = [settings.google_api_key, *settings.google_api_keys]
+    else:
+        keys = [upstream]
+    return list(dict.fromkeys(key for key in keys if key))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def take(self, needed: float = 1.0) -> float:
+        """Take one token if at least ``needed`` are available; else return the seconds until they are."""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= needed:
+            self.tokens -= 1
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def block(self, seconds: float) -> None:
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.blocked_until = max(self.blocked_until, self.updated + seconds)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "turn")
+
+    def __init__(self, priority: int, seq: int):
+        self.priority = priority
+        self.seq = seq
+        self.turn = asyncio.Event()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class UpstreamGovernor:
+    """Token buckets and the priority queue for one upstream."""
+
+    def __init__(self, upstream: str, keys: list[str], per_minute: float, burst: float = 1.0,
+                 redis_url: Optional[str] = None, namespace: str = "leadscope", workers: int = 1):
+        self.upstream = upstream
+        self.keys = keys
+        # The whole quota, shared through Redis, and this worker's share of it for the local buckets.
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, burst)
+        self.local_rate = self.rate / workers
+        self.local_capacity = max(1.0, burst / workers)
+        self.buckets = [TokenBucket(self.local_rate, self.local_capacity) for _ in keys]
+        self.redis_url = redis_url
+        self._redis_keys = [
+            f"{namespace}:ratelimit:{upstream}:{hashlib.sha1(key.encode()).hexdigest()[:12]}" for key in keys]
+        self._redis = None
+        self._rotation = itertools.count()
+        self._seq = itertools.count()
+        self._queue: list[_Waiter] = []
+
+    @property
+    def limited(self) -> bool:
+        return self.rate > 0
+
+    def _redis_client(self):
+        if self._redis is None and self.redis_url:
+            self._redis = connect_redis(self.redis_url)
+        return self._redis
+
+    def _shared(self) -> bool:
+        return settings.rate_limit_redis_enabled and bool(self.redis_url)
+
+    @staticmethod
+    def _needed(level: int, capacity: float) -> float:
+        """Tokens a bucket of ``capacity`` must hold before ``level`` may take one; background work leaves a reserve."""
+        if level == INTERACTIVE:
+            return 1.0
+        return min(capacity, 1.0 + capacity * settings.rate_limit_reserve)
+
+    async def _take(self, level: int) -> tuple[Optional[str], float]:
+        """One attempt across all keys: ``(key, 0)`` or ``(None, seconds until one may be ready)``."""
+        start = next(self._rotation) % len(self.keys)
+        order = [(start + i) % len(self.keys) for i in range(len(self.keys))]
+        client = self._redis_client() if settings.rate_limit_redis_enabled else None
+        if client is not None:
+            try:
+                index, wait = await client.eval(
+                    _TAKE_SCRIPT, len(order), *(self._redis_keys[i] for i in order),
+                    self.rate, self.capacity, self._needed(level, self.capacity), int(self.capacity / self.rate) + 60)
+                index = int(index)
+                return (self.keys[order[index - 1]], 0.0) if index else (None, float(wait))
+            except Exception as e:
+                logger.warning("Shared rate limit for %s unavailable, using local buckets: %s", self.upstream, e)
+        needed = self._needed(level, self.local_capacity)
+        waits = []
+        for i in order:
+            wait = self.buckets[i].take(needed)
+            if wait == 0.0:
+                return self.keys[i], 0.0
+            waits.append(wait)
+        return None, min(waits)
+
+    def _wake_head(self) -> None:
+        if self._queue:
+            self._queue[0].turn.set()
+
+    async def acquire(self, budget: Optional[float] = None) -> str:
+        """Wait for a token and return the key it belongs to, or raise ``RateLimitedError``.
+
+        ``budget`` is the caller's remaining deadline in seconds (None: no deadline).
+        """
+        if not self.limited:
+            return self.keys[next(self._rotation) % len(self.keys)]
+        level = _priority.get()
+        started = time.monotonic()
+        waiter = _Waiter(level, next(self._seq))
+        ahead = bisect.bisect(self._queue, waiter)
+        # Callers ahead each need a token; shed now rather than queue for a deadline we can't meet.
+        # Full buckets serve the first callers at once, so only the rest wait for refills.
+        rate, capacity = (self.rate, self.capacity) if self._shared() else (self.local_rate, self.local_capacity)
+        if budget is not None and (ahead - capacity * len(self.keys)) / (rate * len(self.keys)) > budget:
+            self._shed(level, ahead)
+        self._queue.insert(ahead, waiter)
+        self._wake_head()
+        try:
+            while True:
+                left = None if budget is None else budget - (time.monotonic() - started)
+                if self._queue[0] is not waiter:
+                    waiter.turn.clear()
+                    try:
+                        await asyncio.wait_for(waiter.turn.wait(), left)
+                    except asyncio.TimeoutError:
+                        self._shed(level, self._queue.index(waiter))
+                    continue
+                key, wait = await self._take(level)
+                if key is not None:
+                    WAIT_SECONDS.observe(time.monotonic() - started, upstream=self.upstream,
+                                         priority=PRIORITY_NAMES[level])
+                    return key
+                if left is not None and wait > left:
+                    self._shed(level, 0)
+                # Sleep until a token is due; a more urgent caller arriving meanwhile takes the head.
+                await asyncio.sleep(wait)
+        finally:
+            self._queue.remove(waiter)
+            self._wake_head()
+
+    def _shed(self, level: int, ahead: int) -> None:
+        SHED.inc(upstream=self.upstream, priority=PRIORITY_NAMES[level])
+        raise RateLimitedError(
+            f"{self.upstream} rate limit: no token before the request deadline ({ahead} calls queued ahead)")
+
+    async def block(self, key: str, seconds: float) -> None:
+        """Stop handing out ``key`` for ``seconds`` (the upstream said it is over quota)."""
+        THROTTLED.inc(upstream=self.upstream)
+        if key not in self.keys:
+            return
+        index = self.keys.index(key)
+        self.buckets[index].block(seconds)
+        client = self._redis_client() if settings.rate_limit_redis_enabled else None
+        if client is not None:
+            try:
+                await client.eval(_BLOCK_SCRIPT, 1, self._redis_keys[index], seconds, int(seconds) + 60)
+            except Exception as e:
+                logger.warning("Could not share %s throttling through Redis: %s", self.upstream, e)
+
+    def snapshot(self) -> dict:
+        return {"keys": len(self.keys), "requests_per_minute": self.rate * 60 * len(self.keys),
+                "queued": len(self._queue)}
+
+
+class RateGovernor:
+    """One ``UpstreamGovernor`` per upstream, created on first use from the current settings."""
+
+    def __init__(self):
+        self._upstreams: dict[str, UpstreamGovernor] = {}
+
+    def __getitem__(self, upstream: str) -> UpstreamGovernor:
+        governor = self._upstreams.get(upstream)
+        if governor is None:
+            governor = UpstreamGovernor(upstream, api_keys(upstream),
+                                        getattr(settings, f"{upstream}_requests_per_minute"),
+                                        getattr(settings, f"{upstream}_burst"), settings.redis_url,
+                                        workers=worker_count())
+            self._upstreams[upstream] = governor
+        return governor
+
+    def reset(self) -> None:
+        self._upstreams.clear()
+
+    def snapshot(self) -> dict[str, dict]:
+        return {name: governor.snapshot() for name, governor in sorted(self._upstreams.items())}
+
+
+governor = RateGovernor()
+
+
+def _render_queue_metrics() -> list[str]:
+    lines = [
+        "# HELP leadscope_rate_limit_queued Upstream calls waiting for a rate-limit token.",
+        "# TYPE leadscope_rate_limit_queued gauge",
+    ]
+    for name, snapshot in governor.snapshot().items():
+        lines.append(f'leadscope_rate_limit_queued{{upstream="{name}"}} {snapshot["queued"]}')
+    return lines
+
+
+metrics.registry.add_collector(_render_queue_metrics)
@@ -0,0 +1,295 @@
+"""Retries, deadline budgets and circuit breakers for upstream calls.
+
+Every FMP, SEC and Gemini call goes through ``call(upstream, operation)``
+(``stream`` for a streamed answer), which also takes a token (and API key)
+from ``rate_limit.governor``. That function retries only transient failures of that one call, using
+exponential backoff with full jitter. It never sleeps past the current
+request's deadline (see ``deadline``). Each upstream host also has a
+circuit breaker: once the host has failed repeatedly, calls fail fast with
+``UpstreamUnavailableError`` instead of queueing behind a dead service.
+"""
+
+import asyncio
+import random
+import sys
+import time
+from contextlib import AsyncExitStack, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Iterator, Optional, TypeVar
+
+import httpx
+
+from config import settings
+from exceptions import UpstreamUnavailableError
+from logger import get_logger
+from upstream import UPSTREAMS, upstream_slot
+import metrics
+import rate_limit
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+RETRYABLE_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+# Names in ``google.api_core.exceptions``; see ``_google_errors``.
+THROTTLING_GOOGLE_ERRORS = ("TooManyRequests", "ResourceExhausted")
+RETRYABLE_GOOGLE_ERRORS = (*THROTTLING_GOOGLE_ERRORS, "InternalServerError", "ServiceUnavailable", "DeadlineExceeded")
+
+RETRIES = metrics.registry.counter(
+    "leadscope_upstream_retries_total", "Upstream calls retried after a transient failure.")
+REJECTIONS = metrics.registry.counter(
+    "leadscope_circuit_breaker_rejections_total", "Upstream calls rejected by an open circuit breaker.")
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """Bound all upstream calls in this context to ``seconds`` from now (never extends an outer deadline)."""
+    expires = time.monotonic() + seconds
+    outer = _deadline.get()
+    token = _deadline.set(expires if outer is None else min(outer, expires))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def expires() -> Optional[float]:
+    """When the current deadline ends (``time.monotonic()`` seconds), or None when unbounded."""
+    return _deadline.get()
+
+
+@contextmanager
+def deadline_at(expires_at: Optional[float]) -> Iterator[None]:
+    """Replace the current deadline with ``expires_at`` (None: unbounded), for work shared by several requests."""
+    token = _deadline.set(expires_at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current deadline budget, or None when unbounded."""
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open probe."""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_started: Optional[float] = None
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == OPEN:
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.state = HALF_OPEN
+            self._probe_started = None
+        if self.state == HALF_OPEN:
+            # One probe at a time; a probe that never reported back (e.g. it
+            # was cancelled) is considered lost after another reset period.
+            if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                return False
+            self._probe_started = now
+        return True
+
+    def record_success(self) -> None:
+        if self.state != CLOSED:
+            logger.info("Circuit breaker for %s closed", self.name)
+        self.state = CLOSED
+        self.failures = 0
+        self._probe_started = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning("Circuit breaker for %s opened after %s failures", self.name, self.failures)
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self._probe_started = None
+
+    def snapshot(self) -> dict:
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        return {"state": self.state, "consecutive_failures": self.failures, "retry_in_seconds": retry_in}
+
+
+breakers = {
+    name: CircuitBreaker(name, settings.breaker_failure_threshold, settings.breaker_reset_timeout)
+    for name in UPSTREAMS
+}
+
+
+def _google_errors(names: tuple[str, ...]) -> tuple[type, ...]:
+    """The named ``google.api_core`` exception classes.
+
+    Importing that module costs more than the rest of this one, and its
+    errors can only have been raised once the Gemini SDK has loaded it. Until
+    then, this returns ().
+    """
+    module = sys.modules.get("google.api_core.exceptions")
+    return tuple(getattr(module, name) for name in names) if module is not None else ()
+
+
+def is_transient(exc: BaseException) -> bool:
+    """True for failures worth retrying: connection problems, timeouts, throttling and 5xx."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(exc, (httpx.TransportError, *_google_errors(RETRYABLE_GOOGLE_ERRORS)))
+
+
+def _backoff(attempt: int, exc: BaseException) -> float:
+    delay = random.uniform(0, min(settings.retry_max_delay, settings.retry_base_delay * 2 ** (attempt - 1)))
+    if isinstance(exc, httpx.HTTPStatusError):
+        retry_after = exc.response.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), settings.retry_max_delay))
+    return delay
+
+
+def _throttle_seconds(exc: BaseException) -> Optional[float]:
+    """How long the key behind a quota error should rest, or None if ``exc`` is not one."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        if exc.response.status_code != 429:
+            return None
+        retry_after = exc.response.headers.get("Retry-After", "")
+        return float(retry_after) if retry_after.isdigit() else settings.rate_limit_cooldown
+    if isinstance(exc, _google_errors(THROTTLING_GOOGLE_ERRORS)):
+        return settings.rate_limit_cooldown
+    return None
+
+
+async def call(upstream: str, operation: Callable[[], Awaitable[T]]) -> T:
+    """Run ``operation`` against ``upstream`` with its retry policy, breaker and the request deadline.
+
+    Each attempt first takes a token from the rate governor; ``operation``
+    reads the API key it was granted with ``rate_limit.current_key()``.
+    """
+    async def in_slot() -> T:
+        async with upstream_slot(upstream):
+            return await operation()
+
+    return await _call(upstream, in_slot)
+
+
+async def stream(upstream: str, open_stream: Callable[[], Awaitable[AsyncIterable[T]]]) -> AsyncIterator[T]:
+    """Yield the items of a streamed ``upstream`` answer, like ``call`` but for the whole stream.
+
+    Opening the stream is retried like ``call``. The ``upstream_slot`` taken
+    to open it is held until the stream ends. A transient error mid-stream,
+    or a gap of more than ``http_timeout`` between items, counts as an
+    upstream failure for the breaker. The caller cancelling the stream (e.g.
+    its deadline ending) does not.
+    """
+    breaker = breakers[upstream]
+    held = AsyncExitStack()
+
+    async def open_in_slot() -> AsyncIterable[T]:
+        await held.enter_async_context(upstream_slot(upstream))
+        try:
+            return await open_stream()
+        except BaseException:
+            await held.aclose()
+            raise
+
+    async with held:
+        items = (await _call(upstream, open_in_slot)).__aiter__()
+        while True:
+            try:
+                item = await asyncio.wait_for(items.__anext__(), settings.http_timeout)
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                breaker.record_failure()
+                raise UpstreamUnavailableError(
+                    f"{upstream} stream stalled for {settings.http_timeout:g}s") from None
+            except Exception as exc:
+                if is_transient(exc) and _throttle_seconds(exc) is None:
+                    breaker.record_failure()
+                raise
+            yield item
+    breaker.record_success()
+
+
+async def _call(upstream: str, attempt_once: Callable[[], Awaitable[T]]) -> T:
+    breaker = breakers[upstream]
+    governor = rate_limit.governor[upstream]
+    attempts = getattr(settings, f"{upstream}_retry_attempts")
+
+    for attempt in range(1, attempts + 1):
+        if not breaker.allow():
+            REJECTIONS.inc(upstream=upstream)
+            raise UpstreamUnavailableError(f"Circuit breaker for {upstream} is open")
+        budget = remaining()
+        if budget is not None and budget <= 0:
+            raise UpstreamUnavailableError(f"Request deadline exceeded before calling {upstream}")
+        key = await governor.acquire(budget)
+        budget = remaining()
+        try:
+            with rate_limit.granted(key):
+                result = await (attempt_once() if budget is None
+                                else asyncio.wait_for(attempt_once(), max(budget, 0)))
+        except asyncio.TimeoutError:
+            budget = remaining()
+            if budget is not None and budget <= 0:
+                # The caller's deadline ran out, however healthy the upstream is.
+                raise UpstreamUnavailableError(f"Request deadline exceeded waiting for {upstream}") from None
+            breaker.record_failure()
+            raise UpstreamUnavailableError(f"{upstream} timed out") from None
+        except Exception as exc:
+            if not is_transient(exc):
+                # The host answered; the failure is about this request, not its health.
+                breaker.record_success()
+                raise
+            throttle = _throttle_seconds(exc)
+            if throttle is not None:
+                # Over quota is about this key, not the host's health. Rest the key; the retry
+                # waits in the governor for another key (or this one) instead of backing off blindly.
+                await governor.block(key, throttle)
+                delay = 0.0
+            else:
+                breaker.record_failure()
+                delay = _backoff(attempt, exc)
+            budget = remaining()
+            if attempt == attempts or (budget is not None and delay >= budget):
+                raise
+            RETRIES.inc(upstream=upstream)
+            logger.warning("Transient %s failure (%r); retry %s/%s in %.2fs",
+                           upstream, exc, attempt, attempts - 1, delay)
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+    raise AssertionError("unreachable")
+
+
+def breaker_states() -> dict[str, dict]:
+    return {name: breaker.snapshot() for name, breaker in breakers.items()}
+
+
+def _render_breaker_metrics() -> list[str]:
+    lines = [
+        "# HELP leadscope_circuit_breaker_state Circuit breaker state per upstream (0=closed, 1=half-open, 2=open).",
+        "# TYPE leadscope_circuit_breaker_state gauge",
+    ]
+    for name, breaker in sorted(breakers.items()):
+        lines.append(f'leadscope_circuit_breaker_state{{upstream="{name}"}} {_STATE_VALUES[breaker.state]}')
+    return lines
+
+
+metrics.registry.add_collector(_render_breaker_metrics)
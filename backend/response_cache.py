@@ -0,0 +1,119 @@
+"""Serialized assessment responses, ready to send.
+
+An assessment is serialized to JSON once, when it is computed. Its ETag (a
+hash of that JSON) is stored with the cached assessment, so every worker
+agrees on it. The body is kept in a per-worker LRU, keyed by ETag, together
+with gzip (and, when the ``brotli`` package is installed, brotli) copies. A
+request for a cached assessment then costs a cache lookup and a dictionary
+hit: no pydantic validation, no JSON encoding, no compression. A request
+whose ``If-None-Match`` names the current ETag gets an empty 304.
+"""
+
+import gzip
+import hashlib
+from typing import Mapping, NamedTuple, Optional
+
+from fastapi import Response
+
+from cache import LRUCache, MISS
+from config import settings
+import metrics
+from schemas import AssessmentResponse
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+BODIES = metrics.registry.counter(
+    "leadscope_assessment_bodies_total",
+    "Assessment bodies served from the per-worker body cache or serialized on demand.",
+)
+NOT_MODIFIED = metrics.registry.counter(
+    "leadscope_assessment_not_modified_total",
+    "Assessment requests answered with 304 Not Modified.",
+)
+
+
+class EncodedResponse(NamedTuple):
+    etag: str
+    body: bytes
+    gzip: Optional[bytes] = None
+    brotli: Optional[bytes] = None
+
+
+_encoded = LRUCache(settings.response_cache_entries)
+
+
+def etag_for(body: bytes) -> str:
+    return f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def encode(body: bytes, etag: Optional[str] = None) -> EncodedResponse:
+    """Wrap a serialized body, compressing it up front when it is worth it."""
+    etag = etag or etag_for(body)
+    known = _encoded.get(etag)
+    if known is not MISS:
+        return known
+    BODIES.inc(source="encoded")
+    if len(body) < settings.response_compress_min_bytes:
+        encoded = EncodedResponse(etag, body)
+    else:
+        encoded = EncodedResponse(etag, body, gzip.compress(body, compresslevel=6),
+                                  brotli.compress(body, quality=5) if brotli else None)
+    _encoded.set(etag, encoded, settings.cache_ttl_assessment)
+    return encoded
+
+
+def encode_response(response: AssessmentResponse) -> EncodedResponse:
+    return encode(response.model_dump_json().encode())
+
+
+def for_cached(cached: dict) -> EncodedResponse:
+    """The encoded body of a cached assessment value (as written by ``pipeline``)."""
+    encoded = _encoded.get(cached["etag"]) if "etag" in cached else MISS
+    if encoded is not MISS:
+        BODIES.inc(source="cached")
+        return encoded
+    # Computed by another worker (or before ETags were stored): validate and serialize once here.
+    return encode(AssessmentResponse(**cached).model_dump_json().encode(), cached.get("etag"))
+
+
+def _accepted(accept_encoding: str) -> set[str]:
+    """Content codings the client accepts (any q above 0)."""
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, *params = item.split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # Weak comparison (RFC 9110 13.1.2): W/ prefixes are ignored.
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def to_http(encoded: EncodedResponse, headers: Mapping[str, str]) -> Response:
+    """The response for a request with ``headers``: 304, or the best pre-encoded body."""
+    common = {"ETag": encoded.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if_none_match = headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, encoded.etag):
+        NOT_MODIFIED.inc()
+        return Response(status_code=304, headers=common)
+
+    accepted = _accepted(headers.get("accept-encoding", ""))
+    if encoded.brotli is not None and "br" in accepted:
+        return Response(encoded.brotli, media_type="application/json", headers={**common, "Content-Encoding": "br"})
+    if encoded.gzip is not None and ("gzip" in accepted or "*" in accepted):
+        return Response(encoded.gzip, media_type="application/json", headers={**common, "Content-Encoding": "gzip"})
+    return Response(encoded.body, media_type="application/json", headers=common)
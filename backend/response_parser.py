@@ -0,0 +1,229 @@
+"""Parsing and repair of Gemini pain-card answers.
+
+Model output is rarely just JSON. It comes wrapped in Markdown fences,
+preceded by a sentence of prose, or cut off mid-array when the answer hits
+the output-token limit. This module:
+
+* finds the first JSON value in the text, skipping brackets in prose, and
+  decodes exactly that slice;
+* repairs a truncated value by cutting back to the last complete element and
+  closing whatever is still open;
+* accepts both answer shapes, a plain array of cards and the category-keyed
+  object that ``config.AI_PROMPTS["pain_cards"]`` asks for;
+* validates each card against ``schemas.RawPainCard`` after light,
+  schema-directed fixes, so one bad card never costs the whole answer.
+
+Scanning jumps between structural characters with a regex rather than
+walking the text one character at a time, and only the final JSON slice is
+ever copied.
+"""
+
+import json
+import re
+from typing import Any, NamedTuple
+
+from pydantic import ValidationError as PydanticValidationError
+
+from schemas import RawPainCard
+
+STRUCTURAL = re.compile(r'[\[\]{}"\\]')
+CLOSERS = {"[": "]", "{": "}"}
+TITLE_ALIASES = ("title", "name", "headline", "pain_point")
+BLURB_ALIASES = ("blurb", "description", "summary", "detail", "details")
+BLURB_MAX_LENGTH = RawPainCard.model_fields["blurb"].metadata[0].max_length
+
+
+class ParsedCards(NamedTuple):
+    cards: list[dict]
+    rejected: int
+    repaired: bool
+
+
+def _scan(text: str, start: int) -> tuple[int, list[str], int]:
+    """Scan the JSON value opening at ``start``.
+
+    Returns ``(end, stack, last_cut)``. ``end`` is the index just past the
+    balanced value, or -1 if the text ends first. ``stack`` holds the brackets
+    still open at the last cut point. ``last_cut`` is the index just past the
+    last container element that closed below the top level (-1 if none).
+    """
+    stack: list[str] = []
+    cut_stack: list[str] = []
+    last_cut = -1
+    in_string = False
+    skip_at = -1
+    for match in STRUCTURAL.finditer(text, start):
+        pos = match.start()
+        if pos == skip_at:
+            continue
+        ch = match.group()
+        if in_string:
+            if ch == "\\":
+                skip_at = pos + 1
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in CLOSERS:
+            stack.append(ch)
+        elif ch in "]}":
+            if not stack or CLOSERS[stack[-1]] != ch:
+                break  # mismatched bracket: not JSON past this point
+            stack.pop()
+            if not stack:
+                return pos + 1, [], last_cut
+            last_cut, cut_stack = pos + 1, stack.copy()
+    return -1, cut_stack, last_cut
+
+
+def _decode_at(text: str, start: int) -> tuple[Any, bool]:
+    end, open_stack, last_cut = _scan(text, start)
+    if end != -1:
+        return json.loads(text[start:end]), False
+    if last_cut == -1:
+        raise ValueError("model output ends before any complete JSON element")
+    closing = "".join(CLOSERS[ch] for ch in reversed(open_stack))
+    return json.loads(text[start:last_cut] + closing), True
+
+
+def extract_json(text: str) -> tuple[Any, bool]:
+    """Decode the first JSON array or object in ``text``; returns ``(value, repaired)``.
+
+    Prose can contain brackets too ("[8 cards]"), so each ``[`` or ``{`` is
+    tried in turn until one opens a value that decodes or can be repaired.
+    Raises ``ValueError`` when no JSON value can be recovered.
+    """
+    error = ValueError("no JSON value in model output")
+    for match in re.finditer(r"[\[{]", text):
+        try:
+            return _decode_at(text, match.start())
+        except ValueError as e:  # json.JSONDecodeError included
+            error = e
+    raise error
+
+
+def _pick(card: dict, aliases: tuple[str, ...]) -> Any:
+    for key in aliases:
+        if key in card:
+            return card[key]
+    return None
+
+
+def _shorten(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    cut = text[:limit - 1].rsplit(" ", 1)[0].rstrip(" ,;:")
+    return cut + "…"
+
+
+def coerce_card(item: Any) -> dict | None:
+    """Fit one model-produced card to ``RawPainCard``, or None if it can't be salvaged."""
+    if not isinstance(item, dict):
+        return None
+    title, blurb = _pick(item, TITLE_ALIASES), _pick(item, BLURB_ALIASES)
+    if not isinstance(title, str) or not isinstance(blurb, str):
+        return None
+    card = dict(item)
+    for key in TITLE_ALIASES + BLURB_ALIASES:
+        card.pop(key, None)
+    card["title"] = " ".join(title.split())
+    card["blurb"] = _shorten(" ".join(blurb.split()), BLURB_MAX_LENGTH)
+    try:
+        RawPainCard(**card)
+    except PydanticValidationError:
+        return None
+    return card if card["title"] else None
+
+
+def card_items(value: Any) -> list:
+    """Flatten either answer shape into a list of raw card candidates."""
+    if isinstance(value, list):
+        return value
+    if isinstance(value, dict):
+        if _pick(value, TITLE_ALIASES) is not None:
+            return [value]
+        items = []
+        for category, cards in value.items():
+            if isinstance(cards, list):
+                items += [dict(c, category=category) if isinstance(c, dict) else c for c in cards]
+        return items
+    return []
+
+
+def validate_cards(value: Any) -> tuple[list[dict], int]:
+    """Return ``(valid cards, number rejected)`` for a decoded answer of either shape."""
+    cards, rejected = [], 0
+    for item in card_items(value):
+        card = coerce_card(item)
+        if card is None:
+            rejected += 1
+        else:
+            cards.append(card)
+    return cards, rejected
+
+
+def parse_pain_cards(text: str) -> ParsedCards:
+    """Parse a model answer into valid cards. Raises ``ValueError`` if no JSON is recoverable."""
+    value, repaired = extract_json(text)
+    cards, rejected = validate_cards(value)
+    return ParsedCards(cards, rejected, repaired)
+
+
+class IncrementalCardParser:
+    """Pull complete card objects out of a JSON array that arrives in pieces.
+
+    Text before the opening ``[`` (such as a Markdown fence) is skipped. Each
+    ``{...}`` element of the array is decoded as soon as its closing brace arrives.
+    An element that isn't valid JSON is skipped and counted in ``rejected``,
+    so one bad card never costs the rest of the stream.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._card_start: int | None = None
+        self.rejected = 0
+
+    def feed(self, text: str) -> list[dict]:
+        """Add more model output; return the cards it completed."""
+        self._buffer += text
+        buffer = self._buffer
+        cards = []
+        for pos in range(self._pos, len(buffer)):
+            ch = buffer[pos]
+            if not self._started:
+                if ch == "[":
+                    self._started, self._depth = True, 1
+            elif self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "[{":
+                self._depth += 1
+                if self._depth == 2 and ch == "{":
+                    self._card_start = pos
+            elif ch in "]}":
+                self._depth -= 1
+                if self._depth == 1 and ch == "}" and self._card_start is not None:
+                    try:
+                        cards.append(json.loads(buffer[self._card_start:pos + 1]))
+                    except ValueError:
+                        self.rejected += 1
+                    self._card_start = None
+
+        # Keep only the unfinished card (if any) buffered.
+        keep_from = self._card_start if self._card_start is not None else len(buffer)
+        self._buffer = buffer[keep_from:]
+        self._pos = len(buffer) - keep_from
+        if self._card_start is not None:
+            self._card_start = 0
+        return cards
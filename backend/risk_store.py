@@ -0,0 +1,103 @@
+"""On-disk store of pre-extracted 10-K risk-factor text.
+
+``ingest.py`` fills it offline from EDGAR bulk archives. ``scraper`` checks
+it before downloading a filing from sec.gov. Each row holds one filing of
+one ticker, keyed by ``(ticker, filing_id)``. ``filing_id`` is the 18-digit
+accession number, the same id ``scraper._filing_id`` derives from FMP links.
+The text is stored zlib-compressed.
+"""
+
+import sqlite3
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+from config import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS risk_factors (
+    ticker    TEXT NOT NULL,
+    filing_id TEXT NOT NULL,
+    cik       INTEGER NOT NULL,
+    filed_at  TEXT NOT NULL,
+    text      BLOB NOT NULL,
+    PRIMARY KEY (ticker, filing_id)
+) WITHOUT ROWID;
+"""
+
+
+class RiskRecord(NamedTuple):
+    ticker: str
+    filing_id: str
+    cik: int
+    filed_at: str
+    text: str
+
+
+def compress(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), 6)
+
+
+def decompress(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8")
+
+
+class RiskFactorStore:
+    """SQLite-backed store; safe to read from several threads at once."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, ticker: str, filing_id: str) -> Optional[str]:
+        """Return the stored risk-factor text for one filing, or None."""
+        row = self._connection().execute(
+            "SELECT text FROM risk_factors WHERE ticker = ? AND filing_id = ?", (ticker, filing_id)
+        ).fetchone()
+        return decompress(row[0]) if row else None
+
+    def latest(self, ticker: str) -> Optional[RiskRecord]:
+        """Return the most recently filed record for ``ticker``, or None."""
+        row = self._connection().execute(
+            "SELECT ticker, filing_id, cik, filed_at, text FROM risk_factors "
+            "WHERE ticker = ? ORDER BY filed_at DESC, filing_id DESC LIMIT 1",
+            (ticker,),
+        ).fetchone()
+        return RiskRecord(*row[:4], decompress(row[4])) if row else None
+
+    def put_many(self, rows: Iterable[tuple[str, str, int, str, bytes]]) -> int:
+        """Upsert ``(ticker, filing_id, cik, filed_at, compressed_text)`` rows in one transaction."""
+        conn = self._connection()
+        with conn:
+            cursor = conn.executemany(
+                "INSERT OR REPLACE INTO risk_factors (ticker, filing_id, cik, filed_at, text) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+        return cursor.rowcount
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM risk_factors").fetchone()[0]
+
+
+_store: Optional[RiskFactorStore] = None
+
+
+def get_store() -> Optional[RiskFactorStore]:
+    """The configured store, or None when ``RISK_STORE_PATH`` is unset or missing."""
+    global _store
+    path = settings.risk_store_path
+    if not path or not Path(path).exists():
+        return None
+    if _store is None or _store.path != path:
+        _store = RiskFactorStore(path)
+    return _store
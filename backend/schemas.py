@@ -1,9 +1,12 @@
 from pydantic import BaseModel, constr
 from typing import Optional
 
-class PainCard(BaseModel):
+class RawPainCard(BaseModel):
+    """A pain card as the model returns it, before scope mapping."""
     title: str
     blurb: constr(max_length=280)
+
+class PainCard(RawPainCard):
     triggered_tiles: list[str]
     triggering_keywords: list[str]
 
@@ -15,4 +18,24 @@ class AssessmentResponse(BaseModel):
     industry: Optional[str] = None
     revenue: Optional[float] = None
     classified_industry: Optional[str] = None
-    geo_scope: Optional[str] = None
\ No newline at end of file
+    geo_scope: Optional[str] = None
+
+class BatchAssessmentRequest(BaseModel):
+    tickers: list[str]
+
+
+class BatchItemResult(BaseModel):
+    ticker: str
+    status: str  # "done" or "error"
+    assessment: Optional[AssessmentResponse] = None
+    error: Optional[str] = None
+
+
+class BatchJobStatus(BaseModel):
+    job_id: str
+    status: str  # "running" or "completed"
+    total: int
+    completed: int
+    failed: int
+    results: list[BatchItemResult]
+    next_offset: int
@@ -1,7 +1,42 @@
-# backend/scope_engine.py - V2
+# backend/scope_engine.py - V3
+import hashlib
+import json
+
+from keyword_matcher import KeywordMatcher
 from taxonomy import PAIN_THEME_RULES, KEYWORD_RULES # Import both rule sets
 
-def process_scope_and_cards(raw_cards: list[dict]) -> tuple[list[dict], list[str]]:
+
+class CompiledScopeRules:
+    """Theme and keyword rules compiled into single-pass matchers."""
+
+    def __init__(self, theme_rules: dict[str, list[str]], keyword_rules: dict[str, list[str]]):
+        self.theme_rules = theme_rules
+        self.keyword_rules = keyword_rules
+        self.theme_matcher = KeywordMatcher(theme_rules)
+        self.keyword_matcher = KeywordMatcher(keyword_rules)
+        # Changes whenever the taxonomy is edited; stored assessments are re-scoped when it does.
+        self.version = hashlib.sha1(
+            json.dumps([theme_rules, keyword_rules], sort_keys=True).encode()).hexdigest()[:12]
+
+    def match(self, title_text: str, blurb_text: str) -> tuple[set[str], set[str]]:
+        """Return (triggered tiles, triggering keywords) for lowercased card text."""
+        # Thematic keywords are matched against the title only, granular
+        # keywords against the full text.
+        themes = self.theme_matcher.find(title_text)
+        keywords = self.keyword_matcher.find(f"{title_text} {blurb_text}")
+
+        tiles = set()
+        for theme in themes:
+            tiles.update(self.theme_rules[theme])
+        for keyword in keywords:
+            tiles.update(self.keyword_rules[keyword])
+        return tiles, themes | keywords
+
+
+DEFAULT_RULES = CompiledScopeRules(PAIN_THEME_RULES, KEYWORD_RULES)
+
+
+def process_scope_and_cards(raw_cards: list[dict], rules: CompiledScopeRules = DEFAULT_RULES) -> tuple[list[dict], list[str]]:
     enriched_cards = []
     all_activated_tiles = set()
 
@@ -9,22 +44,7 @@ def process_scope_and_cards(raw_cards: list[dict]) -> tuple[list[dict], list[str
         title_text = card_data.get('title', '').lower()
         blurb_text = card_data.get('blurb', '').lower()
 
-        card_triggered_tiles = set()
-        card_triggering_keywords = set()
-
-        # First, check for thematic keywords in the title
-        for theme, modules in PAIN_THEME_RULES.items():
-            if theme in title_text:
-                card_triggering_keywords.add(theme)
-                for module in modules:
-                    card_triggered_tiles.add(module)
-
-        # Second, check for granular keywords in the full text
-        for keyword, modules in KEYWORD_RULES.items():
-            if keyword in f"{title_text} {blurb_text}":
-                card_triggering_keywords.add(keyword)
-                for module in modules:
-                    card_triggered_tiles.add(module)
+        card_triggered_tiles, card_triggering_keywords = rules.match(title_text, blurb_text)
 
         card_data['triggered_tiles'] = sorted(list(card_triggered_tiles))
         card_data['triggering_keywords'] = sorted(list(card_triggering_keywords))
@@ -32,4 +52,4 @@ def process_scope_and_cards(raw_cards: list[dict]) -> tuple[list[dict], list[str
 
         all_activated_tiles.update(card_triggered_tiles)
 
-    return enriched_cards, sorted(list(all_activated_tiles))
\ No newline at end of file
+    return enriched_cards, sorted(list(all_activated_tiles))
@@ -1,112 +1,411 @@
 # backend/scraper.py
-import os
 import re
-import requests
-from bs4 import BeautifulSoup
-from dotenv import load_dotenv
-from typing import Tuple, Dict, Any
+import asyncio
+import hashlib
+import time
+import httpx
+from typing import Any, Callable, Dict, Tuple, TypeVar
 
-from logger import logger
-from exceptions import ExternalAPIError, DataParsingError
+from config import settings
+from logger import get_logger
+from exceptions import ExternalAPIError, DataParsingError, UpstreamUnavailableError
+from cache import cache, make_key
+from filing_parser import RiskFactorExtractor, SectionIndexer, join_paragraphs
+import filing_store
+import rate_limit
+import resilience
+from clients import registry
+from risk_store import get_store
+import context_builder
+import metrics
 
-load_dotenv()
+logger = get_logger(__name__)
 
-SEC_HEADERS = {'User-Agent': 'MoonSlate Consulting sample@example.com'}
+T = TypeVar("T")
 
-def _get_company_profile(ticker: str, api_key: str) -> Dict[str, Any]:
-    logger.info(f"Fetching company profile for {ticker}")
-    try:
-        profile_url = f"https://financialmodelingprep.com/api/v3/profile/{ticker}?apikey={api_key}"
-        response = requests.get(profile_url)
+STREAM_CHUNK_SIZE = 64 * 1024
+RISK_FACTORS_ITEM = "1A"
+ACCESSION_PATTERN = re.compile(r'/data/\d+/(\d{18})/')
+
+async def _fmp_get(client: httpx.AsyncClient, url: str) -> httpx.Response:
+    async def _get() -> httpx.Response:
+        # The key is chosen per attempt by the rate governor, so a throttled key is rotated out.
+        response = await client.get(httpx.URL(url).copy_merge_params({"apikey": rate_limit.current_key()}))
+        metrics.record_upstream_bytes("fmp", len(response.content))
         response.raise_for_status()
+        return response
+
+    return await resilience.call("fmp", _get)
+
+async def _get_company_profile(client: httpx.AsyncClient, ticker: str) -> Dict[str, Any]:
+    logger.info("Fetching company profile for %s", ticker)
+    try:
+        profile_url = f"{settings.fmp_base_url}/profile/{ticker}"
+        with metrics.stage("fmp_profile"):
+            response = await _fmp_get(client, profile_url)
         profile_data_list = response.json()
         if not profile_data_list:
-            logger.warning(f"Empty profile data for ticker {ticker}")
+            logger.warning("Empty profile data for ticker %s", ticker)
             raise ExternalAPIError(f"No company profile found for ticker: {ticker}")
-        logger.info(f"Successfully fetched company profile for {ticker}")
+        logger.info("Successfully fetched company profile for %s", ticker)
         return profile_data_list[0]
-    except requests.exceptions.RequestException as e:
-        logger.error(f"HTTP error fetching profile for {ticker}: {e}")
+    except httpx.HTTPError as e:
+        metrics.record_upstream_error("fmp")
+        logger.error("HTTP error fetching profile for %s: %s", ticker, e)
         raise ExternalAPIError(f"Failed to fetch company profile for {ticker}")
     except Exception as e:
-        logger.error(f"Unexpected error fetching profile for {ticker}: {e}")
+        logger.error("Unexpected error fetching profile for %s: %s", ticker, e)
         raise
 
-def _get_latest_revenue(ticker: str, api_key: str) -> float | None:
-    logger.info(f"Fetching latest annual revenue for {ticker}")
+async def _get_latest_revenue(client: httpx.AsyncClient, ticker: str) -> float | None:
+    logger.info("Fetching latest annual revenue for %s", ticker)
     try:
-        income_url = f"https://financialmodelingprep.com/api/v3/income-statement/{ticker}?period=annual&limit=1&apikey={api_key}"
-        income_response = requests.get(income_url)
-        income_response.raise_for_status()
+        income_url = f"{settings.fmp_base_url}/income-statement/{ticker}?period=annual&limit=1"
+        with metrics.stage("fmp_revenue"):
+            income_response = await _fmp_get(client, income_url)
         income_data = income_response.json()
         if income_data and 'revenue' in income_data[0]:
             revenue = income_data[0]['revenue']
-            logger.info(f"Updated revenue to latest annual figure: {revenue}")
+            logger.info("Updated revenue to latest annual figure: %s", revenue)
             return revenue
         return None
     except Exception as e:
-        logger.warning(f"Could not fetch quarterly revenue: {e}")
+        metrics.record_upstream_error("fmp")
+        logger.warning("Could not fetch quarterly revenue: %s", e)
         return None
 
-def _get_10k_risk_factors(ticker: str, api_key: str) -> str:
-    logger.info(f"Fetching 10-K filing for {ticker}")
+def _filing_id(filing_url: str) -> str:
+    """Derive a stable id for a filing, preferring the EDGAR accession number."""
+    match = ACCESSION_PATTERN.search(filing_url)
+    return match.group(1) if match else hashlib.sha1(filing_url.encode()).hexdigest()[:16]
+
+async def _get_10k_filing(client: httpx.AsyncClient, ticker: str) -> Dict[str, str] | None:
+    logger.info("Looking up latest 10-K filing for %s", ticker)
     try:
-        filings_url = f"https://financialmodelingprep.com/api/v3/sec_filings/{ticker}?type=10-K&page=0&limit=1&apikey={api_key}"
-        filings = requests.get(filings_url).json()
+        filings_url = f"{settings.fmp_base_url}/sec_filings/{ticker}?type=10-K&page=0&limit=1"
+        with metrics.stage("filing_lookup"):
+            filings = (await _fmp_get(client, filings_url)).json()
         if not filings or 'finalLink' not in filings[0]:
-            logger.warning(f"No 10-K filings link found for {ticker}")
-            return ""
-
+            logger.warning("No 10-K filings link found for %s", ticker)
+            return None
         filing_url = filings[0]['finalLink']
-        logger.info(f"Fetching 10-K content from: {filing_url}")
-        response = requests.get(filing_url, headers=SEC_HEADERS)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # More robust search for the "Risk Factors" section
-        risk_header = soup.find(string=re.compile(r'Item\s+1A\.\s+Risk\s+Factors', re.IGNORECASE))
-        if not risk_header:
-            risk_header = soup.find(string=re.compile(r'Risk\s+Factors', re.IGNORECASE))
-        
-        if not risk_header:
-            logger.warning(f"Could not find 'Risk Factors' section in 10-K for {ticker}.")
-            return ""
-
-        content = []
-        # Iterate through siblings until the next major "Item" is found
-        for element in risk_header.find_all_next(['p', 'h2', 'h3', 'h4']):
-            if element.name.startswith('h'):
-                # Stop if we hit the next item (e.g., "Item 1B", "Item 2")
-                if re.search(r'Item\s+\d+[A-Z]?\.', element.get_text(), re.IGNORECASE):
+        return {"url": filing_url, "id": _filing_id(filing_url)}
+    except UpstreamUnavailableError:
+        raise
+    except Exception as e:
+        metrics.record_upstream_error("fmp")
+        logger.error("Could not look up 10-K filing for %s: %s", ticker, e)
+        raise DataParsingError(f"Failed to parse 10-K filing for {ticker}")
+
+async def _fetch_latest_filing(client: httpx.AsyncClient, ticker: str) -> Dict[str, str] | None:
+    filing = await _get_10k_filing(client, ticker)
+    if filing:
+        previous = await cache.get(make_key("latest_filing", ticker))
+        if isinstance(previous, dict) and previous.get("id") != filing["id"]:
+            await cache.invalidate_filing(ticker, previous["id"])
+        await cache.set(make_key("latest_filing", ticker), filing)
+    return filing
+
+async def _lookup_latest_filing(client: httpx.AsyncClient, ticker: str) -> Dict[str, str] | None:
+    try:
+        return await cache.get_or_load(make_key("filing", ticker), lambda: _fetch_latest_filing(client, ticker))
+    except UpstreamUnavailableError:
+        # FMP is down; the last filing we saw is almost always still the latest.
+        previous = await cache.get(make_key("latest_filing", ticker))
+        if not isinstance(previous, dict):
+            raise
+        logger.warning("FMP unavailable; using last known 10-K for %s", ticker)
+        return previous
+
+async def get_latest_filing(ticker: str) -> Dict[str, str] | None:
+    """Return ``{"url", "id"}`` for the company's latest 10-K, or None."""
+    return await _lookup_latest_filing(registry.fmp, ticker)
+
+def _extract_risk_factors(html: bytes) -> str:
+    """Return the text of the 'Item 1A. Risk Factors' section of a 10-K document.
+
+    Reference DOM-based implementation. The request path streams filings
+    through ``filing_parser.RiskFactorExtractor``, which must produce the same
+    text; this version is kept for equivalence tests and benchmarks.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+
+    # More robust search for the "Risk Factors" section
+    risk_header = soup.find(string=re.compile(r'Item\s+1A\.\s+Risk\s+Factors', re.IGNORECASE))
+    if not risk_header:
+        risk_header = soup.find(string=re.compile(r'Risk\s+Factors', re.IGNORECASE))
+
+    if not risk_header:
+        return ""
+
+    content = []
+    # Iterate through siblings until the next major "Item" is found
+    for element in risk_header.find_all_next(['p', 'h2', 'h3', 'h4']):
+        if element.name.startswith('h'):
+            # Stop if we hit the next item (e.g., "Item 1B", "Item 2")
+            if re.search(r'Item\s+\d+[A-Z]?\.', element.get_text(), re.IGNORECASE):
+                break
+        if element.name == 'p':
+            content.append(element.get_text(strip=True))
+
+    return " ".join(content)
+
+class _RawFiling:
+    """A filing's bytes as downloaded, and the encoding its response declared."""
+
+    def __init__(self):
+        self.body = bytearray()
+        self.encoding: str | None = None
+
+async def _stream_filing(client: httpx.AsyncClient, filing_url: str, new_parser: Callable[[str | None], Any],
+                         finish: Callable[[Any], T], raw: _RawFiling | None = None) -> Tuple[T, int]:
+    """Download the filing through one parser until its ``feed_bytes`` reports done; returns (result, bytes read).
+
+    ``new_parser`` builds the parser for the response's encoding and ``finish`` turns it into the result.
+    With ``raw``, the whole document is read into it; chunks after the parser is done are kept unparsed.
+    """
+    parser = None
+    received = 0
+    started = time.perf_counter()
+    parse_seconds = 0.0
+    try:
+        async with client.stream("GET", filing_url) as response:
+            response.raise_for_status()
+            parser = new_parser(response.charset_encoding)
+            if raw is not None:
+                # A retried attempt starts the document over.
+                raw.body.clear()
+                raw.encoding = response.charset_encoding
+            done = False
+            async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                received += len(chunk)
+                if raw is not None:
+                    raw.body += chunk
+                if done:
+                    continue
+                # Parsing is CPU-bound; keep it off the event loop.
+                parse_started = time.perf_counter()
+                done = await asyncio.to_thread(parser.feed_bytes, chunk)
+                parse_seconds += time.perf_counter() - parse_started
+                if done and raw is None:
                     break
-            if element.name == 'p':
-                content.append(element.get_text(strip=True))
-        
-        full_text = " ".join(content)
-        logger.info(f"Successfully extracted {len(full_text)} characters from 10-K Risk Factors")
-        return full_text
+        parse_started = time.perf_counter()
+        result = await asyncio.to_thread(finish, parser)
+        parse_seconds += time.perf_counter() - parse_started
+        # Download and parse interleave; report them as separate stages.
+        metrics.observe_stage("filing_download", time.perf_counter() - started - parse_seconds)
+        metrics.observe_stage("html_parse", parse_seconds)
+        return result, received
+    finally:
+        if parser is not None:
+            metrics.record_upstream_bytes("sec", received)
 
+async def _download_filing(client: httpx.AsyncClient, ticker: str, filing_url: str,
+                           new_parser: Callable[[str | None], Any], finish: Callable[[Any], T],
+                           raw: _RawFiling | None = None) -> T:
+    # ``client`` must send SEC_HEADERS; the registry's sec.gov client does.
+    logger.info("Fetching 10-K content from: %s", filing_url)
+    try:
+        result, bytes_read = await resilience.call(
+            "sec", lambda: _stream_filing(client, filing_url, new_parser, finish, raw))
+    except UpstreamUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Could not fetch or parse 10-K for {ticker}: {e}")
+        metrics.record_upstream_error("sec")
+        logger.error("Could not fetch or parse 10-K for %s: %s", ticker, e)
         raise DataParsingError(f"Failed to parse 10-K filing for {ticker}")
+    logger.info("Read %s bytes of the 10-K for %s", bytes_read, ticker)
+    return result
+
+def _risk_factor_text(extractor: RiskFactorExtractor) -> str:
+    return join_paragraphs(extractor.paragraphs())
+
+def _index_sections(raw: _RawFiling, risk_factors: str) -> Dict[str, str]:
+    """Every section of a downloaded filing, with Item 1A exactly as ``get_risk_factors`` returns it."""
+    indexer = SectionIndexer(raw.encoding)
+    indexer.feed_bytes(bytes(raw.body))
+    sections = indexer.sections()
+    sections[RISK_FACTORS_ITEM] = risk_factors
+    return sections
+
+async def _save_sections(store: filing_store.FilingStore, ticker: str, filing: Dict[str, str],
+                         sections: Dict[str, str]) -> None:
+    try:
+        await asyncio.to_thread(store.put, filing_store.filing_key(filing["url"], filing.get("id")),
+                                filing["url"], sections)
+    except Exception as e:
+        logger.warning("Could not save the 10-K for %s to the filing store: %s", ticker, e)
+
+async def _get_10k_sections(client: httpx.AsyncClient, ticker: str, filing: Dict[str, str]) -> Dict[str, str]:
+    """Every section of the filing, read in full; saved to the filing store when one is configured."""
+    raw = _RawFiling()
+    risk_factors = await _download_filing(client, ticker, filing["url"], RiskFactorExtractor, _risk_factor_text, raw)
+    sections = await asyncio.to_thread(_index_sections, raw, risk_factors)
+    store = filing_store.get_store()
+    if store is not None:
+        await _save_sections(store, ticker, filing, sections)
+    return sections
+
+# Filings being downloaded in full for the filing store, by store key, after their risk factors were returned.
+_indexing: Dict[str, asyncio.Task] = {}
+
+async def _fill_store(client: httpx.AsyncClient, ticker: str, filing: Dict[str, str]) -> None:
+    # Not bound by the request that started it, and queued behind every request.
+    with resilience.deadline_at(None), rate_limit.priority(rate_limit.PREWARM):
+        try:
+            await _get_10k_sections(client, ticker, filing)
+        except Exception as e:
+            logger.warning("Could not store the 10-K for %s in the filing store: %s", ticker, e)
+
+def _schedule_fill(client: httpx.AsyncClient, ticker: str, filing: Dict[str, str]) -> None:
+    key = filing_store.filing_key(filing["url"], filing.get("id"))
+    if key in _indexing:
+        return
+    task = asyncio.create_task(_fill_store(client, ticker, filing))
+    _indexing[key] = task
+    task.add_done_callback(lambda _: _indexing.pop(key, None))
+
+async def _get_10k_risk_factors(client: httpx.AsyncClient, ticker: str, filing: Dict[str, str]) -> str:
+    # The extractor reports done once Item 1A ends, and the download stops there. With a
+    # filing store, the whole filing is fetched again in the background and stored by section.
+    full_text = await _download_filing(client, ticker, filing["url"], RiskFactorExtractor, _risk_factor_text)
+    if filing_store.get_store() is not None:
+        _schedule_fill(client, ticker, filing)
+
+    if not full_text:
+        logger.warning("Could not find 'Risk Factors' section in 10-K for %s.", ticker)
+        return ""
+    logger.info("Successfully extracted %s characters from 10-K Risk Factors for %s", len(full_text), ticker)
+    return full_text
+
+async def _stored_section(ticker: str, filing: Dict[str, str], item: str) -> str | None:
+    store = filing_store.get_store()
+    if store is None:
+        return None
+    with metrics.stage("filing_store_lookup"):
+        text = await asyncio.to_thread(
+            store.section, filing_store.filing_key(filing["url"], filing.get("id")), item)
+    if text is not None:
+        logger.info("Serving 10-K Item %s for %s from the filing store", item, ticker)
+    return text
 
-def get_company_context(ticker: str) -> Tuple[str, Dict[str, Any]]:
-    logger.info(f"Starting company context retrieval for {ticker}")
-    api_key = os.getenv("FMP_API_KEY")
-    if not api_key:
-        raise ValueError("FMP API key not found.")
+async def _load_risk_factors(client: httpx.AsyncClient, ticker: str, filing: Dict[str, str]) -> str:
+    """Risk factors for ``filing``, from the offline or filing store when it is there, else from sec.gov."""
+    store = get_store()
+    if store is not None:
+        with metrics.stage("risk_store_lookup"):
+            text = await asyncio.to_thread(store.get, ticker, filing["id"])
+        if text is not None:
+            logger.info("Serving 10-K risk factors for %s from the local store", ticker)
+            return text
+    text = await _stored_section(ticker, filing, RISK_FACTORS_ITEM)
+    if text is not None:
+        return text
+    return await _get_10k_risk_factors(client, ticker, filing)
 
-    company_profile = _get_company_profile(ticker, api_key)
-    latest_revenue = _get_latest_revenue(ticker, api_key)
+async def get_company_profile(ticker: str) -> Dict[str, Any]:
+    """Company profile with the latest annual revenue merged in."""
+    fmp = registry.fmp
+    tasks = [
+        asyncio.create_task(cache.get_or_load(
+            make_key("profile", ticker), lambda: _get_company_profile(fmp, ticker))),
+        asyncio.create_task(cache.get_or_load(
+            make_key("revenue", ticker), lambda: _get_latest_revenue(fmp, ticker))),
+    ]
+    try:
+        company_profile, latest_revenue = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    # Cached profiles are shared; never mutate them in place.
+    company_profile = dict(company_profile)
     if latest_revenue:
         company_profile['revenue'] = latest_revenue
+    return company_profile
 
-    risk_factors_text = _get_10k_risk_factors(ticker, api_key)
-    
+async def refresh_company_profile(ticker: str) -> Dict[str, Any]:
+    """Re-fetch profile and revenue from FMP, replacing the cached copies."""
+    fmp = registry.fmp
+    profile, revenue = await asyncio.gather(_get_company_profile(fmp, ticker), _get_latest_revenue(fmp, ticker))
+    await cache.set(make_key("profile", ticker), profile)
+    if revenue is not None:
+        await cache.set(make_key("revenue", ticker), revenue)
+    company_profile = dict(profile)
+    if revenue:
+        company_profile['revenue'] = revenue
+    return company_profile
+
+async def refresh_latest_filing(ticker: str) -> Dict[str, str] | None:
+    """Look the latest 10-K up again, bypassing the cached lookup (and invalidating a superseded filing)."""
+    filing = await _fetch_latest_filing(registry.fmp, ticker)
+    if filing is not None:
+        await cache.set(make_key("filing", ticker), filing)
+    return filing
+
+async def get_risk_factors(ticker: str, filing: Dict[str, str] | None = None) -> str:
+    """Risk-factor text of the latest 10-K (looked up when ``filing`` is not given); "" if none."""
+    latest = filing or await _lookup_latest_filing(registry.fmp, ticker)
+    if not latest:
+        return ""
+    return await cache.get_or_load(
+        make_key("risk_factors", ticker, latest["id"]),
+        lambda: _load_risk_factors(registry.sec, ticker, latest),
+    )
+
+async def get_filing_section(ticker: str, item: str, filing: Dict[str, str] | None = None) -> str:
+    """Text of "Item ``item``" (e.g. "7" for MD&A, "7A") of the latest 10-K; "" if there is none.
+
+    Item 1A is ``get_risk_factors``. Other items need the whole filing: it
+    is downloaded and split into sections once. With a filing store
+    configured, every section of a filing whose risk factors were already
+    fetched, and every later section read, comes from disk.
+    """
+    latest = filing or await _lookup_latest_filing(registry.fmp, ticker)
+    if not latest:
+        return ""
+    item = item.upper()
+    if item == RISK_FACTORS_ITEM:
+        return await get_risk_factors(ticker, latest)
+    text = await _stored_section(ticker, latest, item)
+    if text is not None:
+        return text
+    sections = await _get_10k_sections(registry.sec, ticker, latest)
+    return sections.get(item, "")
+
+def build_context(ticker: str, risk_factors_text: str, company_profile: Dict[str, Any]) -> str:
+    """The AI prompt context: the most relevant risk factors (else the profile description) within the token budget."""
     final_context = risk_factors_text if risk_factors_text else company_profile.get("description", "")
     
     if not final_context:
         raise DataParsingError(f"Could not retrieve any context for AI for {ticker}")
 
-    logger.info(f"Successfully retrieved context for {ticker}: {len(final_context)} characters")
-    return " ".join(final_context.split()[:3000]), company_profile
\ No newline at end of file
+    with metrics.stage("context_build"):
+        context = context_builder.build_context(final_context)
+    logger.info(
+        "Successfully retrieved context for %s: %s characters, %s selected for the prompt",
+        ticker, len(final_context), len(context),
+    )
+    return context
+
+async def get_company_context(ticker: str, filing: Dict[str, str] | None = None) -> Tuple[str, Dict[str, Any]]:
+    logger.info("Starting company context retrieval for %s", ticker)
+
+    # Profile, revenue and the filing lookup are independent; only the
+    # filing download depends on the lookup, so overlap it with the rest.
+    tasks = [
+        asyncio.create_task(get_company_profile(ticker)),
+        asyncio.create_task(get_risk_factors(ticker, filing)),
+    ]
+    try:
+        company_profile, risk_factors_text = await asyncio.gather(*tasks)
+    except BaseException:
+        # Don't leave sibling fetches running once the request has failed.
+        for task in tasks:
+            task.cancel()
+        raise
+
+    return build_context(ticker, risk_factors_text, company_profile), company_profile
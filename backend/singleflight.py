@@ -0,0 +1,131 @@
+"""Coalescing of concurrent identical work ("single-flight").
+
+``SingleFlight.do(key, fn)`` runs ``fn`` once per key at a time. Callers that
+arrive while it is in flight await the same task instead of repeating the
+work. With ``singleflight_redis_enabled`` and a ``REDIS_URL``, the leader
+also takes a short Redis lock. Leaders in other worker processes then wait
+for that lock before running ``fn`` themselves. By then the result is
+normally in the shared cache, so ``fn`` returns cheaply.
+"""
+
+import asyncio
+import uuid
+from collections import Counter
+from typing import Any, Awaitable, Callable, Optional
+from weakref import WeakKeyDictionary
+
+from config import settings
+from logger import get_logger
+from cache import connect_redis
+import metrics
+
+logger = get_logger(__name__)
+
+# Delete the lock only if we still own it.
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """Per-process in-flight deduplication with an optional Redis lock across processes."""
+
+    def __init__(self, name: str, redis_url: Optional[str] = None, namespace: str = "leadscope"):
+        self.name = name
+        self.redis_url = redis_url
+        self.namespace = namespace
+        self.counts: Counter = Counter()
+        # Tasks are bound to the loop they run on, so keep one table per loop.
+        self._inflight: "WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Task]]" = WeakKeyDictionary()
+        self._redis = None
+
+    def _redis_client(self):
+        if self._redis is None and self.redis_url:
+            self._redis = connect_redis(self.redis_url)
+        return self._redis
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return ``await fn()``, sharing one execution among concurrent callers with the same key."""
+        inflight = self._inflight.setdefault(asyncio.get_running_loop(), {})
+        task = inflight.get(key)
+        if task is None:
+            self.counts["leader"] += 1
+            task = asyncio.ensure_future(self._run(key, fn))
+            inflight[key] = task
+            task.add_done_callback(lambda t: self._finished(inflight, key, t))
+        else:
+            self.counts["follower"] += 1
+            logger.info("Coalescing %s request for %s with in-flight work", self.name, key)
+        # Shield so one caller disconnecting doesn't cancel the work for the others.
+        return await asyncio.shield(task)
+
+    @staticmethod
+    def _finished(inflight: dict, key: str, task: asyncio.Task) -> None:
+        if inflight.get(key) is task:
+            del inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        client = self._redis_client() if settings.singleflight_redis_enabled else None
+        if client is None:
+            return await fn()
+
+        lock_key = f"{self.namespace}:singleflight:{self.name}:{key}"
+        token = uuid.uuid4().hex
+        ttl_ms = int(settings.singleflight_lock_ttl * 1000)
+        # Only the Redis calls are guarded: a failure of ``fn`` itself must not run it again.
+        try:
+            acquired = await client.set(lock_key, token, nx=True, px=ttl_ms)
+            if not acquired:
+                self.counts["remote_follower"] += 1
+                await self._wait_for_release(client, lock_key)
+        except Exception as e:
+            logger.warning("Redis single-flight lock unavailable for %s: %s", key, e)
+            acquired = False
+        if not acquired:
+            return await fn()
+
+        try:
+            return await fn()
+        finally:
+            try:
+                await client.eval(_RELEASE_SCRIPT, 1, lock_key, token)
+            except Exception as e:
+                logger.warning("Failed to release single-flight lock for %s: %s", key, e)
+
+    async def _wait_for_release(self, client, lock_key: str) -> None:
+        # The lock's TTL bounds the wait even if its holder died mid-flight.
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + settings.singleflight_lock_ttl
+        while await client.exists(lock_key) and loop.time() < give_up_at:
+            await asyncio.sleep(settings.singleflight_poll_interval)
+
+    def coalesce_rate(self) -> float:
+        total = self.counts["leader"] + self.counts["follower"]
+        return (self.counts["follower"] + self.counts["remote_follower"]) / total if total else 0.0
+
+
+assessments = SingleFlight("assessment", settings.redis_url)
+
+
+def _render_singleflight_metrics() -> list[str]:
+    lines = [
+        "# HELP leadscope_singleflight_calls_total Single-flight calls by role (leader ran the work).",
+        "# TYPE leadscope_singleflight_calls_total counter",
+    ]
+    for role in ("leader", "follower", "remote_follower"):
+        lines.append(f'leadscope_singleflight_calls_total{{name="{assessments.name}",role="{role}"}} '
+                     f'{assessments.counts[role]}')
+    lines += [
+        "# HELP leadscope_singleflight_coalesce_ratio Share of calls served by another caller's work.",
+        "# TYPE leadscope_singleflight_coalesce_ratio gauge",
+        f'leadscope_singleflight_coalesce_ratio{{name="{assessments.name}"}} {assessments.coalesce_rate():.4f}',
+    ]
+    return lines
+
+
+metrics.registry.add_collector(_render_singleflight_metrics)
@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from main import app
 
 client = TestClient(app)
@@ -22,13 +22,15 @@ class TestMainEndpoints:
         assert data["status"] == "ok"
         assert "timestamp" in data
 
-    @patch('scraper.get_company_context')
-    @patch('ai_engine.generate_pain_cards')
-    @patch('scope_engine.process_scope_and_cards')
+    @patch('scraper.get_latest_filing', new_callable=AsyncMock)
+    @patch('scraper.get_company_context', new_callable=AsyncMock)
+    @patch('ai_engine.generate_pain_cards', new_callable=AsyncMock)
+    @patch('dedup.scope_and_merge')
     @patch('classifier.classify_company')
-    def test_assessment_success(self, mock_classifier, mock_scope, mock_ai, mock_scraper):
+    def test_assessment_success(self, mock_classifier, mock_scope, mock_ai, mock_scraper, mock_filing):
         """Test successful assessment generation."""
         # Mock return values
+        mock_filing.return_value = None
         mock_scraper.return_value = ("Test context", {"companyName": "Test Corp", "industry": "Tech"})
         mock_ai.return_value = [{"title": "Test Pain", "blurb": "Test description"}]
         mock_scope.return_value = ([{"title": "Test Pain", "blurb": "Test description", "triggered_tiles": [], "triggering_keywords": []}], ["TEST-TILE"])
@@ -38,9 +40,10 @@ class TestMainEndpoints:
         assert response.status_code == 200
         
         data = response.json()
-        assert "pain_cards" in data
+        assert mock_scope.called
+        assert [card["title"] for card in data["pain_cards"]] == ["Test Pain"]
+        assert data["activated_tiles"] == ["TEST-TILE"]
         assert "scope_summary" in data
-        assert "activated_tiles" in data
 
     def test_assessment_invalid_ticker(self):
         """Test assessment with invalid ticker format."""
@@ -52,8 +55,9 @@ class TestMainEndpoints:
         response = client.get("/api/v1/assessment/ ")
         assert response.status_code == 400
 
-    @patch('scraper.get_company_context')
-    def test_assessment_company_not_found(self, mock_scraper):
+    @patch('scraper.get_latest_filing', new_callable=AsyncMock)
+    @patch('scraper.get_company_context', new_callable=AsyncMock)
+    def test_assessment_company_not_found(self, mock_scraper, mock_filing):
         """Test assessment when company is not found."""
         from exceptions import CompanyDataNotFoundError
         mock_scraper.side_effect = CompanyDataNotFoundError("Company not found")
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import re
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import ai_engine
+import resilience
+from exceptions import AIGenerationError, UpstreamUnavailableError
+
+
+def _cards(ticker):
+    return [{"title": f"{ticker} margin pressure {i}", "blurb": "Costs are rising."} for i in range(8)]
+
+
+class FakeModel:
+    """Answers batch prompts with cards for every ticker except those in ``drop``."""
+
+    def __init__(self, drop=(), garble_batches=False):
+        self.prompts = []
+        self.drop = set(drop)
+        self.garble_batches = garble_batches
+
+    async def generate_content_async(self, prompt):
+        self.prompts.append(prompt)
+        tickers = re.findall(r"^\s*### (\w+)$", prompt, re.MULTILINE)
+        if not tickers:  # single-company prompt
+            ticker = re.search(r"advising the CFO of (\w+)", prompt).group(1)
+            return SimpleNamespace(text=json.dumps(_cards(ticker)))
+        if self.garble_batches and len(tickers) > 1:
+            return SimpleNamespace(text='{"truncated": [')
+        return SimpleNamespace(text=json.dumps({t: _cards(t) for t in tickers if t not in self.drop}))
+
+
+def _run(model, tickers, **batcher_options):
+    async def main():
+        batcher = ai_engine.PainCardBatcher(window=0.01, **batcher_options)
+        results = await asyncio.gather(*(batcher.generate(f"context for {t}", t) for t in tickers),
+                                       return_exceptions=True)
+        return batcher, dict(zip(tickers, results))
+
+    with patch("clients.registry.gemini_model", return_value=model):
+        return asyncio.run(main())
+
+
+def test_concurrent_requests_share_one_call():
+    model = FakeModel()
+    batcher, results = _run(model, ["AAA", "BBB", "CCC", "DDD"])
+    assert len(model.prompts) == 1
+    assert batcher.calls == 1
+    assert results == {t: _cards(t) for t in results}
+
+
+def test_batches_respect_company_limit():
+    model = FakeModel()
+    _, results = _run(model, ["AAA", "BBB", "CCC", "DDD", "EEE"], max_companies=2)
+    assert len(model.prompts) == 3
+    assert set(results) == {"AAA", "BBB", "CCC", "DDD", "EEE"}
+
+
+def test_invalid_company_falls_back_to_single_call():
+    model = FakeModel(drop={"BBB"})
+    _, results = _run(model, ["AAA", "BBB", "CCC"])
+    assert results["BBB"] == _cards("BBB")
+    assert len(model.prompts) == 2
+    assert "advising the CFO of BBB" in model.prompts[1]
+
+
+def test_unparseable_batch_is_split_down_to_single_calls():
+    model = FakeModel(garble_batches=True)
+    _, results = _run(model, ["AAA", "BBB", "CCC", "DDD"])
+    assert results == {t: _cards(t) for t in ["AAA", "BBB", "CCC", "DDD"]}
+
+
+def test_company_that_never_validates_raises_for_that_ticker_only():
+    class Broken(FakeModel):
+        async def generate_content_async(self, prompt):
+            if "CFO of BBB" in prompt:
+                return SimpleNamespace(text="not json")
+            return await super().generate_content_async(prompt)
+
+    _, results = _run(Broken(drop={"BBB"}), ["AAA", "BBB"])
+    assert results["AAA"] == _cards("AAA")
+    assert isinstance(results["BBB"], AIGenerationError)
+
+
+def test_batch_call_runs_under_the_latest_caller_deadline():
+    class Slow(FakeModel):
+        async def generate_content_async(self, prompt):
+            await asyncio.sleep(0.1)
+            return await super().generate_content_async(prompt)
+
+    model = Slow()
+
+    async def caller(batcher, ticker, seconds):
+        with resilience.deadline(seconds):
+            return await batcher.generate(f"context for {ticker}", ticker)
+
+    async def main():
+        batcher = ai_engine.PainCardBatcher(window=0.01)
+        return await asyncio.gather(caller(batcher, "AAA", 0.05), caller(batcher, "BBB", 5),
+                                    return_exceptions=True)
+
+    with patch("clients.registry.gemini_model", return_value=model):
+        hurried, patient = asyncio.run(main())
+
+    # The hurried caller gives up on its own; the combined call still serves the other one.
+    assert isinstance(hurried, UpstreamUnavailableError)
+    assert patient == _cards("BBB")
+    assert len(model.prompts) == 1
@@ -0,0 +1,104 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+import assessment_store
+from assessment_store import AssessmentStore, rescore, scope_version
+from classifier import CompiledClassifier, DEFAULT_CLASSIFIER
+from config import settings
+from classification_rules import FRAGMENT_RULES, GLOBAL_CUES, INDUSTRY_GROUPS, SECTOR_GROUPS
+from scope_engine import CompiledScopeRules
+
+THEMES = {"cash flow": ["FIN-TCM"]}
+KEYWORDS = {"margin": ["FIN-CTRL"]}
+PROFILE = {"industry": "Semiconductors", "sector": "Technology", "country": "US", "description": "Domestic."}
+
+
+def _cards(*titles):
+    return [{"title": title, "blurb": "Pressure on gross margin."} for title in titles]
+
+
+def _save(store, ticker, raw_cards, rules, classifier=DEFAULT_CLASSIFIER, filing_id="0001"):
+    record = assessment_store.StoredAssessment(ticker, filing_id, PROFILE, raw_cards, {}, "", "")
+    assessment = rescore(record, rules, classifier)
+    store.save(ticker, filing_id, PROFILE, raw_cards, assessment, scope_version(rules), classifier.version)
+    return assessment
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AssessmentStore(str(tmp_path / "assessments.db"))
+
+
+def test_rules_version_tracks_content():
+    assert CompiledScopeRules(THEMES, KEYWORDS).version == CompiledScopeRules(dict(THEMES), dict(KEYWORDS)).version
+    assert CompiledScopeRules(THEMES, {**KEYWORDS, "treasury": ["FIN-TCM"]}).version != \
+        CompiledScopeRules(THEMES, KEYWORDS).version
+
+
+def test_merge_settings_change_the_scope_version_but_not_the_taxonomy_version(store, monkeypatch):
+    rules = CompiledScopeRules(THEMES, KEYWORDS)
+    _save(store, "AAPL", _cards("Cash flow strain"), rules)
+
+    monkeypatch.setattr(settings, "dedup_similarity", 0.9)
+
+    assert CompiledScopeRules(THEMES, KEYWORDS).version == rules.version
+    assert store.stale_count(rules) == 1
+
+
+def test_current_record_is_returned_as_stored(store):
+    rules = CompiledScopeRules(THEMES, KEYWORDS)
+    assessment = _save(store, "AAPL", _cards("Cash flow strain"), rules)
+    assert assessment["activated_tiles"] == ["FIN-CTRL", "FIN-TCM"]
+    assert store.current("AAPL", "0001", rules) == assessment
+    assert store.current("AAPL", "0002", rules) is None
+
+
+def test_rescope_rewrites_only_affected_records(store):
+    old_rules = CompiledScopeRules(THEMES, KEYWORDS)
+    _save(store, "AAPL", _cards("Treasury gaps"), old_rules)
+    _save(store, "MSFT", _cards("Cash flow strain"), old_rules)
+
+    new_rules = CompiledScopeRules(THEMES, {**KEYWORDS, "treasury": ["FIN-TREASURY"]})
+    assert store.stale_count(new_rules) == 2
+    stats = store.rescope(new_rules)
+
+    assert stats == assessment_store.RescopeStats(scanned=2, rewritten=1, unchanged=1)
+    assert store.stale_count(new_rules) == 0
+    aapl = store.get("AAPL", "0001")
+    assert aapl.taxonomy_version == scope_version(new_rules)
+    assert aapl.assessment["activated_tiles"] == ["FIN-CTRL", "FIN-TREASURY"]
+    assert aapl.assessment["pain_cards"][0]["triggering_keywords"] == ["margin", "treasury"]
+    assert store.rescope(new_rules).scanned == 0
+
+
+def test_classifier_change_reclassifies_without_rescoping(store):
+    rules = CompiledScopeRules(THEMES, KEYWORDS)
+    before = _save(store, "AAPL", _cards("Cash flow strain"), rules)
+    assert before["classified_industry"] == "TMT (Technology, Media & Telecom)"
+
+    edited = CompiledClassifier({**INDUSTRY_GROUPS, "semiconductors": "Hardware"}, SECTOR_GROUPS,
+                                FRAGMENT_RULES, GLOBAL_CUES)
+    after = store.current("AAPL", "0001", rules, edited)
+
+    assert after["classified_industry"] == "Hardware"
+    assert after["pain_cards"] == before["pain_cards"]
+    assert store.get("AAPL", "0001").classifier_version == edited.version
+
+
+def test_pipeline_serves_stored_assessment_without_upstream_calls(store):
+    from pipeline import run_assessment
+    from scope_engine import DEFAULT_RULES
+
+    _save(store, "AAPL", _cards("Cash flow strain"), DEFAULT_RULES)
+    context = AsyncMock(side_effect=AssertionError("context should not be fetched"))
+    with patch("config.settings.assessment_store_path", store.path), \
+            patch("assessment_store._store", store), \
+            patch("config.settings.cache_enabled", False), \
+            patch("scraper.get_latest_filing", AsyncMock(return_value={"id": "0001", "url": "u"})), \
+            patch("scraper.get_company_context", context):
+        response = asyncio.run(run_assessment("AAPL"))
+
+    assert [card.title for card in response.pain_cards] == ["Cash flow strain"]
+    assert "FIN-TCM" in response.activated_tiles
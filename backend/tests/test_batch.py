@@ -0,0 +1,119 @@
+import time
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from exceptions import ExternalAPIError
+from main import app
+from schemas import AssessmentResponse
+
+
+def _assessment():
+    return AssessmentResponse(pain_cards=[], scope_summary="", activated_tiles=[])
+
+
+def _wait_for_completion(client, job_id):
+    for _ in range(100):
+        data = client.get(f"/api/v1/assessments/{job_id}").json()
+        if data["status"] == "completed":
+            return data
+        time.sleep(0.01)
+    raise AssertionError("batch job did not complete")
+
+
+def test_batch_deduplicates_and_reports_per_ticker_results():
+    async def fake_run(ticker, generate_cards=None):
+        if ticker == "FAIL":
+            raise ExternalAPIError("upstream down")
+        return _assessment()
+
+    with patch("pipeline.run_assessment", new=AsyncMock(side_effect=fake_run)) as mock_run, \
+            TestClient(app) as client:
+        response = client.post("/api/v1/assessments", json={"tickers": ["aapl", "AAPL ", "msft", "FAIL", "123"]})
+        assert response.status_code == 202
+        job = response.json()
+        assert job["total"] == 4
+
+        data = _wait_for_completion(client, job["job_id"])
+
+    assert sorted(call.args[0] for call in mock_run.await_args_list) == ["AAPL", "FAIL", "MSFT"]
+    by_ticker = {r["ticker"]: r for r in data["results"]}
+    assert by_ticker["AAPL"]["status"] == "done"
+    assert by_ticker["FAIL"]["error"] == "Failed to retrieve or parse company data."
+    assert by_ticker["123"]["status"] == "error"
+    assert data["failed"] == 2
+    assert data["next_offset"] == 4
+
+
+def test_batch_poll_with_offset_returns_only_new_results():
+    with patch("pipeline.run_assessment", new=AsyncMock(return_value=_assessment())), \
+            TestClient(app) as client:
+        job_id = client.post("/api/v1/assessments", json={"tickers": ["AAPL", "MSFT"]}).json()["job_id"]
+        _wait_for_completion(client, job_id)
+        data = client.get(f"/api/v1/assessments/{job_id}", params={"offset": 1}).json()
+
+    assert len(data["results"]) == 1
+    assert data["next_offset"] == 2
+
+
+def test_batch_rejects_empty_list_and_unknown_job():
+    with TestClient(app) as client:
+        assert client.post("/api/v1/assessments", json={"tickers": []}).status_code == 400
+        assert client.get("/api/v1/assessments/does-not-exist").status_code == 404
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+def test_other_workers_read_published_progress():
+    import batch
+    from cache import TieredCache
+
+    shared = TieredCache(max_entries=64)
+    shared._redis = FakeRedis()
+    with patch("batch.cache", shared), \
+            patch("pipeline.run_assessment", new=AsyncMock(return_value=_assessment())), \
+            TestClient(app) as client:
+        job_id = client.post("/api/v1/assessments", json={"tickers": ["AAPL", "MSFT"]}).json()["job_id"]
+        _wait_for_completion(client, job_id)
+        # As seen from a worker that neither ran the job nor cached its status locally.
+        del batch._jobs[job_id]
+        shared.local.clear()
+        data = client.get(f"/api/v1/assessments/{job_id}", params={"offset": 1}).json()
+
+    assert data["status"] == "completed"
+    assert data["completed"] == 2
+    assert len(data["results"]) == 1
+    assert data["next_offset"] == 2
+
+
+def test_progress_ticks_publish_counts_without_results():
+    import asyncio
+    import batch
+    from cache import TieredCache
+    from schemas import BatchItemResult
+
+    shared = TieredCache(max_entries=64)
+    shared._redis = FakeRedis()
+    job = batch.BatchJob(job_id="job-1", tickers=["AAPL", "MSFT"],
+                         results=[BatchItemResult(ticker="AAPL", status="done", assessment=_assessment())])
+
+    async def published_progress():
+        await batch._publish(job, with_results=False)
+        shared.local.clear()
+        return await batch.get_job_status("job-1", offset=0)
+
+    with patch("batch.cache", shared):
+        data = asyncio.run(published_progress())
+
+    assert (data.status, data.completed, data.total) == ("running", 1, 2)
+    assert data.results == []
+    assert data.next_offset == 0
@@ -0,0 +1,61 @@
+import asyncio
+
+from cache import LRUCache, MISS, TieredCache, make_key
+
+
+def test_lru_cache_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    lru.set("a", 1, ttl=60)
+    lru.set("b", 2, ttl=60)
+    assert lru.get("a") == 1  # "b" is now the least recently used
+    lru.set("c", 3, ttl=60)
+    assert lru.get("b") is MISS
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+
+
+def test_lru_cache_expires_entries():
+    lru = LRUCache(max_entries=2)
+    lru.set("a", 1, ttl=-1)
+    assert lru.get("a") is MISS
+
+
+def test_get_or_load_counts_hits_and_misses():
+    tiered = TieredCache(max_entries=8)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return {"companyName": "Apple"}
+
+    async def run():
+        key = make_key("profile", "AAPL")
+        first = await tiered.get_or_load(key, loader)
+        second = await tiered.get_or_load(key, loader)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first == second == {"companyName": "Apple"}
+    assert len(calls) == 1
+    assert tiered.stats()["hits"] == {"profile.local": 1}
+    assert tiered.stats()["misses"] == {"profile": 1}
+
+
+def test_invalidate_filing_drops_filing_scoped_artifacts():
+    tiered = TieredCache(max_entries=8)
+
+    async def run():
+        await tiered.set(make_key("assessment", "AAPL", "0001"), {"pain_cards": []})
+        await tiered.set(make_key("risk_factors", "AAPL", "0001"), "text")
+        await tiered.set(make_key("profile", "AAPL"), {"industry": "Tech"})
+        await tiered.invalidate_filing("AAPL", "0001")
+        return (
+            await tiered.get(make_key("assessment", "AAPL", "0001")),
+            await tiered.get(make_key("risk_factors", "AAPL", "0001")),
+            await tiered.get(make_key("profile", "AAPL")),
+        )
+
+    assessment, risk_factors, profile = asyncio.run(run())
+    assert assessment is MISS
+    assert risk_factors is MISS
+    assert profile == {"industry": "Tech"}
@@ -32,3 +32,37 @@ def test_geo_scope_us_only_vs_global():
     }
     _, scope_global = classify_company(global_profile)
     assert scope_global == "More than 5 countries"
+
+
+def test_exact_industry_name_wins_over_sector():
+    industry, _ = classify_company({"sector": "Industrials", "industry": "Staffing & Employment Services"})
+    assert industry == "Professional Services"
+
+
+def test_unlisted_names_fall_back_to_fragment_rules():
+    industry, _ = classify_company({"sector": "Consumer Cyclical", "industry": "Streaming Media Platforms"})
+    assert industry == "TMT (Technology, Media & Telecom)"
+    industry, _ = classify_company({"sector": "Business Services", "industry": "Business Process Outsourcing"})
+    assert industry == "Professional Services"
+
+
+def test_missing_and_null_fields_use_defaults():
+    industry, scope = classify_company({"sector": None, "industry": None, "description": None, "country": None})
+    assert industry == "C&IP (Consumer & Industrial Products)"
+    assert scope == "More than 5 countries"
+
+
+def test_classify_many_matches_classify_company():
+    from backend.classifier import classify_many
+
+    profiles = [
+        {"sector": "Healthcare", "industry": "Biotechnology", "country": "US", "description": "Domestic."},
+        {"sector": "Financial Services", "industry": "Banks - Regional", "country": "US",
+         "description": "Operates worldwide."},
+        {"sector": "Energy", "industry": "Oil & Gas E&P", "country": "CA", "description": ""},
+    ]
+    assert classify_many(profiles) == [classify_company(p) for p in profiles]
+    assert classify_many(profiles)[:2] == [
+        ("LSHC (Life Sciences & Health Care)", "US-based only"),
+        ("FSI (Financial Services Industry)", "More than 5 countries"),
+    ]
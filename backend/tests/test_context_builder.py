@@ -0,0 +1,42 @@
+import context_builder
+from scope_engine import DEFAULT_RULES
+
+FILLER = "Our business is subject to general economic conditions and other uncertainties. " * 6
+
+
+def test_short_context_is_kept_whole():
+    text = "First risk.\nSecond risk."
+    assert context_builder.build_context(text, token_budget=1000) == text
+
+
+def test_relevant_paragraphs_win_within_budget():
+    paragraphs = [FILLER] * 20 + [
+        "Delays in our financial close and financial reporting could lead to restatements.",
+    ] + [FILLER] * 20
+    text = "\n".join(paragraphs)
+    budget = context_builder.estimate_tokens(FILLER) * 2
+
+    context = context_builder.build_context(text, token_budget=budget)
+
+    assert "financial close" in context
+    assert sum(context_builder.estimate_tokens(p) for p in context.split("\n")) <= budget
+
+
+def test_selection_prefers_new_tiles_and_keeps_document_order():
+    close = "Our financial close process is slow."
+    close_again = "The financial close is also manual and the financial close is error prone."
+    tiles_close, _ = DEFAULT_RULES.match(close.lower(), "")
+    other = next(k for k, tiles in context_builder.DEFAULT_RULES.keyword_rules.items() if not set(tiles) <= tiles_close)
+    different = f"We face {other} risks."
+    scored = context_builder.score_paragraphs([close, close_again, different])
+    budget = scored[0].tokens + scored[2].tokens
+
+    selected = context_builder.select_paragraphs(scored, budget)
+
+    assert [p.text for p in selected] == [close, different]
+
+
+def test_unbroken_text_is_windowed():
+    text = " ".join(["word"] * (context_builder.MAX_PARAGRAPH_WORDS * 2 + 1))
+    assert [len(p.split()) for p in context_builder.split_paragraphs(text)] == [
+        context_builder.MAX_PARAGRAPH_WORDS, context_builder.MAX_PARAGRAPH_WORDS, 1]
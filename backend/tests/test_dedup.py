@@ -0,0 +1,68 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import dedup
+import pipeline
+from config import settings
+from scope_engine import CompiledScopeRules, process_scope_and_cards
+
+RULES = CompiledScopeRules({"gross margin": ["FIN-CTRL"]}, {"close": ["FIN-R2R"], "freight": ["SCM-LOG"]})
+MARGIN = {"title": "Rising input costs squeeze gross margin",
+          "blurb": "Higher raw material costs reduce gross margin."}
+MARGIN_PARAPHRASE = {"title": "Gross margin squeezed by rising input costs",
+                     "blurb": "Raw material and freight costs are rising and reduce margin."}
+CLOSE = {"title": "Manual financial close", "blurb": "Month-end reconciliation takes weeks."}
+PROFILE = {"companyName": "Acme", "industry": "Software", "description": "Acme sells software."}
+
+
+def test_paraphrases_are_similar_and_unrelated_cards_are_not():
+    margin, paraphrase, close = (dedup.signature(card) for card in (MARGIN, MARGIN_PARAPHRASE, CLOSE))
+    assert dedup.similarity(margin, paraphrase) >= settings.dedup_similarity
+    assert dedup.similarity(margin, close) < 0.2
+    assert dedup.shingles("The Rising Costs of freight") == {"rising", "cost", "freight"}
+
+
+def test_near_duplicates_merge_into_the_first_card_with_their_tiles():
+    cards, tiles = dedup.scope_and_merge([dict(MARGIN), dict(CLOSE), dict(MARGIN_PARAPHRASE)], RULES)
+
+    assert [card["title"] for card in cards] == [MARGIN["title"], CLOSE["title"]]
+    assert cards[0]["blurb"] == MARGIN["blurb"]
+    assert cards[0]["triggered_tiles"] == ["FIN-CTRL", "SCM-LOG"]
+    assert cards[0]["triggering_keywords"] == ["freight", "gross margin"]
+    assert cards[1]["triggered_tiles"] == ["FIN-R2R"]
+    assert tiles == ["FIN-CTRL", "FIN-R2R", "SCM-LOG"]
+
+
+def test_disabled_dedup_keeps_every_card(monkeypatch):
+    monkeypatch.setattr(settings, "dedup_enabled", False)
+    raw = [MARGIN, CLOSE, MARGIN_PARAPHRASE]
+
+    assert dedup.scope_and_merge([dict(card) for card in raw], RULES) == \
+        process_scope_and_cards([dict(card) for card in raw], RULES)
+    assert dedup.CardGroups().add(dict(MARGIN), dedup.signature(MARGIN), [], [])
+    assert dedup.CardGroups().threshold == float("inf")
+
+
+def test_stream_sends_each_theme_once_and_completes_with_merged_cards(monkeypatch):
+    monkeypatch.setattr(settings, "cache_enabled", False)
+
+    async def fake_cards(context, ticker):
+        for card in (MARGIN, CLOSE, MARGIN_PARAPHRASE):
+            yield dict(card)
+
+    async def run():
+        events = []
+        with patch("scraper.get_latest_filing", new=AsyncMock(return_value=None)), \
+                patch("scraper.get_company_profile", new=AsyncMock(return_value=PROFILE)), \
+                patch("scraper.get_risk_factors", new=AsyncMock(return_value="")), \
+                patch("ai_engine.stream_pain_cards", new=fake_cards):
+            async for event in pipeline.stream_assessment("ACME"):
+                events.append(event)
+        return events
+
+    events = asyncio.run(run())
+
+    assert [name for name, _ in events] == ["profile", "card", "card", "complete"]
+    assert [data["title"] for name, data in events if name == "card"] == [MARGIN["title"], CLOSE["title"]]
+    _, tiles = dedup.scope_and_merge([dict(MARGIN), dict(CLOSE), dict(MARGIN_PARAPHRASE)])
+    assert events[-1][1]["activated_tiles"] == tiles
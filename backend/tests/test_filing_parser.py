@@ -0,0 +1,40 @@
+import pytest
+
+from filing_parser import RiskFactorExtractor, extract_risk_factors, join_paragraphs
+from scraper import _extract_risk_factors
+
+FILINGS = [
+    b"<h2>Item 1A. Risk Factors</h2><p>Risk one.</p><p>Risk <b>two</b>.</p>"
+    b"<h2>Item 1B. Unresolved</h2><p>ignored</p>",
+    # Table of contents match comes first, so the section ends at the next TOC heading.
+    b"<p>Contents <a>Item 1A. Risk Factors</a></p><p>toc</p><h3>Item 1B. Other</h3>"
+    b"<h2>Item 1A.&nbsp;Risk Factors</h2><p>real &amp; risks</p>",
+    # Only the loose "Risk Factors" marker is present.
+    b"<div>Risk Factors</div><p>a<p>nested</p></p><h2>Overview</h2><p>c</p><h4>item 2. x</h4><p>d</p>",
+    # Comments and scripts can hold the marker but never contribute text.
+    b"<!-- Item 1A. Risk Factors --><p>kept</p><p>x <script>var y</script> z</p><h2>Item <br/>7. MD&amp;A</h2>",
+    b"<p>Risk Factors</p><div><p>unclosed</div><p>next<p/><p>  spaced  </p><h2><p>Item 3.</p></h2><p>z</p>",
+    b"<h2>Item 1A. Risk Factors</h2><p>&#8217;quoted&#x2019; &copy caf&eacute;</p>",
+    b"<p>No section markers at all.</p>",
+]
+
+
+@pytest.mark.parametrize("html", FILINGS)
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_streaming_extractor_matches_soup_extractor(html, chunk_size):
+    chunks = (html[i:i + chunk_size] for i in range(0, len(html), chunk_size))
+    assert extract_risk_factors(chunks) == _extract_risk_factors(html)
+
+
+def test_extractor_stops_once_section_ends():
+    head = b"<h2>Item 1A. Risk Factors</h2><p>Risk.</p><h2>Item 1B. Unresolved</h2>"
+    extractor = RiskFactorExtractor()
+    assert extractor.feed_bytes(head) is True
+    assert extractor.result() == "Risk."
+
+
+def test_paragraphs_preserve_boundaries():
+    html = b"<h2>Item 1A. Risk Factors</h2><p>Risk\n  one.</p><p></p><p>Risk two.</p><h2>Item 2. X</h2>"
+    extractor = RiskFactorExtractor()
+    extractor.feed_bytes(html)
+    assert join_paragraphs(extractor.paragraphs()) == "Risk one.\nRisk two."
@@ -0,0 +1,177 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+import filing_store
+import scraper
+from cache import TieredCache
+from config import settings
+from filing_parser import SectionIndexer
+from filing_store import FilingStore
+
+FILING_HTML = (
+    b"<html><body><table>"
+    b"<tr><td>Item 1A.</td><td>Risk Factors</td><td>12</td></tr>"
+    b"<tr><td>Item 7.</td><td>Management&#8217;s Discussion</td><td>30</td></tr>"
+    b"</table>"
+    b"<h2>Item 1A. Risk Factors</h2><p>Supply chain disruption could hurt margins.</p>"
+    b"<h2>Item 1B. Unresolved Staff Comments</h2><p>None.</p>"
+    b"<div><span>ITEM 7. Management&#8217;s Discussion and Analysis</span></div>"
+    b"<p>Revenue grew 8%.</p><p>Gross margin <b>narrowed</b>.</p><script>var x;</script>"
+    b"<div>Item 7A: Quantitative and Qualitative Disclosures</div><p>Rates rose.</p>"
+    b"</body></html>"
+)
+FILING = {"url": "https://www.sec.gov/Archives/edgar/data/1/000000000123000001/a10k.htm", "id": "000000000123000001"}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 13, 64 * 1024])
+def test_indexer_splits_every_item_in_one_pass(chunk_size):
+    indexer = SectionIndexer()
+    for i in range(0, len(FILING_HTML), chunk_size):
+        indexer.feed_bytes(FILING_HTML[i:i + chunk_size])
+
+    # The body wins over the (shorter) table-of-contents entries.
+    assert indexer.sections() == {
+        "1A": "Supply chain disruption could hurt margins.",
+        "1B": "None.",
+        "7": "Revenue grew 8%.\nGross margin narrowed.",
+        "7A": "Rates rose.",
+    }
+
+
+def test_sections_are_sliced_from_the_offset_index(tmp_path):
+    store = FilingStore(str(tmp_path / "filings.db"), max_bytes=1 << 20)
+    sections = {"1A": "risk " * 100, "7": "md&a " * 200, "7A": "rates"}
+    store.put("acc-1", "https://sec.test/a", sections)
+
+    index = store.index("acc-1")
+    assert list(index) == ["1A", "7", "7A"]
+    assert index["7"][0] == index["1A"][0] + index["1A"][1]
+    assert store.section("acc-1", "7") == sections["7"]
+    assert store.section("acc-1", "7a") == "rates"
+    assert store.section("acc-1", "9") == ""
+    assert store.section("acc-2", "7") is None
+
+
+def test_least_recently_read_filings_are_evicted(tmp_path):
+    store = FilingStore(str(tmp_path / "filings.db"), max_bytes=1 << 20)
+    sections = {"1A": "risk factors"}
+    size = store.put("old", "u1", sections)
+    store.put("read", "u2", sections)
+    store.max_bytes = 2 * size
+    store.section("old", "1A")  # now more recently used than "read"
+
+    store.put("new", "u3", sections)
+
+    assert store.index("read") is None
+    assert store.section("old", "1A") == "risk factors"
+    assert store.total_bytes() == 2 * size
+
+
+def test_filing_key_prefers_the_accession_number():
+    assert filing_store.filing_key(FILING["url"], FILING["id"]) == FILING["id"]
+    assert filing_store.filing_key(FILING["url"]) == filing_store.filing_key(FILING["url"])
+    assert filing_store.filing_key(FILING["url"]).startswith("url:")
+
+
+def _fetch(tmp_path, monkeypatch, store_enabled, *items):
+    """Risk factors, then each of ``items``; returns (texts, download count, bytes read per download)."""
+    path = str(tmp_path / "filings" / "filings.db") if store_enabled else None
+    monkeypatch.setattr(settings, "filing_store_path", path)
+    monkeypatch.setattr(filing_store, "_store", None)
+    monkeypatch.setattr(scraper, "STREAM_CHUNK_SIZE", 64)
+    downloads, bytes_read = [], []
+
+    def handler(request):
+        downloads.append(request.url)
+        return httpx.Response(200, content=FILING_HTML, headers={"Content-Type": "text/html; charset=utf-8"})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as sec:
+            with patch("scraper.registry", SimpleNamespace(sec=sec)), \
+                    patch("scraper.cache", TieredCache(max_entries=64)), \
+                    patch("scraper.metrics.record_upstream_bytes", lambda upstream, n: bytes_read.append(n)):
+                texts = [await scraper.get_risk_factors("TEST", FILING)]
+                await asyncio.gather(*scraper._indexing.values())
+                for item in items:
+                    texts.append(await scraper.get_filing_section("TEST", item, FILING))
+        return texts
+
+    return asyncio.run(run()), len(downloads), bytes_read
+
+
+def test_without_a_store_risk_factors_stop_early(tmp_path, monkeypatch):
+    (risks,), downloads, bytes_read = _fetch(tmp_path, monkeypatch, False)
+
+    assert risks == "Supply chain disruption could hurt margins."
+    assert downloads == 1
+    assert bytes_read[0] < len(FILING_HTML)
+
+
+def test_risk_factor_download_fills_the_store_for_every_section(tmp_path, monkeypatch):
+    texts, downloads, bytes_read = _fetch(tmp_path, monkeypatch, True, "7", "7A", "9", "1a")
+    risks, mdna, market, missing, item_1a = texts
+
+    assert risks == item_1a == "Supply chain disruption could hurt margins."
+    assert mdna == "Revenue grew 8%.\nGross margin narrowed."
+    assert market == "Rates rose."
+    assert missing == ""
+    # The risk-factor download still stopped at the end of Item 1A; one background
+    # download read the whole filing, and every other section came from the store.
+    assert downloads == 2
+    assert bytes_read[0] < len(FILING_HTML)
+    assert bytes_read[1:] == [len(FILING_HTML)]
+    assert filing_store.get_store().count() == 1
+
+
+def test_stored_risk_factors_are_read_before_downloading(tmp_path, monkeypatch):
+    store = FilingStore(str(tmp_path / "filings.db"), max_bytes=1 << 20)
+    store.put(FILING["id"], FILING["url"], {"1A": "Stored risks.", "7": "Stored MD&A."})
+    monkeypatch.setattr(settings, "filing_store_path", store.path)
+    monkeypatch.setattr(filing_store, "_store", store)
+
+    def handler(request):
+        raise AssertionError("the filing should not be downloaded")
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as sec:
+            with patch("scraper.registry", SimpleNamespace(sec=sec)), \
+                    patch("scraper.cache", TieredCache(max_entries=64)):
+                return await scraper.get_risk_factors("TEST", FILING)
+
+    assert asyncio.run(run()) == "Stored risks."
+
+
+def test_reads_are_recorded_without_a_write_per_read(tmp_path):
+    store = FilingStore(str(tmp_path / "filings.db"), max_bytes=1 << 20)
+    store.put("acc-1", "u1", {"1A": "risk factors"})
+    stored_at = store._connection().execute("SELECT last_used FROM filings").fetchone()[0]
+
+    store.section("acc-1", "1A")
+    assert store._connection().execute("SELECT last_used FROM filings").fetchone()[0] == stored_at
+
+    store.flush_touches()
+    assert store._connection().execute("SELECT last_used FROM filings").fetchone()[0] > stored_at
+
+
+def test_one_background_download_per_filing(monkeypatch):
+    started = []
+
+    async def fill(client, ticker, filing):
+        started.append(ticker)
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(scraper, "_fill_store", fill)
+
+    async def run():
+        scraper._schedule_fill(None, "TEST", FILING)
+        scraper._schedule_fill(None, "TEST", FILING)
+        await asyncio.gather(*scraper._indexing.values())
+        await asyncio.sleep(0)
+        return dict(scraper._indexing)
+
+    assert asyncio.run(run()) == {}
+    assert started == ["TEST"]
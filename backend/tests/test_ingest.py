@@ -0,0 +1,48 @@
+import io
+import tarfile
+
+import ingest
+from risk_store import RiskFactorStore
+
+FILING_HTML = (
+    b"<html><body><h2>Item 1A. Risk Factors</h2>"
+    b"<p>Supply chain disruption could hurt margins.</p>"
+    b"<h2>Item 1B. Unresolved Staff Comments</h2><p>None.</p></body></html>"
+)
+
+SUBMISSION = (
+    b"<SEC-DOCUMENT>0000320193-23-000106.txt\n"
+    b"<DOCUMENT>\n<TYPE>EX-21\n<TEXT>\n<p>Item 1A. Risk Factors in an exhibit</p>\n</TEXT>\n</DOCUMENT>\n"
+    b"<DOCUMENT>\n<TYPE>10-K\n<SEQUENCE>1\n<TEXT>\n" + FILING_HTML + b"\n</TEXT>\n</DOCUMENT>\n"
+)
+
+MASTER_INDEX = """Description:           Master Index of EDGAR Dissemination Feed
+CIK|Company Name|Form Type|Date Filed|Filename
+--------------------------------------------------------------------------------
+320193|Apple Inc.|10-K|2023-11-03|edgar/data/320193/0000320193-23-000106.txt
+320193|Apple Inc.|8-K|2023-11-02|edgar/data/320193/0000320193-23-000105.txt
+"""
+
+
+def test_extract_submission_reads_only_the_10k_document():
+    text = ingest.extract_submission(io.BytesIO(SUBMISSION))
+    assert text == "Supply chain disruption could hurt margins."
+
+
+def test_ingest_tarball_into_store(tmp_path):
+    (tmp_path / "master.idx").write_text(MASTER_INDEX)
+    (tmp_path / "company_tickers.json").write_text('{"0": {"cik_str": 320193, "ticker": "aapl", "title": "Apple"}}')
+    archive = tmp_path / "20231103.nc.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        info = tarfile.TarInfo("0000320193-23-000106.nc")
+        info.size = len(SUBMISSION)
+        tar.addfile(info, io.BytesIO(SUBMISSION))
+    store_path = str(tmp_path / "risk.db")
+
+    written = ingest.ingest([str(tmp_path / "master.idx")], str(tmp_path / "company_tickers.json"),
+                            store_path, [str(tmp_path)], workers=1)
+
+    store = RiskFactorStore(store_path)
+    assert written == 1
+    assert store.get("AAPL", "000032019323000106") == "Supply chain disruption could hurt margins."
+    assert store.latest("AAPL").filed_at == "2023-11-03"
@@ -0,0 +1,104 @@
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+from fastapi.testclient import TestClient
+
+import logger as log_module
+from logger import ContextFilter, JSONFormatter, LazyQueueHandler, SamplingFilter, bind_request_id, get_logger
+
+
+def _record(msg="hello %s", args=("world",), **extra):
+    record = logging.makeLogRecord({"name": "lead_scope_ai.pipeline", "levelno": logging.INFO,
+                                    "levelname": "INFO", "msg": msg, "args": args})
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_json_formatter_includes_request_id_and_extras():
+    bind_request_id("req-1")
+    try:
+        record = _record(event="request", stages_ms={"scope_mapping": 1.5})
+        ContextFilter().filter(record)
+    finally:
+        bind_request_id(None)
+
+    entry = json.loads(JSONFormatter().format(record))
+    assert entry["message"] == "hello world"
+    assert entry["request_id"] == "req-1"
+    assert entry["event"] == "request"
+    assert entry["stages_ms"] == {"scope_mapping": 1.5}
+    assert entry["logger"] == "lead_scope_ai.pipeline"
+
+
+def test_queue_handler_defers_formatting():
+    class Counted:
+        renders = 0
+
+        def __str__(self):
+            Counted.renders += 1
+            return "value"
+
+    records = queue.SimpleQueue()
+    LazyQueueHandler(records).handle(_record("got %s", (Counted(),)))
+    queued = records.get_nowait()
+    assert Counted.renders == 0
+    assert queued.getMessage() == "got value"
+
+
+def test_sampling_keeps_one_in_n_but_never_drops_warnings():
+    sampler = SamplingFilter({"health_check": 0.25, "noise": 0})
+    kept = [sampler.filter(_record(event="health_check")) for _ in range(8)]
+    assert kept.count(True) == 2
+    assert not sampler.filter(_record(event="noise"))
+    assert sampler.filter(_record(event="other"))
+    warning = _record(event="noise")
+    warning.levelno = logging.WARNING
+    assert sampler.filter(warning)
+
+
+def test_module_loggers_are_children_of_the_app_logger():
+    assert get_logger("backend.scraper").name == "lead_scope_ai.scraper"
+    assert get_logger("scraper").parent is logging.getLogger("lead_scope_ai")
+    assert log_module.parse_pairs("scraper=DEBUG, cache = WARNING,,") == {"scraper": "DEBUG", "cache": "WARNING"}
+
+
+def test_requests_are_logged_with_their_id():
+    from main import app
+
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JSONFormatter())
+    listener = logging.handlers.QueueListener(queue.SimpleQueue(), handler)
+    app_logger = logging.getLogger("lead_scope_ai")
+    capture = LazyQueueHandler(listener.queue)
+    capture.addFilter(ContextFilter())
+    app_logger.addHandler(capture)
+    listener.start()
+    try:
+        response = TestClient(app).get("/metrics", headers={"X-Request-ID": "abc123"})
+    finally:
+        listener.stop()
+        app_logger.removeHandler(capture)
+
+    assert response.headers["X-Request-ID"] == "abc123"
+    entries = [json.loads(line) for line in stream.getvalue().splitlines()]
+    request = next(entry for entry in entries if entry.get("event") == "request")
+    assert request["request_id"] == "abc123"
+    assert request["route"] == "/metrics"
+    assert request["status"] == 200
+
+
+def test_forked_worker_gets_its_own_writer_thread():
+    handler = next(h for h in logging.getLogger("lead_scope_ai").handlers if isinstance(h, LazyQueueHandler))
+    inherited_queue, inherited_listener = handler.queue, log_module._listener
+    log_module._restart_after_fork()
+    try:
+        assert handler.queue is not inherited_queue
+        assert log_module._listener is not inherited_listener
+        assert log_module._listener._thread.is_alive()
+    finally:
+        inherited_listener.stop()
@@ -0,0 +1,45 @@
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+import metrics
+from main import app
+from schemas import AssessmentResponse
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.MetricsRegistry()
+    histogram = registry.histogram("demo_seconds", "Demo.", buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="a")
+    histogram.observe(0.5, stage="a")
+    histogram.observe(5.0, stage="a")
+
+    text = registry.render()
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="a",le="1"} 2' in text
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="a"} 3' in text
+
+
+def test_server_timing_header_format():
+    assert metrics.server_timing_header([("validate", 0.0012), ("gemini_call", 1.5)]) == \
+        "validate;dur=1.2, gemini_call;dur=1500.0"
+
+
+def test_assessment_exposes_stage_timings():
+    async def fake_run(ticker):
+        metrics.observe_stage("gemini_call", 0.25)
+        return AssessmentResponse(pain_cards=[], scope_summary="", activated_tiles=[])
+
+    with patch("pipeline.run_assessment", new=AsyncMock(side_effect=fake_run)), \
+            patch("scraper.get_latest_filing", new=AsyncMock(return_value=None)), TestClient(app) as client:
+        response = client.get("/api/v1/assessment/AAPL")
+        assert response.status_code == 200
+        assert "validate;dur=" in response.headers["Server-Timing"]
+        assert "gemini_call;dur=250.0" in response.headers["Server-Timing"]
+
+        text = client.get("/metrics").text
+
+    assert 'leadscope_stage_duration_seconds_count{stage="gemini_call"}' in text
+    assert 'leadscope_request_duration_seconds_count{route="/api/v1/assessment/{ticker}",status="200"}' in text
+    assert "# TYPE leadscope_cache_hits_total counter" in text
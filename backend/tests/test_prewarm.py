@@ -0,0 +1,97 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+from cache import TieredCache, make_key
+from exceptions import ExternalAPIError
+from pipeline import SCORING_VERSION
+from prewarm import Prewarmer
+
+PROFILE = {"companyName": "Apple", "industry": "Consumer Electronics", "revenue": 1.0}
+
+
+class Upstreams:
+    """Stands in for the scraper refreshes and the pipeline, writing assessments to a private cache."""
+
+    def __init__(self, cache, filing_id="0000320193-24-000123"):
+        self.cache = cache
+        self.filing_id = filing_id
+        self.profile = dict(PROFILE)
+        self.refresh_company_profile = AsyncMock(side_effect=lambda ticker: dict(self.profile))
+        self.refresh_latest_filing = AsyncMock(side_effect=lambda ticker: {"id": self.filing_id, "url": "u"})
+        self.run_assessment = AsyncMock(side_effect=self._assess)
+
+    async def _assess(self, ticker, refresh=False):
+        await self.cache.set(make_key("assessment", ticker, self.filing_id),
+                             {"ticker": ticker, "scoring_version": SCORING_VERSION})
+
+    def patches(self):
+        return [
+            patch("prewarm.cache", self.cache),
+            patch("scraper.refresh_company_profile", self.refresh_company_profile),
+            patch("scraper.refresh_latest_filing", self.refresh_latest_filing),
+            patch("pipeline.run_assessment", self.run_assessment),
+        ]
+
+
+def _run(upstreams, coro_factory):
+    async def main():
+        for p in upstreams.patches():
+            p.start()
+        try:
+            return await coro_factory()
+        finally:
+            patch.stopall()
+
+    return asyncio.run(main())
+
+
+def _prewarmer(tickers):
+    return Prewarmer(tickers)
+
+
+def test_first_pass_computes_then_stays_warm():
+    upstreams = Upstreams(TieredCache(max_entries=64))
+    prewarmer = _prewarmer(["aapl", "AAPL", "msft", "not a ticker"])
+    assert prewarmer.tickers == ["AAPL", "MSFT"]
+
+    first = _run(upstreams, prewarmer.run_once)
+    second = _run(upstreams, prewarmer.run_once)
+
+    assert first == {"warm": 0, "recomputed": 2, "error": 0}
+    assert second == {"warm": 2, "recomputed": 0, "error": 0}
+    # Both cadences are far longer than the test, so the second pass made no upstream calls.
+    assert upstreams.refresh_company_profile.await_count == 2
+    assert upstreams.refresh_latest_filing.await_count == 2
+    assert all(call.kwargs == {"refresh": True} for call in upstreams.run_assessment.await_args_list)
+
+
+def test_new_filing_or_profile_change_triggers_recompute():
+    upstreams = Upstreams(TieredCache(max_entries=64))
+    prewarmer = _prewarmer(["AAPL"])
+    _run(upstreams, prewarmer.run_once)
+
+    upstreams.filing_id = "0000320193-25-000001"
+    with patch("config.settings.prewarm_filing_interval", 0):
+        assert _run(upstreams, prewarmer.run_once)["recomputed"] == 1
+        assert _run(upstreams, prewarmer.run_once)["warm"] == 1
+    assert prewarmer.status()["AAPL"]["filing_id"] == "0000320193-25-000001"
+
+    upstreams.profile["revenue"] = 2.0
+    with patch("config.settings.prewarm_profile_interval", 0):
+        assert _run(upstreams, prewarmer.run_once)["recomputed"] == 1
+
+
+def test_expired_assessment_is_recomputed():
+    upstreams = Upstreams(TieredCache(max_entries=64))
+    prewarmer = _prewarmer(["AAPL"])
+    _run(upstreams, prewarmer.run_once)
+    upstreams.cache.local.clear()
+    assert _run(upstreams, prewarmer.run_once)["recomputed"] == 1
+
+
+def test_failures_are_recorded_per_ticker():
+    upstreams = Upstreams(TieredCache(max_entries=64))
+    upstreams.refresh_company_profile.side_effect = ExternalAPIError("down")
+    prewarmer = _prewarmer(["AAPL"])
+    assert _run(upstreams, prewarmer.run_once) == {"warm": 0, "recomputed": 0, "error": 1}
+    assert prewarmer.status()["AAPL"]["last_error"] == "Failed to retrieve or parse company data."
@@ -0,0 +1,170 @@
+import asyncio
+
+import httpx
+import pytest
+
+import rate_limit
+import resilience
+import scraper
+import upstream
+from config import settings
+from exceptions import RateLimitedError, UpstreamUnavailableError
+
+
+@pytest.fixture(autouse=True)
+def fresh_governor(monkeypatch):
+    monkeypatch.setattr(settings, "retry_base_delay", 0.0)
+    monkeypatch.setattr(settings, "rate_limit_redis_enabled", False)
+    for name in list(resilience.breakers):
+        monkeypatch.setitem(resilience.breakers, name, resilience.CircuitBreaker(name, 3, 60.0))
+    rate_limit.governor.reset()
+    yield
+    rate_limit.governor.reset()
+
+
+def _scarce(monkeypatch, per_minute=600.0, keys=("k1",)):
+    """A governor whose buckets hold a single token, refilled every 60/per_minute seconds."""
+    return rate_limit.UpstreamGovernor("fmp", list(keys), per_minute, burst=1)
+
+
+def test_keys_are_rotated():
+    governor = rate_limit.UpstreamGovernor("fmp", ["k1", "k2"], 6000, burst=10)
+
+    async def run():
+        return [await governor.acquire() for _ in range(4)]
+
+    assert asyncio.run(run()) == ["k1", "k2", "k1", "k2"]
+
+
+def test_configured_keys_are_deduplicated(monkeypatch):
+    monkeypatch.setattr(settings, "fmp_api_key", "k1")
+    monkeypatch.setattr(settings, "fmp_api_keys", ["k2", "k1", ""])
+    assert rate_limit.api_keys("fmp") == ["k1", "k2"]
+    assert rate_limit.api_keys("sec") == ["sec"]
+
+
+def test_interactive_callers_go_first(monkeypatch):
+    governor = _scarce(monkeypatch)
+    order = []
+
+    async def caller(level):
+        with rate_limit.priority(level):
+            await governor.acquire()
+        order.append(rate_limit.PRIORITY_NAMES[level])
+
+    async def run():
+        await governor.acquire()  # empty the bucket so everyone queues
+        await asyncio.gather(*(caller(level) for level in (rate_limit.PREWARM, rate_limit.BATCH,
+                                                            rate_limit.INTERACTIVE)))
+
+    asyncio.run(run())
+    assert order == ["interactive", "batch", "prewarm"]
+
+
+def test_gemini_defaults_keep_a_reserve_for_interactive_calls(monkeypatch):
+    monkeypatch.setattr(settings, "google_api_key", "g1")
+    monkeypatch.setattr(settings, "google_api_keys", [])
+    governor = rate_limit.governor["gemini"]
+
+    async def drain(level):
+        granted = 0
+        with rate_limit.priority(level):
+            try:
+                while True:
+                    await governor.acquire(budget=0.01)
+                    granted += 1
+            except RateLimitedError:
+                return granted
+
+    async def run():
+        return await drain(rate_limit.BATCH), await drain(rate_limit.INTERACTIVE)
+
+    batch, interactive = asyncio.run(run())
+    # Batch work stops at the reserve; interactive calls can still burst past one call.
+    assert batch + interactive == governor.capacity
+    assert interactive >= 2 and interactive >= governor.capacity * settings.rate_limit_reserve
+
+
+def test_caller_is_shed_when_no_token_is_due_before_its_deadline(monkeypatch):
+    governor = _scarce(monkeypatch, per_minute=60)
+
+    async def run():
+        await governor.acquire()
+        await governor.acquire(budget=0.05)
+
+    with pytest.raises(RateLimitedError):
+        asyncio.run(run())
+    assert not governor._queue
+
+
+def test_throttled_key_rests_and_the_retry_uses_another(monkeypatch):
+    monkeypatch.setattr(settings, "fmp_api_key", "k1")
+    monkeypatch.setattr(settings, "fmp_api_keys", ["k2"])
+    used = []
+
+    async def operation():
+        key = rate_limit.current_key()
+        used.append(key)
+        if key == "k1":
+            request = httpx.Request("GET", "https://example.test")
+            raise httpx.HTTPStatusError("slow down", request=request, response=httpx.Response(
+                429, request=request, headers={"Retry-After": "60"}))
+        return key
+
+    async def run():
+        return [await resilience.call("fmp", operation) for _ in range(3)]
+
+    assert asyncio.run(run()) == ["k2", "k2", "k2"]
+    assert used == ["k1", "k2", "k2", "k2"]
+    # Throttling is about the key, not the host.
+    assert resilience.breakers["fmp"].state == resilience.CLOSED
+
+
+def test_rate_limited_error_is_an_upstream_outage():
+    assert issubclass(RateLimitedError, UpstreamUnavailableError)
+
+
+def test_unreachable_redis_falls_back_to_local_buckets(monkeypatch):
+    monkeypatch.setattr(settings, "rate_limit_redis_enabled", True)
+    governor = rate_limit.UpstreamGovernor("fmp", ["k1"], 6000, redis_url="redis://127.0.0.1:1/0")
+
+    assert asyncio.run(governor.acquire()) == "k1"
+
+
+def test_local_buckets_hold_this_workers_share(monkeypatch):
+    monkeypatch.setattr(settings, "fmp_requests_per_minute", 300)
+    monkeypatch.setattr(settings, "fmp_burst", 10)
+    upstream.set_worker_count(4)
+    try:
+        governor = rate_limit.governor["fmp"]
+    finally:
+        upstream.set_worker_count(1)
+
+    assert governor.local_rate * 60 == 75
+    assert governor.local_capacity == 2.5
+    # Redis buckets still hold the whole quota for all workers.
+    assert governor.rate * 60 == 300 and governor.capacity == 10
+
+
+def test_local_buckets_keep_room_for_one_call():
+    governor = rate_limit.UpstreamGovernor("gemini", ["k1"], 15, burst=8, workers=16)
+
+    assert governor.local_capacity == 1.0
+    assert asyncio.run(governor.acquire()) == "k1"
+
+
+def test_fmp_requests_carry_the_granted_key(monkeypatch):
+    monkeypatch.setattr(settings, "fmp_api_key", "k1")
+    seen = []
+
+    def handler(request):
+        seen.append(request.url)
+        return httpx.Response(200, json=[])
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await scraper._fmp_get(client, "https://fmp.test/income-statement/AAPL?period=annual&limit=1")
+
+    asyncio.run(run())
+    assert seen[0].params["apikey"] == "k1"
+    assert seen[0].params["period"] == "annual"
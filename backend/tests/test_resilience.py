@@ -0,0 +1,143 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import resilience
+from config import settings
+from exceptions import UpstreamUnavailableError
+
+
+def _status_error(code):
+    request = httpx.Request("GET", "https://example.test")
+    return httpx.HTTPStatusError("boom", request=request, response=httpx.Response(code, request=request))
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    monkeypatch.setattr(settings, "retry_base_delay", 0.0)
+    for name in list(resilience.breakers):
+        monkeypatch.setitem(resilience.breakers, name, resilience.CircuitBreaker(name, 3, 60.0))
+
+
+def test_transient_failures_are_retried():
+    calls = []
+
+    async def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise _status_error(503)
+        return "ok"
+
+    assert asyncio.run(resilience.call("fmp", flaky)) == "ok"
+    assert len(calls) == 3
+    assert resilience.breakers["fmp"].state == resilience.CLOSED
+
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    async def not_found():
+        calls.append(1)
+        raise _status_error(404)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(resilience.call("fmp", not_found))
+    assert len(calls) == 1
+
+
+def test_open_breaker_fails_fast():
+    async def down():
+        raise httpx.ConnectError("refused")
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(resilience.call("sec", down))
+    assert resilience.breakers["sec"].state == resilience.OPEN
+
+    async def never_called():
+        raise AssertionError("breaker should reject the call")
+
+    with pytest.raises(UpstreamUnavailableError):
+        asyncio.run(resilience.call("sec", never_called))
+
+
+def test_half_open_probe_closes_breaker():
+    breaker = resilience.CircuitBreaker("fmp", 1, 0.05)
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert not breaker.allow()  # only one probe while half-open
+    breaker.record_success()
+    assert breaker.state == resilience.CLOSED
+
+
+def test_deadline_bounds_slow_calls():
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def run():
+        with resilience.deadline(0.05):
+            await resilience.call("gemini", slow)
+
+    with pytest.raises(UpstreamUnavailableError):
+        asyncio.run(run())
+    # A short caller deadline says nothing about the upstream's health.
+    assert resilience.breakers["gemini"].failures == 0
+
+
+def test_upstream_timeouts_count_against_the_breaker():
+    async def timing_out():
+        raise asyncio.TimeoutError()
+
+    with pytest.raises(UpstreamUnavailableError):
+        asyncio.run(resilience.call("gemini", timing_out))
+    assert resilience.breakers["gemini"].failures == 1
+
+
+async def _chunks(*items, stall_after=None):
+    for i, item in enumerate(items):
+        if i == stall_after:
+            await asyncio.sleep(1)
+        yield item
+
+
+def test_stream_holds_its_slot_until_the_stream_ends(monkeypatch):
+    monkeypatch.setattr(settings, "gemini_max_concurrency", 1)
+    order = []
+
+    async def consume(name):
+        async for item in resilience.stream("gemini", lambda: asyncio.sleep(0, result=_chunks(1, 2))):
+            order.append((name, item))
+            await asyncio.sleep(0.01)
+
+    async def run():
+        await asyncio.gather(consume("a"), consume("b"))
+
+    asyncio.run(run())
+    assert order == [("a", 1), ("a", 2), ("b", 1), ("b", 2)]
+
+
+def test_stalled_stream_counts_against_the_breaker(monkeypatch):
+    monkeypatch.setattr(settings, "http_timeout", 0.02)
+
+    async def run():
+        return [item async for item in resilience.stream(
+            "gemini", lambda: asyncio.sleep(0, result=_chunks(1, 2, stall_after=1)))]
+
+    with pytest.raises(UpstreamUnavailableError):
+        asyncio.run(run())
+    assert resilience.breakers["gemini"].failures == 1
+
+
+def test_cancelled_stream_does_not_count_against_the_breaker():
+    async def run():
+        items = resilience.stream("gemini", lambda: asyncio.sleep(0, result=_chunks(1, 2, stall_after=1)))
+        assert await items.__anext__() == 1
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(items.__anext__(), 0.02)
+        await items.aclose()
+
+    asyncio.run(run())
+    assert resilience.breakers["gemini"].failures == 0
@@ -0,0 +1,76 @@
+import gzip
+import json
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+import pipeline
+import response_cache
+from cache import TieredCache
+from main import app
+from schemas import AssessmentResponse
+
+CARDS = [{"title": f"Margin pressure {n}", "blurb": "Rising input costs squeeze gross margin."} for n in range(8)]
+PROFILE = {"companyName": "Apple", "industry": "Consumer Electronics", "sector": "Technology", "country": "US"}
+
+
+def _client_get(client, **headers):
+    return client.get("/api/v1/assessment/AAPL", headers=headers)
+
+
+def test_cached_assessment_is_served_from_encoded_body_with_etag():
+    generate = AsyncMock(return_value=CARDS)
+    run = AsyncMock(wraps=pipeline.run_assessment)
+    with patch("pipeline.cache", TieredCache(max_entries=64)), \
+            patch("response_cache._encoded", response_cache.LRUCache(16)), \
+            patch("config.settings.response_compress_min_bytes", 0), \
+            patch("config.settings.dedup_enabled", False), \
+            patch("scraper.get_latest_filing", AsyncMock(return_value={"id": "0001", "url": "u"})), \
+            patch("scraper.get_company_context", AsyncMock(return_value=("context", PROFILE))), \
+            patch("ai_engine.generate_pain_cards", generate), \
+            patch("pipeline.run_assessment", run), \
+            TestClient(app) as client:
+        first = _client_get(client, **{"Accept-Encoding": "gzip"})
+        second = _client_get(client, **{"Accept-Encoding": "identity"})
+        revalidated = _client_get(client, **{"If-None-Match": first.headers["ETag"]})
+
+    assert first.status_code == 200
+    assert first.headers["Content-Encoding"] == "gzip"
+    assert first.headers["ETag"].startswith('W/"')
+    assert len(first.json()["pain_cards"]) == 8
+
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert "Content-Encoding" not in second.headers
+    assert second.json() == first.json()
+    # Only the first request ran the pipeline; the second came straight from the encoded body.
+    assert run.await_count == 1
+    assert generate.await_count == 1
+
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+
+
+def test_other_worker_reuses_the_stored_etag():
+    response = AssessmentResponse(pain_cards=[], scope_summary="none", activated_tiles=[])
+    with patch("response_cache._encoded", response_cache.LRUCache(16)):
+        value = pipeline._cache_value(response)
+        response_cache._encoded.clear()
+        encoded = response_cache.for_cached(value)
+
+    assert encoded.etag == value["etag"]
+    assert json.loads(encoded.body) == response.model_dump()
+
+
+def test_content_negotiation_and_conditional_requests():
+    body = json.dumps({"pain_cards": [], "blurb": "x" * 2000}).encode()
+    with patch("response_cache._encoded", response_cache.LRUCache(16)):
+        encoded = response_cache.encode(body)
+
+    refused = response_cache.to_http(encoded, {"accept-encoding": "gzip;q=0, deflate"})
+    assert refused.body == body
+    zipped = response_cache.to_http(encoded, {"accept-encoding": "deflate, gzip;q=0.5"})
+    assert gzip.decompress(zipped.body) == body
+
+    strong = encoded.etag.removeprefix("W/")
+    assert response_cache.to_http(encoded, {"if-none-match": f'"other", {strong}'}).status_code == 304
+    assert response_cache.to_http(encoded, {"if-none-match": '"other"'}).status_code == 200
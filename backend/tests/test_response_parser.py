@@ -0,0 +1,142 @@
+import asyncio
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import ai_engine
+from config import settings
+from exceptions import AIGenerationError
+from response_parser import extract_json, parse_pain_cards
+
+
+def _card(i):
+    return {"title": f"Pain {i}", "blurb": f"Blurb {i}."}
+
+
+def test_extracts_array_from_fenced_answer_with_prose():
+    text = "Here are the pain points:\n```json\n" + json.dumps([_card(1), _card(2)]) + "\n```\nHope this helps!"
+    value, repaired = extract_json(text)
+    assert value == [_card(1), _card(2)]
+    assert not repaired
+
+
+def test_brackets_inside_strings_do_not_end_the_value():
+    cards = [{"title": 'Tricky "quotes" ]}', "blurb": "Back\\slash [x] {y}"}]
+    value, _ = extract_json(json.dumps(cards) + " trailing ]")
+    assert value == cards
+
+
+def test_truncated_array_keeps_complete_cards():
+    text = json.dumps([_card(1), _card(2), _card(3)])
+    value, repaired = extract_json(text[:text.rindex("Blurb 3")])
+    assert value == [_card(1), _card(2)]
+    assert repaired
+
+
+def test_truncated_category_object_is_closed():
+    text = '{"Finance": [' + json.dumps(_card(1)) + "], " + '"Operations": [' + json.dumps(_card(2)) + ', {"title": "Pa'
+    value, repaired = extract_json(text)
+    assert value == {"Finance": [_card(1)], "Operations": [_card(2)]}
+    assert repaired
+
+
+@pytest.mark.parametrize("prose", ["Here are the results [8 cards]: ", "Sure! {note} ", "Cards [see below]} {x: "])
+def test_brackets_in_prose_before_the_payload_are_skipped(prose):
+    value, repaired = extract_json(prose + json.dumps([_card(1)]) + " Done [end]")
+    assert value == [_card(1)]
+    assert not repaired
+
+
+def test_unrecoverable_output_raises():
+    with pytest.raises(ValueError):
+        extract_json("I cannot help with that.")
+    with pytest.raises(ValueError):
+        extract_json('[{"title": "cut off')
+    with pytest.raises(ValueError):
+        extract_json("Sure! {note} [...]")
+
+
+def test_category_object_shape_is_flattened():
+    parsed = parse_pain_cards(json.dumps({"Finance": [_card(1)], "Strategy": [_card(2), _card(3)]}))
+    assert [c["title"] for c in parsed.cards] == ["Pain 1", "Pain 2", "Pain 3"]
+    assert parsed.cards[1]["category"] == "Strategy"
+
+
+def test_cards_are_repaired_or_rejected_individually():
+    long_blurb = "word " * 100
+    parsed = parse_pain_cards(json.dumps([
+        {"name": "  Aliased   title ", "description": "Fine."},
+        {"title": "Long", "blurb": long_blurb},
+        {"title": "No blurb"},
+        "not a card",
+        _card(5),
+    ]))
+    titles = [c["title"] for c in parsed.cards]
+    assert titles == ["Aliased title", "Long", "Pain 5"]
+    assert len(parsed.cards[1]["blurb"]) <= 280
+    assert parsed.rejected == 2
+
+
+class BlockedAnswer:
+    """A response whose candidate was blocked: the SDK's ``text`` raises ValueError."""
+
+    @property
+    def text(self):
+        raise ValueError("The response.text quick accessor only works when the response contains a valid Part")
+
+
+class FollowUpModel:
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.prompts = []
+
+    async def generate_content_async(self, prompt):
+        self.prompts.append(prompt)
+        answer = self.answers.pop(0)
+        return answer if isinstance(answer, BlockedAnswer) else SimpleNamespace(text=answer)
+
+
+def _generate(model):
+    with patch("clients.registry.gemini_model", return_value=model):
+        return asyncio.run(ai_engine.generate_pain_cards("context", "ACME"))
+
+
+def test_only_missing_cards_are_requested_again():
+    first = json.dumps([_card(i) for i in range(6)])
+    second = json.dumps([_card(0), _card(6), _card(7)])
+    model = FollowUpModel([first, second])
+    cards = _generate(model)
+    assert [c["title"] for c in cards] == [f"Pain {i}" for i in range(8)]
+    assert len(model.prompts) == 2
+    assert "exactly 2 more" in model.prompts[1]
+    assert "- Pain 5" in model.prompts[1]
+
+
+def test_complete_answer_needs_no_follow_up():
+    model = FollowUpModel([json.dumps([_card(i) for i in range(8)])])
+    assert len(_generate(model)) == 8
+    assert len(model.prompts) == 1
+
+
+def test_unparseable_answers_raise_after_follow_up():
+    model = FollowUpModel(["no json here", "still none"])
+    with pytest.raises(AIGenerationError):
+        _generate(model)
+    assert len(model.prompts) == 2
+
+
+@pytest.mark.parametrize("answer", [BlockedAnswer(), "  "])
+def test_blocked_or_empty_answer_is_not_asked_again(answer):
+    model = FollowUpModel([answer, json.dumps([_card(i) for i in range(8)])])
+    with pytest.raises(AIGenerationError):
+        _generate(model)
+    assert len(model.prompts) == 1
+
+
+def test_blocked_follow_up_keeps_the_cards_so_far(monkeypatch):
+    monkeypatch.setattr(settings, "pain_card_reask_attempts", 2)
+    model = FollowUpModel([json.dumps([_card(i) for i in range(6)]), BlockedAnswer(), json.dumps([_card(6)])])
+    assert len(_generate(model)) == 6
+    assert len(model.prompts) == 2
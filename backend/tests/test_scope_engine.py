@@ -0,0 +1,48 @@
+import random
+
+from keyword_matcher import KeywordMatcher
+from scope_engine import process_scope_and_cards
+from taxonomy import KEYWORD_RULES, PAIN_THEME_RULES
+
+
+def _naive_match(card):
+    title_text = card["title"].lower()
+    full_text = f"{title_text} {card['blurb'].lower()}"
+    keywords = {t for t in PAIN_THEME_RULES if t in title_text}
+    keywords |= {k for k in KEYWORD_RULES if k in full_text}
+    tiles = set()
+    for t in PAIN_THEME_RULES:
+        if t in title_text:
+            tiles.update(PAIN_THEME_RULES[t])
+    for k in KEYWORD_RULES:
+        if k in full_text:
+            tiles.update(KEYWORD_RULES[k])
+    return sorted(tiles), sorted(keywords)
+
+
+def test_matcher_finds_overlapping_and_nested_keywords():
+    matcher = KeywordMatcher(["supply chain", "chain", "in", "supply chain planning"])
+    assert matcher.find("global supply chain planning") == {"supply chain", "chain", "in", "supply chain planning"}
+    assert matcher.find("") == set()
+
+
+def test_process_scope_and_cards_maps_themes_and_keywords():
+    cards, tiles = process_scope_and_cards([
+        {"title": "Cash Flow Pressure", "blurb": "Fragmented data slows the financial close."},
+    ])
+    assert cards[0]["triggering_keywords"] == ["cash flow", "financial close", "fragmented data"]
+    assert cards[0]["triggered_tiles"] == ["FIN-CTRL", "FIN-MDM", "FIN-TCM"]
+    assert tiles == ["FIN-CTRL", "FIN-MDM", "FIN-TCM"]
+
+
+def test_compiled_matching_is_identical_to_substring_scan():
+    rng = random.Random(7)
+    vocabulary = list(PAIN_THEME_RULES) + list(KEYWORD_RULES) + ["the", "our", "rising", "global"]
+    cards = [
+        {"title": " ".join(rng.choice(vocabulary) for _ in range(3)).title(),
+         "blurb": " ".join(rng.choice(vocabulary) for _ in range(15))}
+        for _ in range(200)
+    ]
+    enriched, _ = process_scope_and_cards([dict(c) for c in cards])
+    for card, result in zip(cards, enriched):
+        assert (result["triggered_tiles"], result["triggering_keywords"]) == _naive_match(card)
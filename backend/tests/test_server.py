@@ -0,0 +1,115 @@
+import asyncio
+import os
+import runpy
+import subprocess
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import clients
+import upstream
+
+BACKEND = Path(__file__).resolve().parent.parent
+CONFIG = str(BACKEND / "gunicorn.conf.py")
+
+
+class Arbiter:
+    def __init__(self, num_workers):
+        self.num_workers = num_workers
+        self.WORKERS = {}
+
+
+def _fork(hooks, server, settings, pid):
+    worker = SimpleNamespace()
+    hooks["pre_fork"](server, worker)
+    server.WORKERS[pid] = worker
+    with patch.object(settings, "prewarm_enabled", settings.prewarm_enabled):
+        hooks["post_fork"](server, worker)
+        return settings.prewarm_enabled
+
+
+def test_prewarm_runs_in_exactly_one_worker_and_moves_on_exit():
+    hooks = runpy.run_path(CONFIG)
+    settings = hooks["settings"]
+    server = Arbiter(num_workers=3)
+    with patch.object(settings, "prewarm_enabled", True):
+        assert [_fork(hooks, server, settings, pid) for pid in (1, 2, 3)] == [True, False, False]
+        del server.WORKERS[1]
+        assert _fork(hooks, server, settings, 4) is True
+    upstream.set_worker_count(1)
+
+
+def test_upstream_limits_are_split_between_workers():
+    with patch("config.settings.fmp_max_concurrency", 8), patch("config.settings.gemini_max_concurrency", 4):
+        upstream.set_worker_count(3)
+        try:
+            assert upstream.worker_limit("fmp") == 2
+            assert upstream.worker_limit("gemini") == 1
+        finally:
+            upstream.set_worker_count(1)
+        assert upstream.worker_limit("fmp") == 8
+
+
+def test_http_pools_are_sized_to_the_worker_share():
+    sizes = []
+
+    async def start_pools():
+        clients.ClientRegistry()._ensure_http()
+
+    with patch("config.settings.fmp_max_concurrency", 8), patch("config.settings.sec_max_concurrency", 4), \
+            patch.object(clients.ClientRegistry, "_new_http_client", lambda self, size, headers=None: sizes.append(size)):
+        upstream.set_worker_count(3)
+        try:
+            asyncio.run(start_pools())
+        finally:
+            upstream.set_worker_count(1)
+    assert sizes == [2, 1]
+
+
+def test_importing_the_app_defers_heavy_sdks():
+    script = ("import sys, main; print(sorted(m for m in ('google.generativeai', 'google.api_core', "
+              "'grpc', 'bs4', 'redis') if m in sys.modules))")
+    env = {**os.environ, "GOOGLE_API_KEY": "test", "FMP_API_KEY": "test"}
+    result = subprocess.run([sys.executable, "-c", script], cwd=BACKEND, env=env,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_master_loads_the_gemini_sdk_before_forking():
+    hooks = runpy.run_path(CONFIG)
+    with patch("clients.load_gemini_sdk") as load, patch("gc.freeze"):
+        hooks["when_ready"](Arbiter(num_workers=1))
+    load.assert_called_once()
+
+
+def test_gemini_callers_await_the_sdk_load_without_blocking_the_loop():
+    registry = clients.ClientRegistry()
+    loads = []
+
+    def slow_load():
+        loads.append(1)
+        time.sleep(0.2)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticking = asyncio.ensure_future(ticker())
+        models = await asyncio.gather(registry.gemini_model("k1"), registry.gemini_model("k1"),
+                                      registry.gemini_model("k2"))
+        ticking.cancel()
+        return models, ticks
+
+    with patch("clients.load_gemini_sdk", slow_load), patch("clients.GeminiModel", side_effect=lambda key: key):
+        models, ticks = asyncio.run(run())
+
+    assert models == ["k1", "k1", "k2"]
+    assert loads == [1]
+    assert ticks >= 10  # the loop kept running during the 0.2 s import
@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    async def run():
+        return await asyncio.gather(*(flight.do("AAPL", work) for _ in range(5)), flight.do("MSFT", work))
+
+    results = asyncio.run(run())
+    assert len(calls) == 2
+    assert all(r == {"ok": True} for r in results)
+    assert flight.counts["follower"] == 4
+    assert flight.coalesce_rate() == pytest.approx(4 / 6)
+
+
+def test_failures_propagate_and_are_not_remembered():
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise RuntimeError("boom")
+
+    async def run():
+        return await asyncio.gather(flight.do("AAPL", fail), flight.do("AAPL", fail), return_exceptions=True)
+
+    assert all(isinstance(r, RuntimeError) for r in asyncio.run(run()))
+    assert asyncio.run(flight.do("AAPL", lambda: asyncio.sleep(0, result="fresh"))) == "fresh"
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("AAPL", work))
+        second = asyncio.ensure_future(flight.do("AAPL", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+class FakeRedis:
+    """The async Redis calls ``SingleFlight`` makes, backed by a dict."""
+
+    def __init__(self, down=False):
+        self.down = down
+        self.values = {}
+
+    async def set(self, key, value, nx=False, px=None):
+        if self.down:
+            raise ConnectionError("redis down")
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    async def exists(self, key):
+        return int(key in self.values)
+
+    async def eval(self, script, numkeys, key, token):
+        if self.values.get(key) == token:
+            del self.values[key]
+            return 1
+        return 0
+
+
+def _redis_flight(monkeypatch, redis):
+    monkeypatch.setattr("config.settings.singleflight_redis_enabled", True)
+    monkeypatch.setattr("config.settings.singleflight_poll_interval", 0.001)
+    flight = SingleFlight("test", "redis://fake")
+    flight._redis = redis
+    return flight
+
+
+def test_redis_leader_takes_and_releases_the_lock(monkeypatch):
+    redis = FakeRedis()
+    flight = _redis_flight(monkeypatch, redis)
+    held = []
+
+    async def work():
+        held.append(dict(redis.values))
+        return "done"
+
+    assert asyncio.run(flight.do("AAPL", work)) == "done"
+    assert list(held[0]) == ["leadscope:singleflight:test:AAPL"]
+    assert redis.values == {}
+
+
+def test_redis_follower_waits_for_the_other_process_then_runs_once(monkeypatch):
+    redis = FakeRedis()
+    redis.values["leadscope:singleflight:test:AAPL"] = "other-process"
+    flight = _redis_flight(monkeypatch, redis)
+    calls = []
+
+    async def work():
+        calls.append("lock" in redis.values)
+        raise RuntimeError("pipeline failed")
+
+    async def run():
+        async def release():
+            await asyncio.sleep(0.01)
+            redis.values.clear()
+        asyncio.ensure_future(release())
+        await flight.do("AAPL", work)
+
+    # A failure of the work itself propagates and is not retried as a Redis failure.
+    with pytest.raises(RuntimeError, match="pipeline failed"):
+        asyncio.run(run())
+    assert calls == [False]
+    assert flight.counts["remote_follower"] == 1
+
+
+def test_redis_down_runs_the_work_once_without_a_lock(monkeypatch):
+    flight = _redis_flight(monkeypatch, FakeRedis(down=True))
+    calls = []
+
+    async def work():
+        calls.append(1)
+        raise RuntimeError("pipeline failed")
+
+    with pytest.raises(RuntimeError, match="pipeline failed"):
+        asyncio.run(flight.do("AAPL", work))
+    assert calls == [1]
+
+
+def test_interactive_assessment_never_joins_a_background_run(monkeypatch):
+    import pipeline
+    import rate_limit
+
+    runs = []
+
+    async def fake_run(ticker, generate_cards, refresh=False):
+        runs.append((rate_limit.current_priority(), refresh))
+        await asyncio.sleep(0.01)
+        return ticker
+
+    monkeypatch.setattr(pipeline, "_run_with_deadline", fake_run)
+
+    async def prewarm():
+        with rate_limit.priority(rate_limit.PREWARM):
+            return await pipeline.run_assessment("AAPL", refresh=True)
+
+    async def run():
+        return await asyncio.gather(prewarm(), pipeline.run_assessment("AAPL"), pipeline.run_assessment("AAPL"))
+
+    assert asyncio.run(run()) == ["AAPL"] * 3
+    # The two interactive calls share one run; the prewarm run stays separate.
+    assert sorted(runs) == [(rate_limit.INTERACTIVE, False), (rate_limit.PREWARM, True)]
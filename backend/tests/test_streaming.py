@@ -0,0 +1,112 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from ai_engine import IncrementalCardParser
+from config import settings
+from exceptions import UpstreamUnavailableError
+import pipeline
+from main import app
+
+MODEL_OUTPUT = '```json\n[{"title": "Margin {pressure}", "blurb": "Costs \\"rise\\"."}, {"title": "Cash", "blurb": "Tight."}]\n```'
+
+
+def test_parser_emits_cards_as_they_complete():
+    parser = IncrementalCardParser()
+    cards = []
+    for i, ch in enumerate(MODEL_OUTPUT):
+        new_cards = parser.feed(ch)
+        if new_cards and not cards:
+            # The first card is available before the second one has arrived.
+            assert '"Cash"' not in MODEL_OUTPUT[:i + 1]
+        cards += new_cards
+    assert cards == [
+        {"title": "Margin {pressure}", "blurb": 'Costs "rise".'},
+        {"title": "Cash", "blurb": "Tight."},
+    ]
+
+
+def test_parser_handles_chunk_boundaries():
+    parser = IncrementalCardParser()
+    first = parser.feed(MODEL_OUTPUT[:70])
+    rest = parser.feed(MODEL_OUTPUT[70:])
+    assert len(first) == 1 and len(rest) == 1
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_stream_endpoint_sends_profile_then_cards(monkeypatch):
+    monkeypatch.setattr(settings, "cache_enabled", False)
+
+    async def fake_cards(context, ticker):
+        yield {"title": "Manual financial close", "blurb": "Reconciliation takes weeks."}
+        yield {"title": "Inventory visibility", "blurb": "Stock levels are unclear."}
+
+    profile = {"companyName": "Acme", "industry": "Software", "description": "Acme sells software."}
+    with patch("scraper.get_latest_filing", new=AsyncMock(return_value=None)), \
+            patch("scraper.get_company_profile", new=AsyncMock(return_value=profile)), \
+            patch("scraper.get_risk_factors", new=AsyncMock(return_value="")), \
+            patch("ai_engine.stream_pain_cards", new=fake_cards), \
+            TestClient(app) as client:
+        response = client.get("/api/v1/assessment/ACME/stream")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _events(response.text)
+    assert [name for name, _ in events] == ["profile", "card", "card", "complete"]
+    assert events[0][1]["company_name"] == "Acme"
+    assert events[1][1]["title"] == "Manual financial close"
+    assert "triggered_tiles" in events[1][1]
+
+
+def test_stalled_gemini_stream_is_cut_off_at_the_request_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "cache_enabled", False)
+    monkeypatch.setattr(settings, "request_deadline", 0.2)
+    deadlines = []
+
+    async def stalled_cards(context, ticker):
+        deadlines.append(pipeline.resilience.remaining())
+        yield {"title": "Manual financial close", "blurb": "Reconciliation takes weeks."}
+        await asyncio.sleep(60)
+        yield {"title": "Never sent", "blurb": "The stream stalled."}
+
+    async def run():
+        events = []
+        profile = {"companyName": "Acme", "industry": "Software", "description": "Acme sells software."}
+        with patch("scraper.get_latest_filing", new=AsyncMock(return_value=None)), \
+                patch("scraper.get_company_profile", new=AsyncMock(return_value=profile)), \
+                patch("scraper.get_risk_factors", new=AsyncMock(return_value="")), \
+                patch("ai_engine.stream_pain_cards", new=stalled_cards):
+            try:
+                async for name, _ in pipeline.stream_assessment("ACME"):
+                    events.append(name)
+            except UpstreamUnavailableError:
+                events.append("deadline")
+        return events
+
+    events = asyncio.run(asyncio.wait_for(run(), 5))
+    assert events == ["profile", "card", "deadline"]
+    # Upstream calls inside the stream see the request deadline too.
+    assert deadlines[0] is not None and 0 < deadlines[0] <= 0.2
+
+
+def test_stream_endpoint_rejects_invalid_ticker():
+    with TestClient(app) as client:
+        assert client.get("/api/v1/assessment/123/stream").status_code == 400
+
+
+def test_parser_skips_a_malformed_card_and_keeps_streaming():
+    parser = IncrementalCardParser()
+    cards = parser.feed('[{"title": "Cost", "blurb": "a"},{"title": "Ops", blurb: "b"},')
+    cards += parser.feed('{"title": "Cash", "blurb": "c"}]')
+
+    assert [card["title"] for card in cards] == ["Cost", "Cash"]
+    assert parser.rejected == 1
@@ -0,0 +1,53 @@
+"""Per-upstream concurrency limits shared by every request and batch job.
+
+The configured limits are totals for the deployment. Under a multi-worker
+server each worker process gets an equal share, but at least one slot (see
+``gunicorn.conf.py``). The worker's HTTP connection pools are sized to the
+same share, and so are its in-process rate-limit buckets (``rate_limit``).
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from weakref import WeakKeyDictionary
+
+from config import settings
+
+UPSTREAMS = ("fmp", "sec", "gemini")
+
+# Semaphores are bound to the loop they are first awaited on, so keep one set per loop.
+_semaphores: "WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]" = WeakKeyDictionary()
+
+_worker_count = 1
+
+
+def set_worker_count(count: int) -> None:
+    """Split the configured limits between ``count`` worker processes."""
+    global _worker_count
+    _worker_count = max(1, count)
+    _semaphores.clear()
+
+
+def worker_count() -> int:
+    """How many worker processes share the configured limits."""
+    return _worker_count
+
+
+def worker_limit(upstream: str) -> int:
+    """This worker's share of ``<upstream>_max_concurrency``."""
+    return max(1, getattr(settings, f"{upstream}_max_concurrency") // _worker_count)
+
+
+def _semaphore(upstream: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    per_loop = _semaphores.setdefault(loop, {})
+    if upstream not in per_loop:
+        per_loop[upstream] = asyncio.Semaphore(worker_limit(upstream))
+    return per_loop[upstream]
+
+
+@asynccontextmanager
+async def upstream_slot(upstream: str) -> AsyncIterator[None]:
+    """Hold one of the configured concurrent-call slots for ``upstream``."""
+    async with _semaphore(upstream):
+        yield